@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Benchmark every Anki MCP tool and resource against the fake AnkiConnect server.
+
+The PDF conversion tools never talk to Anki and are not benchmarked. The
+write-behind tools run last, with write-behind enabled on a temporary journal.
+
+Drives the FastMCP app in-process through a FastMCP client and reports, per tool
+and resource: latency percentiles, AnkiConnect round trips per call, bytes on the
+wire per call and peak Python memory of a single call. Results are written as
+JSON so runs can be compared across commits.
+
+Usage:
+    # Run the default scenarios (500 and 100k synthetic notes)
+    python scripts/benchmark_tools.py --output bench.json
+
+    # Quick run with the small scenario only
+    python scripts/benchmark_tools.py --scenario small --iterations 20
+
+    # Compare against a previous run; exits 1 on regressions
+    python scripts/benchmark_tools.py --output new.json --compare old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from fastmcp import Client
+
+from anki_mcp_server import server_fastmcp
+from anki_mcp_server.client import AnkiClient
+from anki_mcp_server.fake_anki import FakeAnkiConnect, FakeCollection
+
+EXPORT_DIR = Path(__file__).parent.parent / "export"
+
+SCENARIOS: dict[str, Callable[[], FakeCollection]] = {
+    "small": lambda: FakeCollection.synthetic(500),
+    "large": lambda: FakeCollection.synthetic(100_000),
+    "apkg": lambda: FakeCollection.from_packages(*sorted(EXPORT_DIR.glob("*.apkg"))),
+}
+
+
+WRITE_BEHIND_ENV = ("ANKI_MCP_WRITE_BEHIND", "ANKI_MCP_WRITE_BEHIND_DELAY")
+
+
+@dataclass
+class Case:
+    """One benchmarked tool call or resource read.
+
+    ``before`` runs untimed ahead of every call, e.g. to write input files or
+    queue writes; its AnkiConnect requests are not counted.
+    """
+
+    name: str
+    kind: str  # "tool" or "resource"
+    target: str
+    arguments: Callable[[int], dict[str, Any]] | None = None
+    before: Callable[[Client, int], Awaitable[None]] | None = None
+
+
+def build_cases(collection: FakeCollection, workdir: Path) -> list[Case]:
+    """Build the benchmark cases for a seeded collection.
+
+    Input files for the import and media cases are written to ``workdir``.
+    """
+    note_ids = list(collection.notes)
+    deck = next(name for name in collection.decks if name != "Default")
+
+    def new_note(i: int, prefix: str) -> dict[str, Any]:
+        return {
+            "type": "Basic",
+            "deck": deck,
+            "fields": {"Front": f"{prefix} question {i}", "Back": f"answer {i}"},
+            "tags": ["benchmark"],
+        }
+
+    def update(note_id: int, i: int) -> dict[str, Any]:
+        first_field = next(iter(collection.notes[note_id]["fields"]))
+        return {
+            "id": note_id,
+            "fields": {first_field: f"updated {i}"},
+            "tags": ["benchmark", "updated"],
+        }
+
+    async def write_cards(client: Client, i: int) -> None:
+        cards = [new_note(i * 20 + j, "bench file") for j in range(20)]
+        (workdir / f"cards-{i}.json").write_text(json.dumps(cards), encoding="utf-8")
+
+    async def write_media(client: Client, i: int) -> None:
+        (workdir / f"media-{i}.png").write_bytes(f"benchmark image {i}".encode() * 64)
+
+    async def create_doomed(client: Client, i: int) -> None:
+        notes = [
+            {**new_note(i * 10 + j, "bench doomed"), "tags": [f"doomed{i}"]} for j in range(10)
+        ]
+        await client.call_tool("batch_create_notes", {"notes": notes})
+
+    return [
+        Case("list_decks", "tool", "list_decks"),
+        Case("create_deck", "tool", "create_deck", lambda i: {"name": f"Bench::Deck {i}"}),
+        Case("list_note_types", "tool", "list_note_types"),
+        Case(
+            "get_note_type_info",
+            "tool",
+            "get_note_type_info",
+            lambda i: {"model_name": "Basic", "include_css": True},
+        ),
+        Case(
+            "create_note_type",
+            "tool",
+            "create_note_type",
+            lambda i: {
+                "name": f"Bench Type {i}",
+                "fields": ["Front", "Back"],
+                "templates": [{"name": "Card 1", "front": "{{Front}}", "back": "{{Back}}"}],
+            },
+        ),
+        Case("search_notes", "tool", "search_notes", lambda i: {"query": f'deck:"{deck}"'}),
+        Case(
+            "get_note_info",
+            "tool",
+            "get_note_info",
+            lambda i: {"noteId": note_ids[i % len(note_ids)]},
+        ),
+        Case(
+            "create_note",
+            "tool",
+            "create_note",
+            lambda i: {
+                "note_type": "Basic",
+                "deck": deck,
+                "fields": {"Front": f"bench single {i}", "Back": "answer"},
+            },
+        ),
+        Case(
+            "batch_create_notes",
+            "tool",
+            "batch_create_notes",
+            lambda i: {"notes": [new_note(i * 20 + j, "bench batch") for j in range(20)]},
+        ),
+        Case(
+            "bulk_create_notes",
+            "tool",
+            "bulk_create_notes",
+            lambda i: {
+                "notes": [new_note(i * 200 + j, "bench bulk") for j in range(200)],
+                "include_note_ids": False,
+            },
+        ),
+        Case(
+            "import_cards_file",
+            "tool",
+            "import_cards_file",
+            lambda i: {"path": str(workdir / f"cards-{i}.json"), "note_type": "Basic"},
+            before=write_cards,
+        ),
+        Case(
+            "import_notes_as_package",
+            "tool",
+            "import_notes_as_package",
+            lambda i: {
+                "notes": [new_note(i * 20 + j, "bench package") for j in range(20)],
+                "include_note_ids": False,
+            },
+        ),
+        Case(
+            "upload_media",
+            "tool",
+            "upload_media",
+            lambda i: {"paths": [str(workdir / f"media-{i}.png")]},
+            before=write_media,
+        ),
+        Case(
+            "update_note",
+            "tool",
+            "update_note",
+            lambda i: update(note_ids[i % len(note_ids)], i),
+        ),
+        Case(
+            "batch_update_notes",
+            "tool",
+            "batch_update_notes",
+            lambda i: {
+                "updates": [update(note_ids[(i * 20 + j) % len(note_ids)], i) for j in range(20)]
+            },
+        ),
+        Case(
+            "add_tags_by_query",
+            "tool",
+            "add_tags_by_query",
+            lambda i: {"query": "tag:benchmark", "tags": ["bench-tagged"]},
+        ),
+        Case(
+            "replace_tag_by_query",
+            "tool",
+            "replace_tag_by_query",
+            lambda i: {
+                "query": "tag:bench-tagged",
+                "tag": "bench-tagged",
+                "replacement": "bench-x",
+            },
+        ),
+        Case(
+            "remove_tags_by_query",
+            "tool",
+            "remove_tags_by_query",
+            lambda i: {"query": "tag:bench-x", "tags": ["bench-x"]},
+        ),
+        Case(
+            "move_cards_by_query",
+            "tool",
+            "move_cards_by_query",
+            lambda i: {"query": "tag:benchmark", "deck": f"Bench::Moved {i % 2}"},
+        ),
+        Case("delete_note", "tool", "delete_note", lambda i: {"id": note_ids[-1 - i]}),
+        Case(
+            "delete_notes_by_query",
+            "tool",
+            "delete_notes_by_query",
+            lambda i: {"query": f"tag:doomed{i}"},
+            before=create_doomed,
+        ),
+        Case("resource:decks", "resource", "anki://decks/all"),
+        Case("resource:note-types", "resource", "anki://note-types/all"),
+        Case("resource:all-with-schemas", "resource", "anki://note-types/all-with-schemas"),
+        Case("resource:schema", "resource", "anki://note-types/Basic"),
+        Case("resource:connection-status", "resource", "anki://connection/status"),
+        Case("resource:stats", "resource", "anki://stats"),
+    ]
+
+
+def build_write_behind_cases(collection: FakeCollection) -> list[Case]:
+    """Build the cases that need write-behind mode (ANKI_MCP_WRITE_BEHIND)."""
+    deck = next(name for name in collection.decks if name != "Default")
+
+    def note(i: int, prefix: str) -> dict[str, Any]:
+        return {
+            "note_type": "Basic",
+            "deck": deck,
+            "fields": {"Front": f"{prefix} {i}", "Back": "answer"},
+        }
+
+    async def queue_creates(client: Client, i: int) -> None:
+        for j in range(20):
+            await client.call_tool("create_note", note(i * 20 + j, "bench queued"))
+
+    return [
+        Case(
+            "create_note:write-behind",
+            "tool",
+            "create_note",
+            lambda i: note(i, "bench write-behind"),
+        ),
+        Case("flush_writes", "tool", "flush_writes", before=queue_creates),
+        Case("write_status", "tool", "write_status"),
+    ]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return the ``pct`` percentile of ``samples`` using nearest-rank."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def call(client: Client, case: Case, i: int) -> None:
+    """Execute one benchmark call."""
+    if case.kind == "tool":
+        await client.call_tool(case.target, case.arguments(i) if case.arguments else {})
+    else:
+        await client.read_resource(case.target)
+
+
+async def run_case(
+    client: Client, fake: FakeAnkiConnect, case: Case, iterations: int, offset: int
+) -> dict[str, Any]:
+    """Benchmark one case and return its metrics."""
+    latencies = []
+    requests = wire_bytes = 0
+    for i in range(iterations):
+        if case.before is not None:
+            await case.before(client, offset + i)
+        fake.reset_stats()
+        start = time.perf_counter()
+        await call(client, case, offset + i)
+        latencies.append((time.perf_counter() - start) * 1000)
+        requests += fake.requests
+        wire_bytes += fake.bytes_received + fake.bytes_sent
+
+    if case.before is not None:
+        await case.before(client, offset + iterations)
+    tracemalloc.start()
+    await call(client, case, offset + iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls": iterations,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p90_ms": round(percentile(latencies, 90), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "round_trips_per_call": requests / iterations,
+        "bytes_per_call": round(wire_bytes / iterations),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+async def run_cases(
+    fake: FakeAnkiConnect, cases: list[Case], iterations: int, results: dict[str, Any]
+) -> None:
+    """Point the server at ``fake`` and benchmark ``cases`` into ``results``."""
+    await server_fastmcp.reset_state()
+    server_fastmcp._client = AnkiClient(url=fake.url)
+    try:
+        async with Client(server_fastmcp.mcp) as client:
+            for case in cases:
+                results[case.name] = await run_case(
+                    client, fake, case, iterations, offset=len(results) * iterations * 2
+                )
+                print(
+                    f"  {case.name:32s} p50 {results[case.name]['p50_ms']:9.3f} ms  "
+                    f"{results[case.name]['round_trips_per_call']:5.2f} rt/call",
+                    file=sys.stderr,
+                )
+    finally:
+        await server_fastmcp.reset_state()
+
+
+async def run_scenario(name: str, iterations: int, latency_ms: float) -> dict[str, Any]:
+    """Seed a fake AnkiConnect, point the server at it and benchmark every case.
+
+    The write-behind cases run last, with a journal in a temporary directory and
+    a flush delay long enough that only ``flush_writes`` and full batches send.
+    """
+    collection = SCENARIOS[name]()
+    results: dict[str, Any] = {}
+    saved = {key: os.environ.get(key) for key in WRITE_BEHIND_ENV}
+    with (
+        FakeAnkiConnect(collection, latency=latency_ms / 1000) as fake,
+        tempfile.TemporaryDirectory() as workdir,
+    ):
+        await run_cases(fake, build_cases(collection, Path(workdir)), iterations, results)
+        os.environ["ANKI_MCP_WRITE_BEHIND"] = str(Path(workdir) / "journal.jsonl")
+        os.environ["ANKI_MCP_WRITE_BEHIND_DELAY"] = "3600"
+        try:
+            await run_cases(fake, build_write_behind_cases(collection), iterations, results)
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return {"notes": len(collection.notes), "latency_ms": latency_ms, "results": results}
+
+
+def git_commit() -> str | None:
+    """Return the current git commit hash, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float) -> list[str]:
+    """Return regressions between two benchmark runs.
+
+    A regression is more round trips or bytes per call than before, or a p50
+    latency more than ``threshold`` (relative) above the previous run.
+    """
+    regressions = []
+    for scenario, data in new["scenarios"].items():
+        previous = old.get("scenarios", {}).get(scenario, {}).get("results", {})
+        for case, metrics in data["results"].items():
+            before = previous.get(case)
+            if before is None:
+                continue
+            for key in ("round_trips_per_call", "bytes_per_call"):
+                if metrics[key] > before[key] * 1.01:
+                    regressions.append(f"{scenario}/{case}: {key} {before[key]} -> {metrics[key]}")
+            if metrics["p50_ms"] > before["p50_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{scenario}/{case}: p50_ms {before['p50_ms']} -> {metrics['p50_ms']}"
+                )
+    return regressions
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark MCP tools and resources against a fake AnkiConnect",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Scenario to run (repeatable; default: small and large)",
+    )
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per case")
+    parser.add_argument(
+        "--latency-ms", type=float, default=1.0, help="Simulated AnkiConnect latency per action"
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Allowed relative p50 latency increase"
+    )
+    args = parser.parse_args()
+
+    report: dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+        },
+        "scenarios": {},
+    }
+    for scenario in args.scenario or ["small", "large"]:
+        print(f"Scenario {scenario}", file=sys.stderr)
+        report["scenarios"][scenario] = asyncio.run(
+            run_scenario(scenario, args.iterations, args.latency_ms)
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    if args.compare:
+        regressions = compare(
+            json.loads(args.compare.read_text(encoding="utf-8")), report, args.threshold
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,105 @@ def parse_args() -> argparse.Namespace:
         default=8765,
         help="AnkiConnect port (default: 8765)",
     )
+    parser.add_argument(
+        "--package",
+        default=None,
+        help="Serve reads from this .apkg package or collection.anki2 file instead of "
+        "AnkiConnect; writes are rejected (default: disabled)",
+    )
+    parser.add_argument(
+        "--batch-window-us",
+        type=int,
+        default=None,
+        help="Coalesce AnkiConnect calls issued within this many microseconds into one "
+        "'multi' request (0 = same event-loop tick; default: disabled)",
+    )
+    parser.add_argument(
+        "--stale-while-revalidate",
+        type=float,
+        default=None,
+        help="Serve expired cached metadata for up to this many seconds while refreshing "
+        "it in the background (default: disabled)",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Periodically write per-action and per-tool metrics in Prometheus text "
+        "format to this file (default: disabled)",
+    )
+    parser.add_argument(
+        "--mirror",
+        default=None,
+        help="Keep a local SQLite mirror of all notes in this file (':memory:' for "
+        "in-memory) and serve note reads from it (default: disabled)",
+    )
+    parser.add_argument(
+        "--mirror-max-age",
+        type=float,
+        default=None,
+        help="Seconds after a sync before note reads sync the mirror again (default: 30)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Profile tool invocations with cProfile and write the slowest ones to this "
+        "directory as .pstats and .collapsed files (default: disabled)",
+    )
+    parser.add_argument(
+        "--profile-threshold-ms",
+        type=float,
+        default=None,
+        help="Only keep profiles of invocations slower than this (default: 100)",
+    )
+    parser.add_argument(
+        "--profile-keep",
+        type=int,
+        default=None,
+        help="Number of slowest profiles kept per tool (default: 5)",
+    )
+    parser.add_argument(
+        "--duplicate-index",
+        action="store_true",
+        help="Check new notes for duplicate first fields against a local index before "
+        "sending them to Anki (default: disabled)",
+    )
+    parser.add_argument(
+        "--media-ledger",
+        default=None,
+        help="Remember the content hashes of uploaded media in this file so they are "
+        "not uploaded again after a restart (default: in memory)",
+    )
+    parser.add_argument(
+        "--write-behind",
+        default=None,
+        help="Queue create_note/update_note writes in this journal file and send them "
+        "to Anki in batches; queued writes survive restarts (default: disabled)",
+    )
+    parser.add_argument(
+        "--write-behind-batch",
+        type=int,
+        default=None,
+        help="Queued writes that trigger a flush (default: 50)",
+    )
+    parser.add_argument(
+        "--write-behind-delay",
+        type=float,
+        default=None,
+        help="Seconds after the first queued write before a flush (default: 1.0)",
+    )
+    parser.add_argument(
+        "--compact-json",
+        action="store_true",
+        help="Return compact JSON instead of indented JSON unless a tool call asks "
+        "otherwise (default: indented)",
+    )
+    parser.add_argument(
+        "--max-response-bytes",
+        type=int,
+        default=None,
+        help="Trim the largest list in a response so it fits in this many bytes "
+        "(default: unlimited)",
+    )
     return parser.parse_args()
 
 
@@ -31,8 +130,72 @@ def main() -> None:
         print("Error: Port must be between 1 and 65535", file=sys.stderr)
         sys.exit(1)
 
+    if args.package is not None and not os.path.isfile(args.package):
+        print(f"Error: Package not found: {args.package}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.batch_window_us is not None and args.batch_window_us < 0:
+        print("Error: Batch window must not be negative", file=sys.stderr)
+        sys.exit(1)
+
+    if args.stale_while_revalidate is not None and args.stale_while_revalidate < 0:
+        print("Error: Stale-while-revalidate window must not be negative", file=sys.stderr)
+        sys.exit(1)
+
+    if args.mirror_max_age is not None and args.mirror_max_age < 0:
+        print("Error: Mirror max age must not be negative", file=sys.stderr)
+        sys.exit(1)
+
+    if args.profile_keep is not None and args.profile_keep < 1:
+        print("Error: Profile keep count must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    if args.write_behind_batch is not None and args.write_behind_batch < 1:
+        print("Error: Write-behind batch size must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    if args.write_behind_delay is not None and args.write_behind_delay < 0:
+        print("Error: Write-behind delay must not be negative", file=sys.stderr)
+        sys.exit(1)
+
+    if args.max_response_bytes is not None and args.max_response_bytes < 1:
+        print("Error: Max response bytes must be positive", file=sys.stderr)
+        sys.exit(1)
+
     # Set port via environment variable for client
     os.environ["ANKI_CONNECT_PORT"] = str(args.port)
+    if args.package is not None:
+        os.environ["ANKI_MCP_PACKAGE"] = args.package
+    if args.batch_window_us is not None:
+        os.environ["ANKI_MCP_BATCH_WINDOW_US"] = str(args.batch_window_us)
+    if args.stale_while_revalidate is not None:
+        os.environ["ANKI_MCP_STALE_WHILE_REVALIDATE"] = str(args.stale_while_revalidate)
+    if args.metrics_file is not None:
+        os.environ["ANKI_MCP_METRICS_FILE"] = args.metrics_file
+    if args.mirror is not None:
+        os.environ["ANKI_MCP_MIRROR"] = args.mirror
+    if args.mirror_max_age is not None:
+        os.environ["ANKI_MCP_MIRROR_MAX_AGE"] = str(args.mirror_max_age)
+    if args.profile_dir is not None:
+        os.environ["ANKI_MCP_PROFILE_DIR"] = args.profile_dir
+    if args.profile_threshold_ms is not None:
+        os.environ["ANKI_MCP_PROFILE_THRESHOLD_MS"] = str(args.profile_threshold_ms)
+    if args.profile_keep is not None:
+        os.environ["ANKI_MCP_PROFILE_KEEP"] = str(args.profile_keep)
+    if args.duplicate_index:
+        os.environ["ANKI_MCP_DUPLICATE_INDEX"] = "1"
+    if args.media_ledger is not None:
+        os.environ["ANKI_MCP_MEDIA_LEDGER"] = args.media_ledger
+    if args.write_behind is not None:
+        os.environ["ANKI_MCP_WRITE_BEHIND"] = args.write_behind
+    if args.write_behind_batch is not None:
+        os.environ["ANKI_MCP_WRITE_BEHIND_BATCH"] = str(args.write_behind_batch)
+    if args.write_behind_delay is not None:
+        os.environ["ANKI_MCP_WRITE_BEHIND_DELAY"] = str(args.write_behind_delay)
+    if args.compact_json:
+        os.environ["ANKI_MCP_COMPACT_JSON"] = "1"
+    if args.max_response_bytes is not None:
+        os.environ["ANKI_MCP_MAX_RESPONSE_BYTES"] = str(args.max_response_bytes)
 
     # Import and run FastMCP server
     from anki_mcp_server.server_fastmcp import mcp
@@ -0,0 +1,483 @@
+"""Readers and a writer for Anki package (.apkg) and collection (.anki2) files.
+
+Reading supports the legacy schema (note types and decks stored as JSON in the ``col``
+table) and the current schema used by ``collection.anki21b`` (separate
+``notetypes``/``fields``/``templates``/``decks`` tables with protobuf configs).
+Reading zstd-compressed ``collection.anki21b`` packages requires the optional
+``zstandard`` package (``pip install anki-mcp-server[apkg]``). Packages are
+written in the legacy schema, which every Anki version imports.
+"""
+
+import hashlib
+import json
+import re
+import secrets
+import shutil
+import sqlite3
+import string
+import tempfile
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from anki_mcp_server.shaping import strip_html
+
+# Separator Anki uses between note fields and between deck name components
+FIELD_SEPARATOR = "\x1f"
+
+# Characters of Anki's base91 note GUIDs
+_GUID_CHARS = string.ascii_letters + string.digits + "!#$%&()*+,-./:;<=>?@[]^_`{|}~"
+
+# Image tags keep their file name in sort fields and checksums, as in Anki
+_IMG_RE = re.compile(r"<img[^>]*?src=[\"']?([^\"'>\s]+)[^>]*>", re.IGNORECASE)
+_CLOZE_NUMBER_RE = re.compile(r"\{\{c(\d+)::")
+_CLOZE_FIELD_RE = re.compile(r"\{\{(?:[^}]*:)?cloze:([^}]+)\}\}")
+_SECTION_RE = re.compile(r"\{\{#([^}]+)\}\}")
+_REFERENCE_RE = re.compile(r"\{\{(?![#^/!])([^}]+)\}\}")
+
+# Collection schema 11, the legacy format of collection.anki2
+_SCHEMA = """
+CREATE TABLE col (
+    id integer PRIMARY KEY, crt integer NOT NULL, mod integer NOT NULL,
+    scm integer NOT NULL, ver integer NOT NULL, dty integer NOT NULL,
+    usn integer NOT NULL, ls integer NOT NULL, conf text NOT NULL,
+    models text NOT NULL, decks text NOT NULL, dconf text NOT NULL, tags text NOT NULL
+);
+CREATE TABLE notes (
+    id integer PRIMARY KEY, guid text NOT NULL, mid integer NOT NULL,
+    mod integer NOT NULL, usn integer NOT NULL, tags text NOT NULL,
+    flds text NOT NULL, sfld integer NOT NULL, csum integer NOT NULL,
+    flags integer NOT NULL, data text NOT NULL
+);
+CREATE TABLE cards (
+    id integer PRIMARY KEY, nid integer NOT NULL, did integer NOT NULL,
+    ord integer NOT NULL, mod integer NOT NULL, usn integer NOT NULL,
+    type integer NOT NULL, queue integer NOT NULL, due integer NOT NULL,
+    ivl integer NOT NULL, factor integer NOT NULL, reps integer NOT NULL,
+    lapses integer NOT NULL, left integer NOT NULL, odue integer NOT NULL,
+    odid integer NOT NULL, flags integer NOT NULL, data text NOT NULL
+);
+CREATE TABLE revlog (
+    id integer PRIMARY KEY, cid integer NOT NULL, usn integer NOT NULL,
+    ease integer NOT NULL, ivl integer NOT NULL, lastIvl integer NOT NULL,
+    factor integer NOT NULL, time integer NOT NULL, type integer NOT NULL
+);
+CREATE TABLE graves (usn integer NOT NULL, oid integer NOT NULL, type integer NOT NULL);
+CREATE INDEX ix_notes_usn ON notes (usn);
+CREATE INDEX ix_cards_usn ON cards (usn);
+CREATE INDEX ix_revlog_usn ON revlog (usn);
+CREATE INDEX ix_cards_nid ON cards (nid);
+CREATE INDEX ix_cards_sched ON cards (did, queue, due);
+CREATE INDEX ix_revlog_cid ON revlog (cid);
+CREATE INDEX ix_notes_csum ON notes (csum);
+"""
+
+# Options group referenced by the decks of a written package
+_DECK_CONFIG = {
+    "id": 1,
+    "name": "Default",
+    "mod": 0,
+    "usn": 0,
+    "maxTaken": 60,
+    "autoplay": True,
+    "timer": 0,
+    "replayq": True,
+    "dyn": False,
+    "new": {
+        "delays": [1.0, 10.0],
+        "ints": [1, 4, 0],
+        "initialFactor": 2500,
+        "order": 1,
+        "perDay": 20,
+        "bury": False,
+    },
+    "rev": {
+        "perDay": 200,
+        "ease4": 1.3,
+        "maxIvl": 36500,
+        "hardFactor": 1.2,
+        "ivlFct": 1.0,
+        "bury": False,
+    },
+    "lapse": {"delays": [10.0], "mult": 0.0, "minInt": 1, "leechFails": 8, "leechAction": 1},
+}
+
+
+def open_collection(path: str | Path, workdir: str | Path | None = None) -> sqlite3.Connection:
+    """Open an .apkg package or .anki2 collection read-only.
+
+    Packages are extracted into ``workdir`` (default: a new temporary directory),
+    preferring the newest collection format they contain.
+
+    Args:
+        path: Path to an .apkg/.colpkg package or a collection SQLite file
+        workdir: Directory for the extracted collection
+
+    Returns:
+        Read-only SQLite connection to the collection
+
+    Raises:
+        ValueError: If the file is not a recognised package or collection
+        ImportError: If the package needs zstandard and it is not installed
+    """
+    path = Path(path)
+    if not zipfile.is_zipfile(path):
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="anki-mcp-"))
+    target = workdir / f"{path.stem}.anki2"
+    with zipfile.ZipFile(path) as package:
+        names = set(package.namelist())
+        if "collection.anki21b" in names:
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError(
+                    f"{path.name} uses the compressed collection format; "
+                    "install zstandard to read it"
+                ) from e
+            with package.open("collection.anki21b") as src, open(target, "wb") as dst:
+                zstandard.ZstdDecompressor().copy_stream(src, dst)
+        elif "collection.anki21" in names or "collection.anki2" in names:
+            member = "collection.anki21" if "collection.anki21" in names else "collection.anki2"
+            with package.open(member) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            raise ValueError(f"No Anki collection found in {path}")
+
+    return sqlite3.connect(f"file:{target}?mode=ro", uri=True)
+
+
+def _is_legacy(conn: sqlite3.Connection) -> bool:
+    """Return True if the collection stores note types as JSON in the col table."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notetypes'"
+    ).fetchone()
+    return row is None
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Decode a protobuf varint starting at ``pos``; return (value, next position)."""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return result, pos
+
+
+def _decode_protobuf(data: bytes) -> dict[int, list[Any]]:
+    """Decode a protobuf message into ``{field number: [values]}`` without a schema."""
+    fields: dict[int, list[Any]] = {}
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        elif wire_type == 1:
+            value, pos = data[pos : pos + 8], pos + 8
+        elif wire_type == 5:
+            value, pos = data[pos : pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        fields.setdefault(number, []).append(value)
+    return fields
+
+
+def _proto_str(fields: dict[int, list[Any]], number: int) -> str:
+    """Return a string field from a decoded protobuf message."""
+    values = fields.get(number)
+    return values[0].decode("utf-8") if values else ""
+
+
+def read_models(conn: sqlite3.Connection) -> list[dict[str, Any]]:
+    """Read all note types in the shape AnkiConnect's ``findModelsById`` returns.
+
+    Returns:
+        List of dicts with id, name, type (0 = standard, 1 = cloze), mod, flds,
+        tmpls and css
+    """
+    if _is_legacy(conn):
+        (models_json,) = conn.execute("SELECT models FROM col").fetchone()
+        return [
+            {
+                "id": int(model["id"]),
+                "name": model["name"],
+                "type": model.get("type", 0),
+                "mod": model.get("mod", 0),
+                "flds": [{"name": f["name"], "ord": f["ord"]} for f in model["flds"]],
+                "tmpls": [
+                    {"name": t["name"], "ord": t["ord"], "qfmt": t["qfmt"], "afmt": t["afmt"]}
+                    for t in model["tmpls"]
+                ],
+                "css": model.get("css", ""),
+            }
+            for model in json.loads(models_json).values()
+        ]
+
+    models: dict[int, dict[str, Any]] = {}
+    for ntid, name, mtime, config in conn.execute(
+        "SELECT id, name, mtime_secs, config FROM notetypes"
+    ):
+        fields = _decode_protobuf(config)
+        models[ntid] = {
+            "id": ntid,
+            "name": name,
+            "type": fields.get(1, [0])[0],
+            "mod": mtime,
+            "flds": [],
+            "tmpls": [],
+            "css": _proto_str(fields, 3),
+        }
+    # Exported packages may carry field/template rows of note types they do not include
+    for ntid, ord_, name in conn.execute("SELECT ntid, ord, name FROM fields ORDER BY ntid, ord"):
+        if ntid in models:
+            models[ntid]["flds"].append({"name": name, "ord": ord_})
+    for ntid, ord_, name, config in conn.execute(
+        "SELECT ntid, ord, name, config FROM templates ORDER BY ntid, ord"
+    ):
+        if ntid not in models:
+            continue
+        fields = _decode_protobuf(config)
+        models[ntid]["tmpls"].append(
+            {
+                "name": name,
+                "ord": ord_,
+                "qfmt": _proto_str(fields, 1),
+                "afmt": _proto_str(fields, 2),
+            }
+        )
+    return list(models.values())
+
+
+def read_decks(conn: sqlite3.Connection) -> dict[str, int]:
+    """Read all decks as a mapping of ``::``-separated deck names to deck IDs."""
+    if _is_legacy(conn):
+        (decks_json,) = conn.execute("SELECT decks FROM col").fetchone()
+        return {deck["name"]: int(deck["id"]) for deck in json.loads(decks_json).values()}
+    return {
+        name.replace(FIELD_SEPARATOR, "::"): deck_id
+        for deck_id, name in conn.execute("SELECT id, name FROM decks")
+    }
+
+
+def iter_notes(conn: sqlite3.Connection) -> Iterator[dict[str, Any]]:
+    """Yield all notes with their deck (taken from the note's first card).
+
+    Yields:
+        Dicts with id, guid, mid, mod, tags, fields (list of values in field order)
+        and did
+    """
+    query = """
+        SELECT n.id, n.guid, n.mid, n.mod, n.tags, n.flds,
+               (SELECT did FROM cards WHERE nid = n.id ORDER BY ord LIMIT 1)
+        FROM notes n
+        ORDER BY n.id
+    """
+    for nid, guid, mid, mod, tags, flds, did in conn.execute(query):
+        yield {
+            "id": nid,
+            "guid": guid,
+            "mid": mid,
+            "mod": mod,
+            "tags": tags.split(),
+            "fields": flds.split(FIELD_SEPARATOR),
+            "did": did,
+        }
+
+
+def _guid() -> str:
+    """Return a random note GUID in Anki's base91 format."""
+    value, chars = secrets.randbits(64), []
+    while value:
+        value, rest = divmod(value, len(_GUID_CHARS))
+        chars.append(_GUID_CHARS[rest])
+    return "".join(reversed(chars)) or _GUID_CHARS[0]
+
+
+def _sort_text(value: str) -> str:
+    """Return a field value the way Anki stores it for sorting and checksums."""
+    return strip_html(_IMG_RE.sub(r" \1 ", value))
+
+
+def field_checksum(value: str) -> int:
+    """Return Anki's duplicate-check checksum of a first field value."""
+    return int(hashlib.sha1(_sort_text(value).encode("utf-8")).hexdigest()[:8], 16)
+
+
+def card_ords(model: dict[str, Any], values: list[str]) -> list[int]:
+    """Return the template ordinals Anki would generate cards for.
+
+    Cloze note types get one card per cloze number; standard ones get a card per
+    template whose conditional sections are satisfied and that references a
+    non-empty field.
+
+    Args:
+        model: Full note type definition (``findModelsByName`` format)
+        values: Field values in field order
+    """
+    names = [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+    by_name = dict(zip(names, values, strict=True))
+    templates = sorted(model["tmpls"], key=lambda t: t["ord"])
+    if model.get("type") == 1:
+        cloze = {name for t in templates for name in _CLOZE_FIELD_RE.findall(t["qfmt"])}
+        cloze = cloze or {names[0]}
+        numbers = {
+            int(n) for name in cloze for n in _CLOZE_NUMBER_RE.findall(by_name.get(name, ""))
+        }
+        return sorted(n - 1 for n in numbers if n > 0) or [0]
+
+    ords = []
+    for template in templates:
+        sections = _SECTION_RE.findall(template["qfmt"])
+        references = [ref.rsplit(":", 1)[-1] for ref in _REFERENCE_RE.findall(template["qfmt"])]
+        if all(by_name.get(name, "").strip() for name in sections) and any(
+            by_name.get(name, "").strip() for name in references + sections
+        ):
+            ords.append(template["ord"])
+    return ords or [templates[0]["ord"]]
+
+
+def _deck(deck_id: int, name: str, mod: int) -> dict[str, Any]:
+    """Return a legacy deck definition."""
+    return {
+        "id": deck_id,
+        "name": name,
+        "mod": mod,
+        "usn": -1,
+        "desc": "",
+        "dyn": 0,
+        "conf": 1,
+        "collapsed": False,
+        "browserCollapsed": False,
+        "extendNew": 0,
+        "extendRev": 0,
+        "newToday": [0, 0],
+        "revToday": [0, 0],
+        "lrnToday": [0, 0],
+        "timeToday": [0, 0],
+    }
+
+
+def build_package(
+    path: str | Path,
+    notes: Iterable[dict[str, Any]],
+    models: dict[str, dict[str, Any]],
+    decks: dict[str, int] | None = None,
+    media: Iterable[str | Path] = (),
+) -> list[int]:
+    """Write notes, their note types and decks, and media files to an .apkg package.
+
+    Runs without Anki and blocks, so call it in a worker thread from async code.
+    Note types keep the IDs of the given definitions so Anki maps the notes onto
+    its existing note types; decks are matched by name on import. Every note
+    gets its cards as new cards.
+
+    Args:
+        path: Package file to create
+        notes: Notes in AnkiConnect ``addNotes`` format (deckName, modelName,
+            fields, optional tags)
+        models: Full note type definitions by name (``findModelsByName`` format),
+            covering every modelName used
+        decks: Known deck IDs by name; other decks get new IDs (default: none)
+        media: Files to include under their base names
+
+    Returns:
+        ID of every note in the package, in input order
+
+    Raises:
+        KeyError: If a note uses a note type missing from ``models``
+    """
+    path = Path(path)
+    now = int(time.time())
+    next_id = int(time.time() * 1000)
+
+    def new_id() -> int:
+        nonlocal next_id
+        next_id += 1
+        return next_id
+
+    deck_ids = dict(decks or {})
+    used_decks: dict[str, int] = {}
+
+    def deck_id(name: str) -> int:
+        parts = name.split("::")
+        for i in range(1, len(parts) + 1):
+            parent = "::".join(parts[:i])
+            if parent not in used_decks:
+                used_decks[parent] = deck_ids.get(parent) or new_id()
+        return used_decks[name]
+
+    with tempfile.TemporaryDirectory(prefix="anki-mcp-") as workdir:
+        collection = Path(workdir) / "collection.anki2"
+        conn = sqlite3.connect(collection)
+        try:
+            conn.executescript(_SCHEMA)
+            note_ids: list[int] = []
+            used_models: dict[str, dict[str, Any]] = {}
+            for position, note in enumerate(notes):
+                model = models[note["modelName"]]
+                used_models[model["name"]] = model
+                names = [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+                given = {name.lower(): value for name, value in (note.get("fields") or {}).items()}
+                values = [given.get(name.lower(), "") for name in names]
+                sort_value = values[min(model.get("sortf", 0), len(values) - 1)]
+                tags = note.get("tags") or []
+
+                note_id = new_id()
+                note_ids.append(note_id)
+                conn.execute(
+                    "INSERT INTO notes VALUES (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')",
+                    (
+                        note_id,
+                        _guid(),
+                        model["id"],
+                        now,
+                        f" {' '.join(tags)} " if tags else "",
+                        FIELD_SEPARATOR.join(values),
+                        _sort_text(sort_value),
+                        field_checksum(values[0]),
+                    ),
+                )
+                did = deck_id(note["deckName"])
+                conn.executemany(
+                    "INSERT INTO cards VALUES (?, ?, ?, ?, ?, -1, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+                    [
+                        (new_id(), note_id, did, ord_, now, position + 1)
+                        for ord_ in card_ords(model, values)
+                    ],
+                )
+
+            deck_json = {str(i): _deck(i, name, now) for name, i in used_decks.items()}
+            deck_json.setdefault("1", _deck(1, "Default", now))
+            conn.execute(
+                "INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, '{}', ?, ?, ?, '{}')",
+                (
+                    now,
+                    now * 1000,
+                    now * 1000,
+                    json.dumps({str(m["id"]): m for m in used_models.values()}),
+                    json.dumps(deck_json),
+                    json.dumps({"1": _DECK_CONFIG}),
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        media_map: dict[str, str] = {}
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+            package.write(collection, "collection.anki2")
+            for i, file in enumerate(media):
+                package.write(file, str(i))
+                media_map[str(i)] = Path(file).name
+            package.writestr("media", json.dumps(media_map))
+    return note_ids
@@ -0,0 +1,353 @@
+"""Chunked, pipelined bulk writes of notes."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from anki_mcp_server.client import AnkiClient, AnkiConnectError
+
+logger = logging.getLogger(__name__)
+
+# Called with (notes processed, total notes or None) after every chunk
+ProgressCallback = Callable[[int, int | None], Awaitable[None]]
+
+# Called with (note, note ID) for every created note
+CreatedCallback = Callable[[dict[str, Any], int], Awaitable[None]]
+
+
+@dataclass
+class RejectedNote:
+    """Input item that failed before import and is reported without being sent.
+
+    Attributes:
+        error: Why the note was rejected
+    """
+
+    error: str
+
+
+class ChunkSizer:
+    """Chooses the next ``addNotes`` chunk size from measured Anki latency.
+
+    After each chunk the size moves halfway towards the number of notes that
+    would take ``target_seconds`` at the observed per-note latency, growing at
+    most twofold per step.
+
+    Args:
+        initial: First chunk size (default: 50)
+        minimum: Smallest chunk size (default: 10)
+        maximum: Largest chunk size (default: 1000)
+        target_seconds: Desired duration of one ``addNotes`` call (default: 2.0)
+    """
+
+    def __init__(
+        self,
+        initial: int = 50,
+        minimum: int = 10,
+        maximum: int = 1000,
+        target_seconds: float = 2.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.size = max(minimum, min(maximum, initial))
+
+    def observe(self, count: int, elapsed: float) -> None:
+        """Adjust the chunk size after ``count`` notes took ``elapsed`` seconds."""
+        if count <= 0:
+            return
+        per_note = max(elapsed, 1e-6) / count
+        ideal = self.target_seconds / per_note
+        size = min((self.size + ideal) / 2, self.size * 2)
+        self.size = max(self.minimum, min(self.maximum, int(size)))
+
+
+@dataclass
+class ImportResult:
+    """Outcome of a bulk import.
+
+    Attributes:
+        note_ids: Created note ID per input index (None for failed or skipped notes)
+        errors: Error message per failed input index
+        chunks: Number of ``addNotes`` calls made
+        elapsed: Wall-clock seconds of the import
+        stopped: Whether the import stopped early because of ``stop_on_error``
+    """
+
+    note_ids: list[int | None] = field(default_factory=list)
+    errors: dict[int, str] = field(default_factory=dict)
+    chunks: int = 0
+    elapsed: float = 0.0
+    stopped: bool = False
+
+    @property
+    def created(self) -> list[int]:
+        """IDs of the notes that were created."""
+        return [note_id for note_id in self.note_ids if note_id is not None]
+
+    def summary(self, include_note_ids: bool = True) -> dict[str, Any]:
+        """Return a compact summary: counts, failures by index and optionally all note IDs."""
+        created = len(self.created)
+        result: dict[str, Any] = {
+            "total": len(self.note_ids),
+            "created": created,
+            "failed": len(self.errors),
+            "skipped": len(self.note_ids) - created - len(self.errors),
+            "chunks": self.chunks,
+            "elapsedSeconds": round(self.elapsed, 3),
+            "stopped": self.stopped,
+            "failures": [
+                {"index": index, "error": error} for index, error in sorted(self.errors.items())
+            ],
+        }
+        if include_note_ids:
+            result["noteIds"] = self.note_ids
+        return result
+
+
+class BulkImporter:
+    """Adds any number of notes through chunked ``addNotes`` calls.
+
+    Notes are pulled lazily from the input, so it may be a generator over a
+    file. Up to ``depth`` chunks are in flight at once: Anki still executes them
+    one after another, but the next chunk is already encoded and sent while the
+    current one runs. A chunk whose ``addNotes`` call fails as a whole is
+    reported as failed note by note. ``RejectedNote`` items take up an index
+    and count as failures but are never sent.
+
+    Args:
+        client: AnkiConnect client instance
+        sizer: Chunk size policy (default: ChunkSizer())
+        depth: Maximum number of chunks in flight (default: 2)
+        on_created: Awaited with every created note and its ID
+    """
+
+    def __init__(
+        self,
+        client: AnkiClient,
+        sizer: ChunkSizer | None = None,
+        depth: int = 2,
+        on_created: CreatedCallback | None = None,
+    ):
+        self.client = client
+        self.sizer = sizer or ChunkSizer()
+        self.depth = depth
+        self.on_created = on_created
+
+    async def run(
+        self,
+        notes: Iterable[dict[str, Any] | RejectedNote]
+        | AsyncIterable[dict[str, Any] | RejectedNote],
+        total: int | None = None,
+        progress: ProgressCallback | None = None,
+        stop_on_error: bool = False,
+    ) -> ImportResult:
+        """Import notes in AnkiConnect ``addNotes`` format.
+
+        Args:
+            notes: Notes to add (or RejectedNote placeholders), in order
+            total: Number of notes if known, passed on to ``progress``
+            progress: Awaited after every chunk with the number of notes processed
+            stop_on_error: Send no further chunks once a note failed
+
+        Returns:
+            ImportResult indexed like the input
+        """
+        result = ImportResult()
+        source = _aiter(notes)
+        pull_lock = asyncio.Lock()
+        exhausted = False
+        processed = 0
+        start = time.perf_counter()
+
+        async def take() -> tuple[int, list[dict[str, Any] | RejectedNote]]:
+            nonlocal exhausted
+            async with pull_lock:
+                chunk: list[dict[str, Any] | RejectedNote] = []
+                if exhausted or result.stopped:
+                    return len(result.note_ids), chunk
+                size = self.sizer.size
+                async for note in source:
+                    chunk.append(note)
+                    if len(chunk) >= size:
+                        break
+                else:
+                    exhausted = True
+                offset = len(result.note_ids)
+                result.note_ids.extend([None] * len(chunk))
+                return offset, chunk
+
+        async def worker() -> None:
+            nonlocal processed
+            while True:
+                offset, chunk = await take()
+                if not chunk:
+                    return
+                failed = False
+                for i, note in enumerate(chunk):
+                    if isinstance(note, RejectedNote):
+                        result.errors[offset + i] = note.error
+                        failed = True
+                indexes = [i for i, note in enumerate(chunk) if not isinstance(note, RejectedNote)]
+                if indexes:
+                    chunk_start = time.perf_counter()
+                    try:
+                        note_ids = await self.client.add_notes([chunk[i] for i in indexes])
+                    except AnkiConnectError as e:
+                        logger.warning(
+                            f"addNotes failed for notes {offset}-{offset + len(chunk) - 1}: {e}"
+                        )
+                        note_ids = [None] * len(indexes)
+                        message = str(e)
+                    else:
+                        self.sizer.observe(len(indexes), time.perf_counter() - chunk_start)
+                        message = "Failed to create note"
+                    result.chunks += 1
+
+                    for i, note_id in zip(indexes, note_ids, strict=True):
+                        result.note_ids[offset + i] = note_id
+                        if note_id is None:
+                            result.errors[offset + i] = message
+                            failed = True
+                        elif self.on_created is not None:
+                            await self.on_created(chunk[i], note_id)
+                if stop_on_error and failed:
+                    result.stopped = True
+
+                processed += len(chunk)
+                if progress is not None:
+                    await progress(processed, total)
+
+        await asyncio.gather(*(worker() for _ in range(self.depth)))
+        if result.stopped and total is not None and total > len(result.note_ids):
+            # Notes never sent after stopping count as skipped
+            result.note_ids.extend([None] * (total - len(result.note_ids)))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+
+async def _aiter(items: Iterable[Any] | AsyncIterable[Any]) -> AsyncIterator[Any]:
+    """Iterate a sync or async iterable asynchronously."""
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def update_actions(
+    updates: list[dict[str, Any]], start: int = 0
+) -> tuple[list[dict[str, Any]], list[int], dict[int, str]]:
+    """Turn note updates into ``updateNoteFields`` and ``updateNoteTags`` actions.
+
+    Args:
+        updates: Updates as ``{"id": note ID, "fields": {...}, "tags": [...]}``
+        start: Index of the first update, used in the returned owners and errors
+
+    Returns:
+        The actions, the index of the update each action belongs to, and errors
+        of updates that have nothing to update
+    """
+    actions: list[dict[str, Any]] = []
+    owners: list[int] = []
+    errors: dict[int, str] = {}
+    for index, update in enumerate(updates, start):
+        if update.get("fields") is None and update.get("tags") is None:
+            errors[index] = "Nothing to update: give fields and/or tags"
+            continue
+        if update.get("fields") is not None:
+            note = {"id": update["id"], "fields": update["fields"]}
+            actions.append({"action": "updateNoteFields", "params": {"note": note}})
+            owners.append(index)
+        if update.get("tags") is not None:
+            params = {"note": update["id"], "tags": " ".join(update["tags"])}
+            actions.append({"action": "updateNoteTags", "params": params})
+            owners.append(index)
+    return actions, owners, errors
+
+
+async def update_notes(
+    client: AnkiClient,
+    updates: list[dict[str, Any]],
+    chunk_size: int = 50,
+    concurrency: int = 4,
+) -> list[dict[str, Any]]:
+    """Update the fields and tags of many notes through chunked ``multi`` requests.
+
+    Every update becomes an ``updateNoteFields`` and/or ``updateNoteTags``
+    action. The actions of ``chunk_size`` updates share one ``multi`` request, and
+    at most ``concurrency`` requests are in flight.
+
+    Args:
+        client: AnkiConnect client instance
+        updates: Updates as ``{"id": note ID, "fields": {...}, "tags": [...]}``;
+            fields and tags are optional, tags replace all existing tags
+        chunk_size: Updates per ``multi`` request (default: 50)
+        concurrency: Maximum number of requests in flight (default: 4)
+
+    Returns:
+        Per update, in order: index, noteId, success and the first error if any
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[dict[str, Any]] = [{} for _ in updates]
+
+    async def send(start: int) -> None:
+        chunk = list(enumerate(updates[start : start + chunk_size], start))
+        actions, owners, errors = update_actions(updates[start : start + chunk_size], start)
+        if actions:
+            async with semaphore:
+                try:
+                    outcomes = await client.multi(actions)
+                except AnkiConnectError as e:
+                    outcomes = [e] * len(actions)
+            for index, outcome in zip(owners, outcomes, strict=True):
+                if isinstance(outcome, AnkiConnectError):
+                    errors.setdefault(index, str(outcome))
+
+        for index, update in chunk:
+            result: dict[str, Any] = {
+                "index": index,
+                "noteId": update["id"],
+                "success": index not in errors,
+            }
+            if index in errors:
+                result["error"] = errors[index]
+            results[index] = result
+
+    await asyncio.gather(*(send(start) for start in range(0, len(updates), chunk_size)))
+    return results
+
+
+async def run_chunked(
+    ids: list[int],
+    call: Callable[[list[int]], Awaitable[Any]],
+    chunk_size: int = 1000,
+    concurrency: int = 2,
+) -> int:
+    """Apply an AnkiConnect call to IDs in chunks, with at most ``concurrency`` in flight.
+
+    Args:
+        ids: Note or card IDs
+        call: Awaited with each chunk of IDs
+        chunk_size: IDs per call (default: 1000)
+        concurrency: Maximum number of calls in flight (default: 2)
+
+    Returns:
+        Number of calls made
+
+    Raises:
+        AnkiConnectError: If a call fails; chunks sent before it stay applied
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(chunk: list[int]) -> None:
+        async with semaphore:
+            await call(chunk)
+
+    chunks = [ids[start : start + chunk_size] for start in range(0, len(ids), chunk_size)]
+    await asyncio.gather(*(send(chunk) for chunk in chunks))
+    return len(chunks)
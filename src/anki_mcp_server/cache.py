@@ -0,0 +1,93 @@
+"""Bounded TTL cache for Anki metadata."""
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class MetadataCache:
+    """LRU cache with per-key expiry.
+
+    Entries are evicted least-recently-used first once ``max_entries`` is reached,
+    and each entry expires after its own TTL. With ``stale_ttl`` set, an expired
+    entry stays available through ``get_stale`` for that many extra seconds so
+    callers can serve it while refreshing in the background.
+
+    Args:
+        max_entries: Maximum number of cached entries (default: 256)
+        default_ttl: TTL in seconds for entries stored without one (default: 300)
+        stale_ttl: Seconds past expiry an entry may still be served stale (default: 0)
+    """
+
+    def __init__(self, max_entries: int = 256, default_ttl: float = 300.0, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for ``key``, or None if missing or expired."""
+        found = self._lookup(key, allow_stale=False)
+        return None if found is None else found[0]
+
+    def get_stale(self, key: str) -> tuple[Any, bool] | None:
+        """Return ``(value, fresh)`` for ``key``, including entries within the stale window.
+
+        Returns None if the key is missing or past its stale window.
+        """
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key: str, allow_stale: bool) -> tuple[Any, bool] | None:
+        """Look up ``key``, dropping it once it is past its stale window."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            now = time.monotonic()
+            if now < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, True
+            if now < expires_at + self.stale_ttl:
+                if allow_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return value, False
+            else:
+                del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds (default: ``default_ttl``)."""
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop the given keys if present."""
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits + self.stale_hits) / lookups if lookups else None,
+        }
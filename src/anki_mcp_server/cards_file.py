@@ -0,0 +1,81 @@
+"""Streaming reader for card files (a JSON array or NDJSON)."""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+# Characters read from disk at a time
+READ_SIZE = 1 << 16
+
+# Longest single item accepted, so a syntax error cannot pull the whole file into memory
+MAX_ITEM_SIZE = 16 << 20
+
+
+class CardsFileError(ValueError):
+    """Raised when a cards file is not valid JSON or NDJSON."""
+
+    pass
+
+
+def iter_json_values(path: str | Path, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """Yield the items of a JSON array, or the values of an NDJSON file, one by one.
+
+    Only one read buffer plus the current item is held in memory, so files of
+    any size can be imported.
+
+    Args:
+        path: File holding a top-level JSON array or whitespace-separated JSON values
+        read_size: Characters read from disk at a time
+
+    Raises:
+        CardsFileError: At the first malformed value, with its character offset
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8-sig") as f:
+        buffer, pos, consumed, eof = "", 0, 0, False
+        separators = " \t\r\n"
+        in_array: bool | None = None
+
+        def fill() -> None:
+            nonlocal buffer, pos, consumed, eof
+            chunk = f.read(read_size)
+            eof = not chunk
+            consumed += pos
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in separators:
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    if in_array:
+                        raise CardsFileError("Unterminated JSON array")
+                    return
+                fill()
+                continue
+
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                if in_array:
+                    pos += 1
+                    separators += ","
+                    continue
+            elif in_array and buffer[pos] == "]":
+                return
+
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if not eof and len(buffer) - pos <= MAX_ITEM_SIZE:
+                    fill()
+                    continue
+                raise CardsFileError(
+                    f"Invalid JSON at character {consumed + e.pos}: {e.msg}"
+                ) from e
+            if end == len(buffer) and not eof:
+                # A number or literal may continue in the next read
+                fill()
+                continue
+            pos = end
+            yield value
@@ -1,10 +1,16 @@
 """AnkiConnect client wrapper - Anti-corruption layer for Anki API."""
 
+import asyncio
+import json
 import os
+import time
 from typing import Any
 
 import httpx
 
+from anki_mcp_server.health import CircuitOpenError, ConnectionState
+from anki_mcp_server.metrics import Metrics, count_round_trip
+
 
 class AnkiConnectError(Exception):
     """Exception raised when AnkiConnect API returns an error."""
@@ -12,6 +18,39 @@ class AnkiConnectError(Exception):
     pass
 
 
+class AnkiUnavailableError(AnkiConnectError):
+    """Raised when a request did not reach AnkiConnect or got no AnkiConnect answer.
+
+    Unlike an error returned by Anki, the request may simply be retried later.
+    """
+
+    pass
+
+
+# Idempotent actions whose identical concurrent calls may share one request
+READ_ACTIONS = frozenset(
+    {
+        "version",
+        "deckNames",
+        "deckNamesAndIds",
+        "modelNames",
+        "modelNamesAndIds",
+        "modelFieldNames",
+        "modelTemplates",
+        "modelStyling",
+        "findModelsById",
+        "findModelsByName",
+        "findNotes",
+        "findCards",
+        "notesInfo",
+        "notesModTime",
+        "cardsInfo",
+        "getDecks",
+        "canAddNotes",
+    }
+)
+
+
 class AnkiClient:
     """Client for communicating with AnkiConnect API.
 
@@ -21,19 +60,54 @@ class AnkiClient:
     Args:
         url: AnkiConnect URL (default: http://localhost:8765, or from ANKI_CONNECT_PORT env var)
         timeout: Request timeout in seconds (default: 30)
+        batch_window_us: Opt-in request coalescing window in microseconds. Calls issued
+            within the window are sent as a single AnkiConnect ``multi`` request; 0 batches
+            calls issued in the same event-loop tick. None disables batching (default: from
+            ANKI_MCP_BATCH_WINDOW_US env var, unset = disabled)
+        max_batch_size: Maximum number of actions per ``multi`` request (default: 100)
+        health: Connection state tracker shared with callers (default: new ConnectionState)
+        single_flight: Share one in-flight request between identical concurrent calls to
+            read-only actions (default: True). Callers then receive the same result object
+            and must not mutate it.
+        metrics: Per-action call, latency and payload size counters (default: new Metrics)
     """
 
-    def __init__(self, url: str | None = None, timeout: float = 30.0):
+    def __init__(
+        self,
+        url: str | None = None,
+        timeout: float = 30.0,
+        batch_window_us: int | None = None,
+        max_batch_size: int = 100,
+        health: ConnectionState | None = None,
+        single_flight: bool = True,
+        metrics: Metrics | None = None,
+    ):
         if url is None:
             port = os.environ.get("ANKI_CONNECT_PORT", "8765")
             url = f"http://localhost:{port}"
+        if batch_window_us is None and os.environ.get("ANKI_MCP_BATCH_WINDOW_US"):
+            batch_window_us = int(os.environ["ANKI_MCP_BATCH_WINDOW_US"])
         self.url = url
         self.timeout = timeout
+        self.batch_window_us = batch_window_us
+        self.max_batch_size = max_batch_size
+        self.health = health or ConnectionState()
+        self.single_flight = single_flight
+        self.metrics = metrics or Metrics()
         self._client = httpx.AsyncClient(timeout=timeout)
+        self._pending: list[tuple[dict[str, Any], asyncio.Future[Any]]] = []
+        self._flush_task: asyncio.Task[None] | None = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._inflight: dict[str, asyncio.Task[Any]] = {}
 
     async def _invoke(self, action: str, **params: Any) -> Any:
         """Invoke AnkiConnect API action.
 
+        Every call is recorded in ``self.metrics``. Identical concurrent calls to
+        read-only actions share one in-flight request.
+        When batching is enabled the call is queued and sent together with other
+        calls issued in the same window as one ``multi`` request.
+
         Args:
             action: AnkiConnect action name
             **params: Action parameters
@@ -44,21 +118,141 @@ class AnkiClient:
         Raises:
             AnkiConnectError: If request fails or returns error
         """
-        payload = {"action": action, "version": 6}
+        payload: dict[str, Any] = {"action": action, "version": 6}
         if params:
             payload["params"] = params
 
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await self._call(action, payload)
+            failed = False
+            return result
+        finally:
+            self.metrics.record_action(action, time.perf_counter() - start, error=failed)
+
+    async def _call(self, action: str, payload: dict[str, Any]) -> Any:
+        """Send a call, sharing the in-flight request of identical read calls."""
+        if not self.single_flight or action not in READ_ACTIONS:
+            return await self._dispatch(payload)
+
+        key = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._spawn(self._dispatch(payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller's cancellation does not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _dispatch(self, payload: dict[str, Any]) -> Any:
+        """Send a request directly or queue it for the next ``multi`` batch."""
+        if self.batch_window_us is None:
+            return self._unwrap(await self._post(payload))
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending.append((payload, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._spawn(self._send_batch(self._take_pending()))
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_later())
+        return await future
+
+    async def _post(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Send one request to AnkiConnect and return the decoded response body.
+
+        The outcome is reported to ``self.health``; while its circuit is open the
+        request fails immediately instead of waiting for the HTTP timeout.
+
+        Raises:
+            AnkiUnavailableError: If the HTTP request fails, the response is not
+                JSON or the circuit is open
+        """
+        try:
+            self.health.before_request()
+        except CircuitOpenError as e:
+            raise AnkiUnavailableError(str(e)) from e
+
+        count_round_trip()
         try:
             response = await self._client.post(self.url, json=payload)
             response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.health.record_failure(e)
+            raise AnkiUnavailableError(f"Failed to connect to AnkiConnect: {e}") from e
+        try:
             data = response.json()
+        except ValueError as e:
+            # Something other than AnkiConnect answered on this port
+            self.health.record_failure(e)
+            raise AnkiUnavailableError(f"AnkiConnect returned a non-JSON response: {e}") from e
+
+        self.health.record_success()
+        self.metrics.record_transfer(
+            payload["action"], len(response.request.content), len(response.content)
+        )
+        return data
+
+    @staticmethod
+    def _unwrap(data: Any) -> Any:
+        """Return the result of an AnkiConnect response or raise its error."""
+        if not isinstance(data, dict):
+            return data
+        if data.get("error"):
+            raise AnkiConnectError(data["error"])
+        return data.get("result")
+
+    def _spawn(self, coro: Any) -> asyncio.Task[Any]:
+        """Run a coroutine in the background, keeping a reference until it finishes."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _take_pending(self) -> list[tuple[dict[str, Any], asyncio.Future[Any]]]:
+        """Detach the queued calls and cancel the window timer that would have sent them."""
+        batch, self._pending = self._pending, []
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        return batch
+
+    async def _flush_later(self) -> None:
+        """Wait for the batching window to close, then send everything queued so far."""
+        await asyncio.sleep(self.batch_window_us / 1_000_000)
+        await self._send_batch(self._take_pending())
+
+    async def _send_batch(self, batch: list[tuple[dict[str, Any], asyncio.Future[Any]]]) -> None:
+        """Send queued calls as one ``multi`` request and resolve each caller's future."""
+        if len(batch) == 1:
+            request = batch[0][0]
+        else:
+            request = {
+                "action": "multi",
+                "version": 6,
+                "params": {"actions": [payload for payload, _ in batch]},
+            }
 
-            if data.get("error"):
-                raise AnkiConnectError(data["error"])
-
-            return data.get("result")
-        except httpx.HTTPError as e:
-            raise AnkiConnectError(f"Failed to connect to AnkiConnect: {e}")
+        try:
+            data = await self._post(request)
+            results = [data] if len(batch) == 1 else self._unwrap(data)
+            if not isinstance(results, list) or len(results) != len(batch):
+                raise AnkiConnectError("Malformed multi response from AnkiConnect")
+        except Exception as e:
+            # Fail every caller with the original error; an unresolved future
+            # would leave its caller waiting forever
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), item in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            try:
+                future.set_result(self._unwrap(item))
+            except AnkiConnectError as e:
+                future.set_exception(e)
 
     async def check_connection(self) -> None:
         """Verify Anki is running and AnkiConnect is available.
@@ -87,6 +281,14 @@ class AnkiClient:
         """
         return await self._invoke("createDeck", deck=name)
 
+    async def get_deck_names_and_ids(self) -> dict[str, int]:
+        """Map all deck names to their IDs.
+
+        Returns:
+            Dictionary of deck names to deck IDs
+        """
+        return await self._invoke("deckNamesAndIds")
+
     async def get_model_names(self) -> list[str]:
         """List all note type (model) names.
 
@@ -95,6 +297,36 @@ class AnkiClient:
         """
         return await self._invoke("modelNames")
 
+    async def get_model_names_and_ids(self) -> dict[str, int]:
+        """Map all note type (model) names to their IDs.
+
+        Returns:
+            Dictionary of note type names to model IDs
+        """
+        return await self._invoke("modelNamesAndIds")
+
+    async def find_models_by_id(self, model_ids: list[int]) -> list[dict[str, Any]]:
+        """Get full model definitions, including fields, templates, CSS and mod time.
+
+        Args:
+            model_ids: List of model IDs
+
+        Returns:
+            List of model dictionaries as stored by Anki
+        """
+        return await self._invoke("findModelsById", modelIds=model_ids)
+
+    async def find_models_by_name(self, model_names: list[str]) -> list[dict[str, Any]]:
+        """Get full model definitions by note type name.
+
+        Args:
+            model_names: List of note type names
+
+        Returns:
+            List of model dictionaries as stored by Anki
+        """
+        return await self._invoke("findModelsByName", modelNames=model_names)
+
     async def get_model_field_names(self, model_name: str) -> list[str]:
         """Get field names for a note type.
 
@@ -198,6 +430,28 @@ class AnkiClient:
         """
         return await self._invoke("notesInfo", notes=note_ids)
 
+    async def notes_mod_time(self, note_ids: list[int]) -> list[dict[str, int]]:
+        """Get the modification time of notes.
+
+        Args:
+            note_ids: List of note IDs
+
+        Returns:
+            List of dictionaries with noteId and mod (seconds since epoch)
+        """
+        return await self._invoke("notesModTime", notes=note_ids)
+
+    async def get_decks(self, card_ids: list[int]) -> dict[str, list[int]]:
+        """Get the decks of cards.
+
+        Args:
+            card_ids: List of card IDs
+
+        Returns:
+            Dictionary of deck names to the given card IDs they contain
+        """
+        return await self._invoke("getDecks", cards=card_ids)
+
     async def update_note_fields(self, note_id: int, fields: dict[str, str]) -> None:
         """Update note fields.
 
@@ -225,6 +479,79 @@ class AnkiClient:
         """
         await self._invoke("deleteNotes", notes=note_ids)
 
+    async def find_cards(self, query: str) -> list[int]:
+        """Search for cards using Anki query syntax.
+
+        Args:
+            query: Anki search query
+
+        Returns:
+            List of card IDs
+        """
+        return await self._invoke("findCards", query=query)
+
+    async def add_tags(self, note_ids: list[int], tags: list[str]) -> None:
+        """Add tags to notes, keeping their existing tags.
+
+        Args:
+            note_ids: List of note IDs
+            tags: Tags to add
+        """
+        await self._invoke("addTags", notes=note_ids, tags=" ".join(tags))
+
+    async def remove_tags(self, note_ids: list[int], tags: list[str]) -> None:
+        """Remove tags from notes.
+
+        Args:
+            note_ids: List of note IDs
+            tags: Tags to remove
+        """
+        await self._invoke("removeTags", notes=note_ids, tags=" ".join(tags))
+
+    async def replace_tags(self, note_ids: list[int], tag: str, replacement: str) -> None:
+        """Rename a tag on notes.
+
+        Args:
+            note_ids: List of note IDs
+            tag: Tag to replace
+            replacement: Tag to put in its place
+        """
+        await self._invoke(
+            "replaceTags", notes=note_ids, tag_to_replace=tag, replace_with_tag=replacement
+        )
+
+    async def change_deck(self, card_ids: list[int], deck: str) -> None:
+        """Move cards to a deck, creating the deck if it does not exist.
+
+        Args:
+            card_ids: List of card IDs
+            deck: Target deck name
+        """
+        await self._invoke("changeDeck", cards=card_ids, deck=deck)
+
+    async def store_media_file(self, filename: str, data: str) -> str:
+        """Store a file in Anki's media folder, replacing a file of the same name.
+
+        Args:
+            filename: Media file name
+            data: Base64-encoded file content
+
+        Returns:
+            Name the file was stored under
+        """
+        return await self._invoke("storeMediaFile", filename=filename, data=data)
+
+    async def import_package(self, path: str) -> bool:
+        """Import an .apkg package in one operation.
+
+        Args:
+            path: Package path as seen by Anki (absolute, or relative to its media folder)
+
+        Returns:
+            True if the package was imported
+        """
+        return await self._invoke("importPackage", path=path)
+
     async def can_add_notes(self, notes: list[dict[str, Any]]) -> list[bool]:
         """Check if notes can be added (duplicate detection).
 
@@ -236,6 +563,28 @@ class AnkiClient:
         """
         return await self._invoke("canAddNotes", notes=notes)
 
+    async def multi(self, actions: list[dict[str, Any]]) -> list[Any]:
+        """Run several actions in one ``multi`` request.
+
+        Args:
+            actions: Actions as ``{"action": name, "params": {...}}``
+
+        Returns:
+            Per action its result, or the AnkiConnectError it failed with
+        """
+        results = await self._invoke(
+            "multi", actions=[{"version": 6, **action} for action in actions]
+        )
+        if not isinstance(results, list) or len(results) != len(actions):
+            raise AnkiConnectError("Malformed multi response from AnkiConnect")
+        unwrapped: list[Any] = []
+        for item in results:
+            try:
+                unwrapped.append(self._unwrap(item))
+            except AnkiConnectError as e:
+                unwrapped.append(e)
+        return unwrapped
+
     async def close(self) -> None:
         """Close the HTTP client."""
         await self._client.aclose()
@@ -0,0 +1,191 @@
+"""Local index of first-field values for duplicate checks before notes are sent."""
+
+import asyncio
+import hashlib
+import re
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from anki_mcp_server.resources import ResourceHandler
+from anki_mcp_server.shaping import strip_html
+
+# Image tags keep their file name when HTML is stripped, like Anki's duplicate check
+_IMG_RE = re.compile(r"<img[^>]*?src=[\"']?([^\"'>\s]+)[^>]*>", re.IGNORECASE)
+
+# (model, deck) key of an index; deck None covers the whole collection
+IndexKey = tuple[str, str | None]
+
+
+def first_field_hash(value: str) -> bytes:
+    """Hash a first-field value after the normalization Anki applies for duplicates."""
+    text = strip_html(_IMG_RE.sub(r" \1 ", value))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _quote(term: str) -> str:
+    """Quote a search term, escaping double quotes."""
+    return '"' + term.replace('"', '\\"') + '"'
+
+
+class DuplicateIndex:
+    """Hash index of normalized first fields per note type and deck.
+
+    Notes are checked the way AnkiConnect checks them: against all notes of the
+    same type, or only those in the same deck when ``duplicateScope`` is
+    ``"deck"``. Each (type, deck) index is built on first use with one search
+    plus ``notesInfo`` and is updated as notes are created through this server.
+    Changes made in Anki directly are picked up when an index is rebuilt after
+    ``max_age`` seconds; until then Anki still rejects duplicates the index
+    misses.
+
+    Args:
+        resources: Resource handler providing cached field names
+        find_notes: Returns the note IDs matching an Anki search
+        notes_info: Returns notes in ``notesInfo`` format
+        get_decks: Returns card IDs by deck name for card IDs (``getDecks``)
+        max_age: Seconds before an index is rebuilt (default: 300)
+        chunk_size: Notes per ``notes_info`` call while building (default: 500)
+    """
+
+    def __init__(
+        self,
+        resources: ResourceHandler,
+        find_notes: Callable[[str], Awaitable[list[int]]],
+        notes_info: Callable[[list[int]], Awaitable[list[dict[str, Any]]]],
+        get_decks: Callable[[list[int]], Awaitable[dict[str, list[int]]]],
+        max_age: float = 300.0,
+        chunk_size: int = 500,
+    ):
+        self.resources = resources
+        self.find_notes = find_notes
+        self.notes_info = notes_info
+        self.get_decks = get_decks
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self._indexes: dict[IndexKey, dict[bytes, int]] = {}
+        self._built_at: dict[IndexKey, float] = {}
+        self._locks: dict[IndexKey, asyncio.Lock] = {}
+
+    async def check(self, notes: list[dict[str, Any]]) -> list[dict[str, int] | None]:
+        """Find duplicates among notes in AnkiConnect format.
+
+        Notes allowing duplicates are skipped.
+
+        Returns:
+            Per note None, ``{"duplicateOf": note ID}`` for an existing note, or
+            ``{"duplicateOfIndex": i}`` for an earlier note in the same list
+        """
+        results: list[dict[str, int] | None] = [None] * len(notes)
+        seen: dict[tuple[IndexKey, bytes], int] = {}
+        for i, note in enumerate(notes):
+            key = self._key(note)
+            digest = await self._digest(note) if key is not None else None
+            if key is None or digest is None:
+                continue
+            index = await self._index(key)
+            if digest in index:
+                results[i] = {"duplicateOf": index[digest]}
+            elif (key, digest) in seen:
+                results[i] = {"duplicateOfIndex": seen[(key, digest)]}
+            else:
+                seen[(key, digest)] = i
+        return results
+
+    async def add(self, note: dict[str, Any], note_id: int) -> None:
+        """Record a note created through this server in the loaded indexes."""
+        digest = await self._digest(note)
+        if digest is None:
+            return
+        for key in ((note["modelName"], None), (note["modelName"], note["deckName"])):
+            index = self._indexes.get(key)
+            if index is not None:
+                index.setdefault(digest, note_id)
+
+    def forget(self, note_ids: list[int]) -> None:
+        """Drop notes that were changed or deleted through this server."""
+        dropped = set(note_ids)
+        for index in self._indexes.values():
+            for digest in [d for d, note_id in index.items() if note_id in dropped]:
+                del index[digest]
+
+    def clear(self) -> None:
+        """Drop all indexes so they are rebuilt on next use."""
+        self._indexes.clear()
+        self._built_at.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the number of indexes and the values they hold."""
+        return {
+            "indexes": len(self._indexes),
+            "entries": sum(len(index) for index in self._indexes.values()),
+        }
+
+    @staticmethod
+    def _key(note: dict[str, Any]) -> IndexKey | None:
+        options = note.get("options") or {}
+        if options.get("allowDuplicate") or not note.get("modelName"):
+            return None
+        if options.get("duplicateScope") == "deck":
+            return note["modelName"], note.get("deckName")
+        return note["modelName"], None
+
+    async def _digest(self, note: dict[str, Any]) -> bytes | None:
+        """Hash the note's first field, or return None if it has none or an unknown type."""
+        if note["modelName"] not in await self.resources.get_note_types():
+            return None
+        schema = await self.resources.get_model_schema(note["modelName"])
+        first = schema["fields"][0].lower()
+        fields = note.get("fields") or {}
+        value = next((v for k, v in fields.items() if k.lower() == first), "")
+        return first_field_hash(value) if value.strip() else None
+
+    async def _index(self, key: IndexKey) -> dict[bytes, int]:
+        """Return the index for a (model, deck) key, building it if missing or stale."""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            built_at = self._built_at.get(key)
+            if built_at is None or time.monotonic() - built_at > self.max_age:
+                self._indexes[key] = await self._build(*key)
+                self._built_at[key] = time.monotonic()
+            return self._indexes[key]
+
+    async def _build(self, model_name: str, deck: str | None) -> dict[bytes, int]:
+        query = _quote(f"note:{model_name}")
+        if deck is not None:
+            query += f" {_quote(f'deck:{deck}')} -{_quote(f'deck:{deck}::*')}"
+        note_ids = await self.find_notes(query)
+        first = (await self.resources.get_model_schema(model_name))["fields"][0]
+
+        index: dict[bytes, int] = {}
+        for start in range(0, len(note_ids), self.chunk_size):
+            notes = await self.notes_info(note_ids[start : start + self.chunk_size])
+            in_deck = await self._cards_in_deck(notes, deck) if deck is not None else set()
+            for note in notes:
+                # Search wildcards in the names may match other note types and decks
+                if not note or note["modelName"] != model_name:
+                    continue
+                if deck is not None and in_deck.isdisjoint(note.get("cards", [])):
+                    continue
+                field = note["fields"].get(first)
+                if field and field["value"].strip():
+                    index.setdefault(first_field_hash(field["value"]), note["noteId"])
+        return index
+
+    async def _cards_in_deck(self, notes: list[dict[str, Any]], deck: str) -> set[int]:
+        """Return the IDs of the notes' cards that are in exactly ``deck``."""
+        cards = [card_id for note in notes if note for card_id in note.get("cards", [])]
+        decks = await self.get_decks(cards) if cards else {}
+        return {
+            card_id
+            for name, card_ids in decks.items()
+            if name.casefold() == deck.casefold()
+            for card_id in card_ids
+        }
+
+
+def duplicate_error(duplicate: dict[str, int]) -> str:
+    """Describe a duplicate reported by ``DuplicateIndex.check``."""
+    if "duplicateOf" in duplicate:
+        return f"Duplicate of existing note {duplicate['duplicateOf']}"
+    return f"Duplicate of the note at index {duplicate['duplicateOfIndex']}"
@@ -0,0 +1,124 @@
+"""JSON encoding of tool and resource responses.
+
+Uses orjson when installed (``pip install anki-mcp-server[fast]``) and the
+standard library otherwise. Compact mode drops indentation and whitespace, and a
+byte budget trims the largest list in a response instead of emitting very large
+strings.
+"""
+
+import json
+import logging
+import os
+from collections.abc import Callable
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Name of the JSON library in use
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(data: Any, compact: bool = False) -> str:
+    """Serialize ``data`` to JSON, indented by two spaces unless ``compact``.
+
+    Non-ASCII characters are emitted as-is in every mode, as orjson does.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2).decode()
+    if compact:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+class ResponseEncoder:
+    """Encodes tool responses with the server-wide format and size budget.
+
+    When a response exceeds ``max_bytes``, the longest top-level list (or the
+    one named by ``list_key``) is cut to the longest prefix that fits and a
+    ``truncated`` entry reports how many items were returned and omitted.
+
+    Args:
+        compact: Emit compact JSON by default (default: from ANKI_MCP_COMPACT_JSON)
+        max_bytes: Byte budget per response; None disables it (default: from
+            ANKI_MCP_MAX_RESPONSE_BYTES, unset = disabled)
+    """
+
+    def __init__(self, compact: bool | None = None, max_bytes: int | None = None):
+        if compact is None:
+            compact = os.environ.get("ANKI_MCP_COMPACT_JSON", "").lower() in ("1", "true", "yes")
+        if max_bytes is None and os.environ.get("ANKI_MCP_MAX_RESPONSE_BYTES"):
+            max_bytes = int(os.environ["ANKI_MCP_MAX_RESPONSE_BYTES"])
+        self.compact = compact
+        self.max_bytes = max_bytes
+
+    def encode(
+        self,
+        data: Any,
+        compact: bool | None = None,
+        list_key: str | None = None,
+        continuation: Callable[[int], dict[str, Any]] | None = None,
+    ) -> str:
+        """Encode a response, trimming it to the byte budget if necessary.
+
+        Args:
+            data: JSON-serializable response
+            compact: Override the server-wide format for this response
+            list_key: Top-level list to trim (default: the longest one)
+            continuation: Called with the number of items kept when trimming;
+                its result is merged into the response (e.g. a cursor for the rest)
+
+        Returns:
+            JSON string
+        """
+        compact = self.compact if compact is None else compact
+        text = dumps(data, compact)
+        if (
+            self.max_bytes is None
+            or not isinstance(data, dict)
+            or self._size(text) <= self.max_bytes
+        ):
+            return text
+
+        if list_key is None:
+            lists = [key for key, value in data.items() if isinstance(value, list) and value]
+            list_key = max(lists, key=lambda key: len(data[key]), default=None)
+        items = data.get(list_key) if list_key is not None else None
+        if not isinstance(items, list) or not items:
+            logger.warning(f"Response of {self._size(text)} bytes exceeds budget, nothing to trim")
+            return text
+
+        def trimmed(count: int) -> str:
+            hint = "Narrow the request or fetch the rest with the returned cursor/limit"
+            result = {
+                **data,
+                list_key: items[:count],
+                "truncated": {
+                    "key": list_key,
+                    "returned": count,
+                    "omitted": len(items) - count,
+                    "maxBytes": self.max_bytes,
+                    "hint": hint,
+                },
+            }
+            if continuation is not None:
+                result.update(continuation(count))
+            return dumps(result, compact)
+
+        # Binary search for the longest prefix within budget
+        low, high = 0, len(items) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._size(trimmed(middle)) <= self.max_bytes:
+                low = middle
+            else:
+                high = middle - 1
+        return trimmed(low)
+
+    @staticmethod
+    def _size(text: str) -> int:
+        return len(text.encode("utf-8"))
@@ -0,0 +1,796 @@
+"""In-memory AnkiConnect stand-in for offline tests and benchmarks.
+
+``FakeCollection`` implements the AnkiConnect actions used by ``AnkiClient``
+(including ``multi``) over an in-memory collection, and ``FakeAnkiConnect``
+serves it over HTTP like the real add-on: requests are executed one at a time
+(Anki processes them on its single main thread) with configurable per-action
+latency and jitter.
+
+Run standalone with ``python -m anki_mcp_server.fake_anki --help``.
+"""
+
+import argparse
+import base64
+import fnmatch
+import json
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from anki_mcp_server.apkg import iter_notes, open_collection, read_decks, read_models
+
+_TOKEN_RE = re.compile(r'-?(?:[^\s"]*"[^"]*"|\S+)')
+_HTML_RE = re.compile(r"<[^>]+>")
+_CLOZE_RE = re.compile(r"\{\{c(\d+)::")
+
+
+class FakeAnkiError(Exception):
+    """Error reported back to the client in the AnkiConnect ``error`` field."""
+
+    pass
+
+
+def _stock_models() -> list[dict[str, Any]]:
+    """Return the Basic and Cloze note types of a fresh Anki collection."""
+    return [
+        {
+            "id": 1,
+            "name": "Basic",
+            "type": 0,
+            "mod": 0,
+            "flds": [{"name": "Front", "ord": 0}, {"name": "Back", "ord": 1}],
+            "tmpls": [
+                {
+                    "name": "Card 1",
+                    "ord": 0,
+                    "qfmt": "{{Front}}",
+                    "afmt": "{{FrontSide}}<hr id=answer>{{Back}}",
+                }
+            ],
+            "css": ".card { font-family: arial; font-size: 20px; }",
+        },
+        {
+            "id": 2,
+            "name": "Cloze",
+            "type": 1,
+            "mod": 0,
+            "flds": [{"name": "Text", "ord": 0}, {"name": "Back Extra", "ord": 1}],
+            "tmpls": [
+                {
+                    "name": "Cloze",
+                    "ord": 0,
+                    "qfmt": "{{cloze:Text}}",
+                    "afmt": "{{cloze:Text}}<br>{{Back Extra}}",
+                }
+            ],
+            "css": ".card { font-family: arial; font-size: 20px; }",
+        },
+    ]
+
+
+class FakeCollection:
+    """In-memory Anki collection answering AnkiConnect actions.
+
+    Notes are stored as dicts with id, mid, did, mod, tags, fields (name -> value)
+    and cards. Only the search syntax subset documented on ``find_notes`` is
+    supported.
+    """
+
+    def __init__(self) -> None:
+        self.decks: dict[str, int] = {"Default": 1}
+        self.models: dict[str, dict[str, Any]] = {m["name"]: m for m in _stock_models()}
+        self.notes: dict[int, dict[str, Any]] = {}
+        self.media: dict[str, bytes] = {}
+        self._next_id = int(time.time() * 1000)
+
+    # Construction helpers
+
+    @classmethod
+    def synthetic(
+        cls, num_notes: int, num_decks: int = 10, seed: int = 0, cloze_ratio: float = 0.5
+    ) -> "FakeCollection":
+        """Build a collection of generated Basic and Cloze notes.
+
+        Args:
+            num_notes: Number of notes to generate
+            num_decks: Number of decks to spread them over
+            seed: Random seed for reproducible content
+            cloze_ratio: Fraction of notes that use the Cloze note type
+        """
+        rng = random.Random(seed)
+        words = (
+            "probability graph node edge bayes markov chain inference factor variable "
+            "conditional independence junction tree likelihood prior posterior evidence "
+            "sampling gibbs expectation maximization hidden state transition emission"
+        ).split()
+        collection = cls()
+        deck_names = [f"Synthetic::Deck {i:02d}" for i in range(num_decks)]
+        for name in deck_names:
+            collection.create_deck(name)
+        basic, cloze = collection.models["Basic"], collection.models["Cloze"]
+        for i in range(num_notes):
+            text = " ".join(rng.choices(words, k=12))
+            tags = [f"topic-{rng.randrange(50)}", "synthetic"]
+            if rng.random() < cloze_ratio:
+                model = cloze
+                fields = {"Text": f"{text} {{{{c1::{words[i % len(words)]}}}}} #{i}"}
+            else:
+                model = basic
+                fields = {"Front": f"{text} #{i}?", "Back": " ".join(rng.choices(words, k=20))}
+            collection._insert_note(
+                model, collection.decks[deck_names[i % num_decks]], fields, tags
+            )
+        return collection
+
+    @classmethod
+    def from_packages(cls, *paths: str | Path) -> "FakeCollection":
+        """Build a collection from the notes, note types and decks in Anki packages."""
+        collection = cls()
+        for path in paths:
+            collection.load_package(path)
+        return collection
+
+    def load_package(self, path: str | Path) -> None:
+        """Merge the notes, note types and decks of an Anki package or collection file."""
+        with tempfile.TemporaryDirectory(prefix="anki-mcp-") as workdir:
+            conn = open_collection(path, workdir)
+            try:
+                self._load(conn)
+            finally:
+                conn.close()
+
+    def _load(self, conn: sqlite3.Connection) -> None:
+        """Merge the contents of an open collection database."""
+        models_by_id: dict[int, dict[str, Any]] = {}
+        for model in read_models(conn):
+            models_by_id[model["id"]] = self.models.setdefault(model["name"], model)
+        deck_ids = {deck_id: name for name, deck_id in read_decks(conn).items()}
+        for name in deck_ids.values():
+            self.create_deck(name)
+        for note in iter_notes(conn):
+            model = models_by_id[note["mid"]]
+            names = [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+            deck = deck_ids.get(note["did"], "Default")
+            self._insert_note(
+                model,
+                self.decks[deck],
+                dict(zip(names, note["fields"], strict=False)),
+                note["tags"],
+                note_id=note["id"],
+                mod=note["mod"],
+            )
+
+    def _new_id(self) -> int:
+        """Return a fresh millisecond-timestamp style ID."""
+        self._next_id = max(self._next_id + 1, int(time.time() * 1000))
+        return self._next_id
+
+    def _insert_note(
+        self,
+        model: dict[str, Any],
+        deck_id: int,
+        fields: dict[str, str],
+        tags: list[str],
+        note_id: int | None = None,
+        mod: int | None = None,
+    ) -> int:
+        """Store a note without validation and return its ID."""
+        note_id = note_id if note_id is not None and note_id not in self.notes else self._new_id()
+        names = [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+        if model.get("type") == 1:
+            num_cards = max(1, len(set(_CLOZE_RE.findall(fields.get(names[0], "")))))
+        else:
+            num_cards = max(1, len(model["tmpls"]))
+        self.notes[note_id] = {
+            "id": note_id,
+            "mid": model["id"],
+            "did": deck_id,
+            "mod": int(time.time()) if mod is None else mod,
+            "tags": list(tags),
+            "fields": {name: fields.get(name, "") for name in names},
+            "cards": [self._new_id() for _ in range(num_cards)],
+        }
+        return note_id
+
+    # Request dispatch
+
+    def handle(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Execute one AnkiConnect request and return its response body."""
+        try:
+            return {"result": self.execute(payload), "error": None}
+        except FakeAnkiError as e:
+            return {"result": None, "error": str(e)}
+
+    def execute(self, payload: dict[str, Any]) -> Any:
+        """Execute one AnkiConnect action and return its result.
+
+        Raises:
+            FakeAnkiError: If the action is unsupported or fails
+        """
+        action = payload.get("action")
+        params = payload.get("params") or {}
+        if action == "multi":
+            return [self.handle(sub) for sub in params.get("actions", [])]
+        method = self.ACTIONS.get(action)
+        if method is None:
+            raise FakeAnkiError("unsupported action")
+        try:
+            return getattr(self, method)(**params)
+        except TypeError as e:
+            raise FakeAnkiError(str(e)) from e
+
+    ACTIONS = {
+        "version": "version",
+        "deckNames": "deck_names",
+        "deckNamesAndIds": "deck_names_and_ids",
+        "createDeck": "create_deck",
+        "modelNames": "model_names",
+        "modelNamesAndIds": "model_names_and_ids",
+        "modelFieldNames": "model_field_names",
+        "modelTemplates": "model_templates",
+        "modelStyling": "model_styling",
+        "findModelsById": "find_models_by_id",
+        "findModelsByName": "find_models_by_name",
+        "createModel": "create_model",
+        "addNote": "add_note",
+        "addNotes": "add_notes",
+        "canAddNotes": "can_add_notes",
+        "findNotes": "find_notes",
+        "notesInfo": "notes_info",
+        "notesModTime": "notes_mod_time",
+        "getDecks": "get_decks",
+        "updateNoteFields": "update_note_fields",
+        "updateNoteTags": "update_note_tags",
+        "addTags": "add_tags",
+        "removeTags": "remove_tags",
+        "replaceTags": "replace_tags",
+        "changeDeck": "change_deck",
+        "deleteNotes": "delete_notes",
+        "findCards": "find_cards",
+        "storeMediaFile": "store_media_file",
+        "retrieveMediaFile": "retrieve_media_file",
+        "importPackage": "import_package",
+    }
+
+    # Decks
+
+    def version(self) -> int:
+        return 6
+
+    def deck_names(self) -> list[str]:
+        return list(self.decks)
+
+    def deck_names_and_ids(self) -> dict[str, int]:
+        return dict(self.decks)
+
+    def create_deck(self, deck: str) -> int:
+        parts = deck.split("::")
+        for i in range(1, len(parts) + 1):
+            name = "::".join(parts[:i])
+            if name not in self.decks:
+                self.decks[name] = self._new_id()
+        return self.decks[deck]
+
+    # Note types
+
+    def _model(self, model_name: str) -> dict[str, Any]:
+        model = self.models.get(model_name)
+        if model is None:
+            raise FakeAnkiError(f"model was not found: {model_name}")
+        return model
+
+    def model_names(self) -> list[str]:
+        return list(self.models)
+
+    def model_names_and_ids(self) -> dict[str, int]:
+        return {name: model["id"] for name, model in self.models.items()}
+
+    def model_field_names(self, modelName: str) -> list[str]:
+        model = self._model(modelName)
+        return [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+
+    def model_templates(self, modelName: str) -> dict[str, dict[str, str]]:
+        model = self._model(modelName)
+        return {t["name"]: {"Front": t["qfmt"], "Back": t["afmt"]} for t in model["tmpls"]}
+
+    def model_styling(self, modelName: str) -> dict[str, str]:
+        return {"css": self._model(modelName)["css"]}
+
+    def find_models_by_id(self, modelIds: list[int]) -> list[dict[str, Any]]:
+        by_id = {model["id"]: model for model in self.models.values()}
+        missing = [i for i in modelIds if i not in by_id]
+        if missing:
+            raise FakeAnkiError(f"model was not found: {missing[0]}")
+        return [by_id[i] for i in modelIds]
+
+    def find_models_by_name(self, modelNames: list[str]) -> list[dict[str, Any]]:
+        return [self._model(name) for name in modelNames]
+
+    def create_model(
+        self,
+        modelName: str,
+        inOrderFields: list[str],
+        cardTemplates: list[dict[str, str]],
+        css: str = "",
+        isCloze: bool = False,
+    ) -> dict[str, Any]:
+        if modelName in self.models:
+            raise FakeAnkiError(f"Model name already exists: {modelName}")
+        model = {
+            "id": self._new_id(),
+            "name": modelName,
+            "type": 1 if isCloze else 0,
+            "mod": int(time.time()),
+            "flds": [{"name": name, "ord": i} for i, name in enumerate(inOrderFields)],
+            "tmpls": [
+                {
+                    "name": t.get("Name", f"Card {i + 1}"),
+                    "ord": i,
+                    "qfmt": t["Front"],
+                    "afmt": t["Back"],
+                }
+                for i, t in enumerate(cardTemplates)
+            ],
+            "css": css,
+        }
+        self.models[modelName] = model
+        return model
+
+    # Notes
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        return _HTML_RE.sub("", value).strip().lower()
+
+    def _prepare_note(self, note: dict[str, Any]) -> tuple[dict[str, Any], int, dict[str, str]]:
+        """Validate a note like AnkiConnect and return (model, deck ID, fields).
+
+        Raises:
+            FakeAnkiError: If the model or deck is missing, or the note is empty or
+                a duplicate
+        """
+        model = self._model(note.get("modelName", ""))
+        deck_id = self.decks.get(note.get("deckName", ""))
+        if deck_id is None:
+            raise FakeAnkiError(f"deck was not found: {note.get('deckName')}")
+
+        names = [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+        by_lower = {name.lower(): name for name in names}
+        fields = dict.fromkeys(names, "")
+        for name, value in (note.get("fields") or {}).items():
+            if name.lower() in by_lower:
+                fields[by_lower[name.lower()]] = value
+
+        first = self._normalize(fields[names[0]])
+        if not first:
+            raise FakeAnkiError("cannot create note because it is empty")
+        options = note.get("options") or {}
+        if not options.get("allowDuplicate", False):
+            for other in self.notes.values():
+                if (
+                    other["mid"] == model["id"]
+                    and self._normalize(other["fields"][names[0]]) == first
+                ):
+                    raise FakeAnkiError("cannot create note because it is a duplicate")
+        return model, deck_id, fields
+
+    def add_note(self, note: dict[str, Any]) -> int:
+        model, deck_id, fields = self._prepare_note(note)
+        return self._insert_note(model, deck_id, fields, note.get("tags") or [])
+
+    def add_notes(self, notes: list[dict[str, Any]]) -> list[int | None]:
+        results: list[int | None] = []
+        for note in notes:
+            try:
+                results.append(self.add_note(note))
+            except FakeAnkiError:
+                results.append(None)
+        return results
+
+    def can_add_notes(self, notes: list[dict[str, Any]]) -> list[bool]:
+        results = []
+        for note in notes:
+            try:
+                self._prepare_note(note)
+                results.append(True)
+            except FakeAnkiError:
+                results.append(False)
+        return results
+
+    def _note(self, note_id: int) -> dict[str, Any]:
+        note = self.notes.get(note_id)
+        if note is None:
+            raise FakeAnkiError(f"Note was not found: {note_id}")
+        return note
+
+    def notes_info(self, notes: list[int]) -> list[dict[str, Any]]:
+        models = {model["id"]: model["name"] for model in self.models.values()}
+        result = []
+        for note_id in notes:
+            note = self.notes.get(note_id)
+            if note is None:
+                result.append({})
+                continue
+            result.append(
+                {
+                    "noteId": note_id,
+                    "profile": "User 1",
+                    "modelName": models[note["mid"]],
+                    "tags": list(note["tags"]),
+                    "fields": {
+                        name: {"value": value, "order": i}
+                        for i, (name, value) in enumerate(note["fields"].items())
+                    },
+                    "mod": note["mod"],
+                    "cards": list(note["cards"]),
+                }
+            )
+        return result
+
+    def notes_mod_time(self, notes: list[int]) -> list[dict[str, int]]:
+        return [
+            {"noteId": note_id, "mod": self.notes[note_id]["mod"]}
+            for note_id in notes
+            if note_id in self.notes
+        ]
+
+    def get_decks(self, cards: list[int]) -> dict[str, list[int]]:
+        deck_names = {deck_id: name for name, deck_id in self.decks.items()}
+        wanted = set(cards)
+        result: dict[str, list[int]] = {}
+        for note in self.notes.values():
+            for card_id in note["cards"]:
+                if card_id in wanted:
+                    result.setdefault(deck_names[note["did"]], []).append(card_id)
+        return result
+
+    def update_note_fields(self, note: dict[str, Any]) -> None:
+        stored = self._note(note["id"])
+        for name, value in (note.get("fields") or {}).items():
+            if name in stored["fields"]:
+                stored["fields"][name] = value
+        stored["mod"] = int(time.time())
+
+    def update_note_tags(self, note: int, tags: str | list[str]) -> None:
+        stored = self._note(note)
+        stored["tags"] = tags.split() if isinstance(tags, str) else list(tags)
+        stored["mod"] = int(time.time())
+
+    def add_tags(self, notes: list[int], tags: str) -> None:
+        for note_id in notes:
+            stored = self._note(note_id)
+            present = {tag.lower() for tag in stored["tags"]}
+            stored["tags"] += [tag for tag in tags.split() if tag.lower() not in present]
+            stored["mod"] = int(time.time())
+
+    def remove_tags(self, notes: list[int], tags: str) -> None:
+        removed = {tag.lower() for tag in tags.split()}
+        for note_id in notes:
+            stored = self._note(note_id)
+            stored["tags"] = [tag for tag in stored["tags"] if tag.lower() not in removed]
+            stored["mod"] = int(time.time())
+
+    def replace_tags(self, notes: list[int], tag_to_replace: str, replace_with_tag: str) -> None:
+        for note_id in notes:
+            stored = self._note(note_id)
+            stored["tags"] = [
+                replace_with_tag if tag.lower() == tag_to_replace.lower() else tag
+                for tag in stored["tags"]
+            ]
+            stored["mod"] = int(time.time())
+
+    def change_deck(self, cards: list[int], deck: str) -> None:
+        """Move cards to a deck, creating it if needed.
+
+        Decks are stored per note here, so a note moves when any of its cards does.
+        As in Anki, moving cards leaves the note's modification time unchanged.
+        """
+        deck_id = self.create_deck(deck)
+        wanted = set(cards)
+        for note in self.notes.values():
+            if wanted.intersection(note["cards"]):
+                note["did"] = deck_id
+
+    def delete_notes(self, notes: list[int]) -> None:
+        for note_id in notes:
+            self.notes.pop(note_id, None)
+
+    # Media
+
+    def store_media_file(self, filename: str, data: str, deleteExisting: bool = True) -> str:
+        if filename in self.media and not deleteExisting:
+            stem, dot, suffix = filename.rpartition(".")
+            filename = f"{stem}_{len(self.media)}{dot}{suffix}"
+        self.media[filename] = base64.b64decode(data)
+        return filename
+
+    def retrieve_media_file(self, filename: str) -> str | bool:
+        if filename not in self.media:
+            return False
+        return base64.b64encode(self.media[filename]).decode("ascii")
+
+    # Packages
+
+    def import_package(self, path: str) -> bool:
+        """Import an .apkg package, including its media files."""
+        if not Path(path).is_file():
+            raise FakeAnkiError(f"package was not found: {path}")
+        self.load_package(path)
+        with zipfile.ZipFile(path) as package:
+            if "media" in package.namelist():
+                for member, name in json.loads(package.read("media") or b"{}").items():
+                    self.media[name] = package.read(member)
+        return True
+
+    # Search
+
+    def find_notes(self, query: str) -> list[int]:
+        """Find notes matching a subset of Anki's search syntax.
+
+        Supported terms, combined with AND: ``deck:``, ``tag:``, ``note:``, ``nid:``,
+        ``field:value``, plain text (substring), ``*`` wildcards, quoting and ``-``
+        negation.
+
+        Raises:
+            FakeAnkiError: If the query uses unsupported syntax
+        """
+        matchers = [self._compile_term(token) for token in _TOKEN_RE.findall(query)]
+        return [
+            note_id
+            for note_id, note in self.notes.items()
+            if all(matcher(note) for matcher in matchers)
+        ]
+
+    def find_cards(self, query: str) -> list[int]:
+        """Find the cards of the notes matching ``query`` (see ``find_notes``)."""
+        return [
+            card_id
+            for note_id in self.find_notes(query)
+            for card_id in self.notes[note_id]["cards"]
+        ]
+
+    def _compile_term(self, token: str) -> Any:
+        """Compile one search token into a predicate over stored notes."""
+        negate = token.startswith("-") and len(token) > 1
+        if negate:
+            token = token[1:]
+        key, sep, value = token.partition(":")
+        if not sep:
+            key, value = "", token
+        value = value.replace('"', "")
+        key = key.replace('"', "").lower()
+
+        if token in ("*", ""):
+
+            def predicate(note: dict[str, Any]) -> bool:
+                return True
+
+        elif not key:
+            pattern = f"*{value.lower()}*"
+
+            def predicate(note: dict[str, Any]) -> bool:
+                return any(fnmatch.fnmatchcase(v.lower(), pattern) for v in note["fields"].values())
+
+        elif key == "deck":
+            pattern = value.lower()
+            deck_names = {deck_id: name.lower() for name, deck_id in self.decks.items()}
+
+            def predicate(note: dict[str, Any]) -> bool:
+                name = deck_names.get(note["did"], "")
+                return fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(
+                    name, f"{pattern}::*"
+                )
+
+        elif key == "tag":
+            pattern = value.lower()
+
+            def predicate(note: dict[str, Any]) -> bool:
+                return any(
+                    fnmatch.fnmatchcase(t.lower(), pattern)
+                    or fnmatch.fnmatchcase(t.lower(), f"{pattern}::*")
+                    for t in note["tags"]
+                )
+
+        elif key == "note":
+            pattern = value.lower()
+            ids = {
+                m["id"]
+                for m in self.models.values()
+                if fnmatch.fnmatchcase(m["name"].lower(), pattern)
+            }
+
+            def predicate(note: dict[str, Any]) -> bool:
+                return note["mid"] in ids
+
+        elif key == "nid":
+            ids = {int(i) for i in value.split(",") if i}
+
+            def predicate(note: dict[str, Any]) -> bool:
+                return note["id"] in ids
+
+        elif any(key == f["name"].lower() for m in self.models.values() for f in m["flds"]):
+            pattern = value.lower()
+
+            def predicate(note: dict[str, Any]) -> bool:
+                return any(
+                    name.lower() == key and fnmatch.fnmatchcase(v.lower(), pattern)
+                    for name, v in note["fields"].items()
+                )
+
+        else:
+            raise FakeAnkiError(f"unsupported search term in fake AnkiConnect: {token}")
+
+        if negate:
+            return lambda note: not predicate(note)
+        return predicate
+
+
+class FakeAnkiConnect:
+    """HTTP server exposing a ``FakeCollection`` like the AnkiConnect add-on.
+
+    Requests are executed one at a time, as Anki does on its main thread. Each
+    action sleeps for its configured latency (plus uniform jitter) before running;
+    a ``multi`` request pays the latency of every sub-action.
+
+    Args:
+        collection: Collection to serve (default: empty stock collection)
+        host: Interface to bind (default: 127.0.0.1)
+        port: Port to bind, 0 for an ephemeral port (default: 0)
+        latency: Default per-action latency in seconds (default: 0)
+        action_latency: Per-action latency overrides in seconds
+        jitter: Maximum extra random latency in seconds (default: 0)
+        serialize: Execute requests one at a time (default: True)
+    """
+
+    def __init__(
+        self,
+        collection: FakeCollection | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        action_latency: dict[str, float] | None = None,
+        jitter: float = 0.0,
+        serialize: bool = True,
+    ):
+        self.collection = collection or FakeCollection()
+        self.latency = latency
+        self.action_latency = action_latency or {}
+        self.jitter = jitter
+        self.serialize = serialize
+        self.requests = 0
+        self.action_counts: Counter[str] = Counter()
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._random = random.Random(0)
+        self._server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self  # type: ignore[attr-defined]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass to ``AnkiClient``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAnkiConnect":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and release its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeAnkiConnect":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        """Zero the request, action and byte counters."""
+        with self._stats_lock:
+            self.requests = 0
+            self.action_counts.clear()
+            self.bytes_received = 0
+            self.bytes_sent = 0
+
+    def _delay(self, payload: dict[str, Any]) -> float:
+        """Return the simulated processing time for a request."""
+        if payload.get("action") == "multi":
+            return sum(self._delay(sub) for sub in payload.get("params", {}).get("actions", []))
+        base = self.action_latency.get(payload.get("action", ""), self.latency)
+        return base + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def respond(self, body: bytes) -> bytes:
+        """Process a raw request body and return the raw response body."""
+        payload = json.loads(body)
+        if self.serialize:
+            with self._lock:
+                response = self._execute(payload)
+        else:
+            response = self._execute(payload)
+        with self._stats_lock:
+            self.requests += 1
+            self.action_counts[payload.get("action", "")] += 1
+            self.bytes_received += len(body)
+            self.bytes_sent += len(response)
+        return response
+
+    def _execute(self, payload: dict[str, Any]) -> bytes:
+        """Simulate Anki's processing time, then run the request."""
+        delay = self._delay(payload)
+        if delay:
+            time.sleep(delay)
+        return json.dumps(self.collection.handle(payload)).encode("utf-8")
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Handle AnkiConnect JSON POST requests."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.server.fake.respond(self.rfile.read(length))  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silence per-request logging."""
+        return None
+
+
+def main() -> None:
+    """Run a fake AnkiConnect server until interrupted."""
+    parser = argparse.ArgumentParser(description="Fake AnkiConnect server for offline testing")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind (default: 8765)")
+    parser.add_argument("--apkg", nargs="*", default=[], help="Packages to seed the collection")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of generated notes")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Per-action latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Maximum random jitter")
+    args = parser.parse_args()
+
+    collection = FakeCollection.synthetic(args.synthetic) if args.synthetic else FakeCollection()
+    for path in args.apkg:
+        collection.load_package(path)
+
+    server = FakeAnkiConnect(
+        collection,
+        host=args.host,
+        port=args.port,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+    )
+    print(f"Fake AnkiConnect with {len(collection.notes)} notes on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
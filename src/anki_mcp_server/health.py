@@ -0,0 +1,99 @@
+"""Connection health tracking and circuit breaker for AnkiConnect."""
+
+import time
+from typing import Any
+
+
+class CircuitOpenError(Exception):
+    """Raised when requests are rejected because the circuit is open."""
+
+    pass
+
+
+class ConnectionState:
+    """Tracks the last known health of the AnkiConnect connection.
+
+    Every real request reports its outcome, so a successful call marks Anki healthy
+    without a separate ``version`` probe. After ``failure_threshold`` consecutive
+    connection failures the circuit opens and requests fail fast until
+    ``reset_timeout`` has passed, after which the next request is let through as a
+    probe (half-open).
+
+    Args:
+        ttl: Seconds a successful request vouches for the connection (default: 30)
+        failure_threshold: Consecutive failures that open the circuit (default: 3)
+        reset_timeout: Seconds the circuit stays open before probing again (default: 10)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, ttl: float = 30.0, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.last_success: float | None = None
+        self.last_failure: float | None = None
+        self.last_error: str | None = None
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        """Current circuit state: closed, open or half_open."""
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def is_healthy(self) -> bool:
+        """Return True if a request succeeded within the TTL and the circuit is closed."""
+        return (
+            self._opened_at is None
+            and self.last_success is not None
+            and time.monotonic() - self.last_success < self.ttl
+        )
+
+    def before_request(self) -> None:
+        """Reject the request if the circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open and the reset timeout has not passed
+        """
+        if self.state == self.OPEN:
+            retry_in = self.reset_timeout - (time.monotonic() - self._opened_at)
+            raise CircuitOpenError(
+                f"AnkiConnect unavailable after {self.consecutive_failures} failed attempts "
+                f"(last error: {self.last_error}); retrying in {retry_in:.1f}s"
+            )
+
+    def record_success(self) -> None:
+        """Mark the connection healthy and close the circuit."""
+        self.last_success = time.monotonic()
+        self.consecutive_failures = 0
+        self._opened_at = None
+
+    def record_failure(self, error: Exception) -> None:
+        """Count a connection failure, opening the circuit at the threshold."""
+        self.last_failure = time.monotonic()
+        self.last_error = str(error)
+        self.consecutive_failures += 1
+        if self._opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = self.last_failure
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the current state as a JSON-serializable dictionary."""
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "healthy": self.is_healthy(),
+            "consecutiveFailures": self.consecutive_failures,
+            "secondsSinceSuccess": None if self.last_success is None else now - self.last_success,
+            "secondsSinceFailure": None if self.last_failure is None else now - self.last_failure,
+            "lastError": self.last_error,
+            "ttl": self.ttl,
+            "failureThreshold": self.failure_threshold,
+            "resetTimeout": self.reset_timeout,
+        }
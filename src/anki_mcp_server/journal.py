@@ -0,0 +1,430 @@
+"""Durable write-behind queue that batches note creates and updates."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from anki_mcp_server.bulk import CreatedCallback, update_actions
+from anki_mcp_server.client import AnkiClient, AnkiConnectError, AnkiUnavailableError
+from anki_mcp_server.encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the provisional handles returned for queued writes
+HANDLE_PREFIX = "w-"
+
+
+class WriteJournal:
+    """Append-only file of queued writes and their outcomes, one JSON object per line.
+
+    Every record is flushed and fsynced before ``append`` returns, so a write
+    acknowledged to the caller survives a crash of the server.
+
+    Args:
+        path: Journal file
+        fsync: Force records to disk before returning (default: True)
+    """
+
+    def __init__(self, path: str | Path, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def records(self) -> list[dict[str, Any]]:
+        """Read all records, ignoring a last line cut off by a crash."""
+        if not self.path.exists():
+            return []
+        records = []
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping truncated record in {self.path}")
+        return records
+
+    def append(self, records: list[dict[str, Any]]) -> None:
+        """Append records durably."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(dumps(record, compact=True) + "\n" for record in records))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def rewrite(self, records: list[dict[str, Any]]) -> None:
+        """Atomically replace the journal with ``records``."""
+        temp = self.path.with_name(self.path.name + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write("".join(dumps(record, compact=True) + "\n" for record in records))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temp, self.path)
+
+
+@dataclass
+class PendingWrite:
+    """A queued create or update.
+
+    Attributes:
+        handle: Provisional handle returned to the caller
+        kind: "create" or "update"
+        note: AnkiConnect note for a create; ``{"id", "fields", "tags"}`` for an update
+        merged: Handles of later updates folded into this one
+    """
+
+    handle: str
+    kind: str
+    note: dict[str, Any]
+    merged: list[str] = field(default_factory=list)
+
+
+class WriteBehindQueue:
+    """Acknowledges note writes immediately and sends them to Anki in batches.
+
+    Writes are appended to the journal and answered with a provisional handle.
+    A flush starts once ``max_batch`` writes are pending or ``max_delay``
+    seconds after the first one. It sends all creates with ``addNotes`` and all
+    updates through ``multi`` requests. Updates to a note that is already
+    queued are merged into the queued update: fields are combined and the
+    latest tags win. Outcomes are journaled too. On startup the journal is
+    replayed and writes without an outcome are queued again. A crash between
+    Anki accepting a batch and its outcome being journaled makes those writes
+    run twice; creates are then normally rejected as duplicates.
+
+    Args:
+        client: AnkiConnect client instance
+        journal: Journal for durability (default: None = in memory only)
+        max_batch: Pending writes that trigger a flush, and notes per request (default: 50)
+        max_delay: Seconds after the first pending write before a flush (default: 1.0)
+        on_created: Awaited with every created note and its ID
+        on_written: Called with the IDs of notes created or updated by a flush
+        keep_results: Outcomes kept for ``status`` after the journal is compacted
+            (default: 1000)
+    """
+
+    def __init__(
+        self,
+        client: AnkiClient,
+        journal: WriteJournal | None = None,
+        max_batch: int = 50,
+        max_delay: float = 1.0,
+        on_created: CreatedCallback | None = None,
+        on_written: Callable[[list[int]], None] | None = None,
+        keep_results: int = 1000,
+    ):
+        self.client = client
+        self.journal = journal
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_created = on_created
+        self.on_written = on_written
+        self.keep_results = keep_results
+        self._pending: dict[str, PendingWrite] = {}
+        self._inflight: dict[str, PendingWrite] = {}
+        self._updates: dict[int, str] = {}
+        self._aliases: dict[str, str] = {}
+        self._results: dict[str, dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._timer: asyncio.Task[None] | None = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._flushes = 0
+        self._last_error: str | None = None
+        for record in journal.records() if journal is not None else []:
+            self._apply(record)
+        self.replayed = len(self._pending)
+
+    def create(self, note: dict[str, Any]) -> str:
+        """Queue a note in AnkiConnect format and return its handle."""
+        return self._record({"op": "create", "handle": self._new_handle(), "note": note})
+
+    def update(
+        self,
+        note_id: int,
+        fields: dict[str, str] | None = None,
+        tags: list[str] | None = None,
+    ) -> str:
+        """Queue an update of a note's fields and/or tags and return its handle.
+
+        Raises:
+            ValueError: If neither fields nor tags are given
+        """
+        if fields is None and tags is None:
+            raise ValueError("Nothing to update: give fields and/or tags")
+        update = {"id": note_id, "fields": fields, "tags": tags}
+        return self._record({"op": "update", "handle": self._new_handle(), "update": update})
+
+    def status(self, handles: list[str] | None = None) -> list[dict[str, Any]]:
+        """Return the state of writes: pending, done with their note ID, or failed.
+
+        Args:
+            handles: Handles to report (default: all pending and remembered writes)
+        """
+        if handles is None:
+            handles = [*self._results, *self._inflight, *self._pending]
+        statuses = []
+        for handle in handles:
+            target = self._aliases.get(handle, handle)
+            status: dict[str, Any] = {"handle": handle}
+            if target != handle:
+                status["mergedInto"] = target
+            if target in self._pending or target in self._inflight:
+                status["status"] = "pending"
+            elif target in self._results:
+                status.update(self._results[target])
+            else:
+                status["status"] = "unknown"
+            statuses.append(status)
+        return statuses
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue size, flush count and the last flush error."""
+        return {
+            "journal": str(self.journal.path) if self.journal is not None else None,
+            "pending": len(self._pending) + len(self._inflight),
+            "replayed": self.replayed,
+            "flushes": self._flushes,
+            "lastError": self._last_error,
+        }
+
+    def start(self) -> None:
+        """Schedule a flush of writes replayed from the journal."""
+        if self._pending:
+            self._schedule()
+
+    async def flush(self) -> dict[str, Any]:
+        """Send all pending writes now.
+
+        Returns:
+            Counts of writes sent, done and failed, writes still pending and the
+            error that kept them queued, if any
+        """
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        async with self._flush_lock:
+            if not self._pending:
+                return {"sent": 0, "done": 0, "failed": 0, "pending": 0, "error": None}
+            # Writes arriving during the flush queue up anew instead of merging into sent ones
+            self._inflight, self._pending, self._updates = self._pending, {}, {}
+            start = time.perf_counter()
+            try:
+                outcomes, error = await self._send(list(self._inflight.values()))
+                self._finish(outcomes)
+            finally:
+                self._requeue()
+            if self.journal is not None and not self._pending and outcomes:
+                self.journal.rewrite(
+                    [{"op": "done", "handle": h, **result} for h, result in self._results.items()]
+                )
+            self._flushes += 1
+            self._last_error = error
+            logger.debug(
+                f"Flushed {len(outcomes)} writes, {len(self._pending)} pending "
+                f"in {time.perf_counter() - start:.3f}s"
+            )
+            return {
+                "sent": len(outcomes),
+                "done": sum(1 for o in outcomes if o["status"] == "done"),
+                "failed": sum(1 for o in outcomes if o["status"] == "failed"),
+                "pending": len(self._pending),
+                "error": error,
+            }
+
+    async def close(self) -> None:
+        """Flush what is pending; writes that still fail stay in the journal."""
+        try:
+            await self.flush()
+        except AnkiConnectError as e:
+            logger.warning(f"Write-behind queue closed with pending writes: {e}")
+
+    # State transitions, shared by new writes and journal replay
+
+    def _new_handle(self) -> str:
+        return f"{HANDLE_PREFIX}{uuid.uuid4().hex[:12]}"
+
+    def _record(self, record: dict[str, Any]) -> str:
+        """Journal a write before acknowledging it, then apply it and schedule a flush."""
+        if self.journal is not None:
+            self.journal.append([record])
+        self._apply(record)
+        self._schedule()
+        return record["handle"]
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        handle = record["handle"]
+        if record["op"] == "create":
+            self._queue(PendingWrite(handle, "create", record["note"]))
+        elif record["op"] == "update":
+            update = record["update"]
+            self._queue(PendingWrite(handle, "update", dict(update)))
+        elif record["op"] == "done":
+            write = self._pending.pop(handle, None) or self._inflight.pop(handle, None)
+            if write is not None and self._updates.get(write.note.get("id")) == handle:
+                del self._updates[write.note["id"]]
+            self._results[handle] = {
+                key: value for key, value in record.items() if key not in ("op", "handle")
+            }
+            for merged in record.get("merged", []):
+                self._aliases[merged] = handle
+
+    def _queue(self, write: PendingWrite) -> None:
+        """Add a write to the pending ones, merging an update into a queued update."""
+        if write.kind == "update":
+            queued = self._pending.get(self._updates.get(write.note["id"], ""))
+            if queued is not None:
+                if write.note["fields"] is not None:
+                    queued.note["fields"] = {
+                        **(queued.note["fields"] or {}),
+                        **write.note["fields"],
+                    }
+                if write.note["tags"] is not None:
+                    queued.note["tags"] = write.note["tags"]
+                for handle in (write.handle, *write.merged):
+                    queued.merged.append(handle)
+                    self._aliases[handle] = queued.handle
+                return
+            self._updates[write.note["id"]] = write.handle
+        self._pending[write.handle] = write
+
+    def _requeue(self) -> None:
+        """Put writes a flush did not send back in front of those queued meanwhile."""
+        unsent, newer = self._inflight, self._pending
+        self._inflight, self._pending, self._updates = {}, {}, {}
+        for write in (*unsent.values(), *newer.values()):
+            self._queue(write)
+
+    def _schedule(self) -> None:
+        """Start a flush when the batch is full, or a timer for the first pending write."""
+        if len(self._pending) >= self.max_batch:
+            self._spawn(self._flush_in_background())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+
+    def _spawn(self, coro: Any) -> asyncio.Task[Any]:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        await self._flush_in_background()
+
+    async def _flush_in_background(self) -> None:
+        try:
+            result = await self.flush()
+        except AnkiConnectError as e:
+            result = {"pending": len(self._pending), "error": str(e)}
+        if result["error"] is not None and self._pending:
+            logger.warning(f"Write-behind flush failed, retrying later: {result['error']}")
+            if self._timer is None:
+                self._timer = self._spawn(self._flush_later())
+
+    # Sending
+
+    async def _send(self, batch: list[PendingWrite]) -> tuple[list[dict[str, Any]], str | None]:
+        """Send a batch; return the outcome records and the error that kept writes queued.
+
+        Only writes whose request did not reach Anki stay queued. A chunk Anki
+        rejects as a whole is retried note by note so each write gets its own outcome.
+        """
+        outcomes: list[dict[str, Any]] = []
+        error = None
+        creates = [write for write in batch if write.kind == "create"]
+        updates = [write for write in batch if write.kind == "update"]
+
+        for start in range(0, len(creates), self.max_batch):
+            chunk = creates[start : start + self.max_batch]
+            try:
+                results = await self._add_notes([write.note for write in chunk])
+            except AnkiUnavailableError as e:
+                # Nothing in the chunk is known to be created; keep it queued
+                error = str(e)
+                break
+            for write, result in zip(chunk, results, strict=True):
+                if isinstance(result, AnkiConnectError):
+                    outcomes.append(_outcome(write, error=str(result)))
+                elif result is None:
+                    outcomes.append(_outcome(write, error="Failed to create note"))
+                else:
+                    outcomes.append(_outcome(write, note_id=result))
+                    if self.on_created is not None:
+                        await self.on_created(write.note, result)
+
+        for start in range(0, len(updates), self.max_batch):
+            chunk = updates[start : start + self.max_batch]
+            actions, owners, errors = update_actions([write.note for write in chunk])
+            if actions:
+                try:
+                    results = await self.client.multi(actions)
+                except AnkiUnavailableError as e:
+                    # The request did not reach Anki; keep the chunk queued
+                    error = error or str(e)
+                    break
+                except AnkiConnectError as e:
+                    results = [e] * len(actions)
+                for index, result in zip(owners, results, strict=True):
+                    if isinstance(result, AnkiConnectError):
+                        errors.setdefault(index, str(result))
+            for index, write in enumerate(chunk):
+                if index in errors:
+                    outcomes.append(_outcome(write, error=errors[index]))
+                else:
+                    outcomes.append(_outcome(write, note_id=write.note["id"]))
+        return outcomes, error
+
+    async def _add_notes(self, notes: list[dict[str, Any]]) -> list[Any]:
+        """Add notes in one ``addNotes`` call, or one by one if Anki rejects the call.
+
+        Returns:
+            Per note its ID, None, or the AnkiConnectError it failed with
+        """
+        try:
+            return await self.client.add_notes(notes)
+        except AnkiUnavailableError:
+            raise
+        except AnkiConnectError as e:
+            logger.warning(f"addNotes rejected {len(notes)} writes, adding one by one: {e}")
+        actions = [{"action": "addNote", "params": {"note": note}} for note in notes]
+        return await self.client.multi(actions)
+
+    def _finish(self, outcomes: list[dict[str, Any]]) -> None:
+        """Journal and apply outcomes, forgetting the oldest beyond ``keep_results``."""
+        if not outcomes:
+            return
+        if self.journal is not None:
+            self.journal.append(outcomes)
+        for outcome in outcomes:
+            self._apply(outcome)
+        written = [o["noteId"] for o in outcomes if o["status"] == "done"]
+        if written and self.on_written is not None:
+            self.on_written(written)
+
+        for handle in list(self._results)[: -self.keep_results or None]:
+            del self._results[handle]
+        self._aliases = {
+            alias: target
+            for alias, target in self._aliases.items()
+            if target in self._results or target in self._inflight or target in self._pending
+        }
+
+
+def _outcome(write: PendingWrite, note_id: int | None = None, error: str | None = None) -> dict:
+    """Build the journal record of a write's outcome."""
+    record: dict[str, Any] = {"op": "done", "handle": write.handle, "kind": write.kind}
+    if error is None:
+        record.update(status="done", noteId=note_id)
+    else:
+        record.update(status="failed", error=error)
+        if write.kind == "update":
+            record["noteId"] = write.note["id"]
+    if write.merged:
+        record["merged"] = list(write.merged)
+    return record
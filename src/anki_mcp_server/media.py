@@ -0,0 +1,145 @@
+"""Content-addressed upload of media files to Anki."""
+
+import asyncio
+import base64
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+from anki_mcp_server.client import AnkiClient, AnkiConnectError
+
+logger = logging.getLogger(__name__)
+
+# Bytes read at a time; a multiple of 3 so base64 pieces concatenate cleanly
+READ_SIZE = 3 << 18
+
+# Prefix of the media file names chosen by the uploader
+NAME_PREFIX = "mcp-"
+
+# Hex digits of the SHA-256 digest used in file names
+NAME_DIGEST_LENGTH = 32
+
+
+def media_name(digest: str, suffix: str) -> str:
+    """Return the Anki media file name for content with this SHA-256 digest."""
+    return f"{NAME_PREFIX}{digest[:NAME_DIGEST_LENGTH]}{suffix.lower()}"
+
+
+def hash_file(path: str | Path) -> str:
+    """Return the SHA-256 hex digest of a file, reading it in pieces."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_file(path: str | Path) -> str:
+    """Return the base64 encoding of a file, encoding it piece by piece."""
+    parts = []
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            parts.append(base64.b64encode(chunk))
+    return b"".join(parts).decode("ascii")
+
+
+class MediaLedger:
+    """Remembers which content hashes are already stored in Anki's media folder.
+
+    With a ``path`` the ledger is an append-only file of ``<digest> <name>``
+    lines that survives restarts; without one it only lasts for the process.
+    Media deleted inside Anki is not noticed, so remove the file after
+    clearing Anki's media folder.
+
+    Args:
+        path: Ledger file (default: None = in memory only)
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path is not None else None
+        self._names: dict[str, str] = {}
+        if self.path is not None and self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                digest, _, name = line.partition(" ")
+                if digest and name:
+                    self._names[digest] = name
+
+    def get(self, digest: str) -> str | None:
+        """Return the stored file name for a digest, or None if it was never uploaded."""
+        return self._names.get(digest)
+
+    def add(self, digest: str, name: str) -> None:
+        """Record that content with this digest is stored under ``name``."""
+        if self._names.get(digest) == name:
+            return
+        self._names[digest] = name
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"{digest} {name}\n")
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class MediaUploader:
+    """Uploads files via ``storeMediaFile`` under names derived from their content.
+
+    Identical content always maps to the same name, so it is uploaded at most
+    once: files already in the ledger are skipped without contacting Anki, and
+    duplicates within one call share a single upload. Files are read and
+    encoded off the event loop, with at most ``concurrency`` uploads in flight.
+
+    Args:
+        client: AnkiConnect client instance
+        ledger: Record of stored hashes (default: in-memory MediaLedger)
+        concurrency: Maximum number of uploads in flight (default: 4)
+    """
+
+    def __init__(self, client: AnkiClient, ledger: MediaLedger | None = None, concurrency: int = 4):
+        self.client = client
+        self.ledger = ledger if ledger is not None else MediaLedger()
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._uploads: dict[str, asyncio.Task[str]] = {}
+
+    async def upload(self, paths: list[str]) -> list[dict[str, Any]]:
+        """Upload files, skipping content Anki already has.
+
+        Args:
+            paths: Paths of the files to upload
+
+        Returns:
+            Per path, in order: path, filename, sha256 and whether it was
+            uploaded now, or path and error if it failed
+        """
+        return list(await asyncio.gather(*(self._upload_one(path) for path in paths)))
+
+    async def _upload_one(self, path: str) -> dict[str, Any]:
+        try:
+            async with self._semaphore:
+                digest = await asyncio.to_thread(hash_file, path)
+            name = self.ledger.get(digest)
+            if name is not None:
+                return {"path": path, "filename": name, "sha256": digest, "uploaded": False}
+
+            task = self._uploads.get(digest)
+            uploaded = task is None
+            if task is None:
+                task = asyncio.ensure_future(self._store(path, digest))
+                self._uploads[digest] = task
+                task.add_done_callback(lambda _: self._uploads.pop(digest, None))
+            name = await asyncio.shield(task)
+            return {"path": path, "filename": name, "sha256": digest, "uploaded": uploaded}
+        except (OSError, AnkiConnectError) as e:
+            logger.warning(f"Failed to upload media {path}: {e}")
+            return {"path": path, "error": str(e)}
+
+    async def _store(self, path: str, digest: str) -> str:
+        name = media_name(digest, Path(path).suffix)
+        async with self._semaphore:
+            data = await asyncio.to_thread(encode_file, path)
+            name = await self.client.store_media_file(name, data)
+        self.ledger.add(digest, name)
+        return name
@@ -0,0 +1,207 @@
+"""In-process metrics for AnkiConnect actions and MCP tool invocations."""
+
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+# Upper bounds (milliseconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# AnkiConnect round trips made on behalf of the current tool invocation
+_round_trips: ContextVar[list[int] | None] = ContextVar("anki_mcp_round_trips", default=None)
+
+
+@contextmanager
+def track_round_trips() -> Iterator[list[int]]:
+    """Count AnkiConnect round trips made within the block (and tasks it spawns).
+
+    Yields:
+        Single-element list holding the running count
+    """
+    counter = [0]
+    token = _round_trips.set(counter)
+    try:
+        yield counter
+    finally:
+        _round_trips.reset(token)
+
+
+def count_round_trip() -> None:
+    """Attribute one AnkiConnect HTTP request to the tool invocation in progress."""
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class _Series:
+    """Call count, error count and latency histogram of one action or tool."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float, error: bool) -> None:
+        self.calls += 1
+        self.errors += error
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        labels = [f"le{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "meanMs": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "maxMs": round(self.max_ms, 3),
+            "histogram": dict(zip(labels, self.buckets, strict=True)),
+        }
+
+
+class Metrics:
+    """Collects per-action and per-tool counters.
+
+    Action metrics are recorded by ``AnkiClient`` for every call, including the
+    time spent waiting in a batch or on a shared in-flight request. Request and
+    response bytes are counted per HTTP request under the action that was sent,
+    so batched calls show up under ``multi``. Tool metrics record wall time and
+    the AnkiConnect round trips each invocation caused.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._actions: dict[str, _Series] = {}
+        self._bytes: dict[str, list[int]] = {}
+        self._tools: dict[str, _Series] = {}
+        self._tool_round_trips: dict[str, int] = {}
+
+    def record_action(self, action: str, elapsed: float, error: bool = False) -> None:
+        """Record one AnkiConnect action call and its latency in seconds."""
+        self._actions.setdefault(action, _Series()).observe(elapsed * 1000, error)
+
+    def record_transfer(self, action: str, request_bytes: int, response_bytes: int) -> None:
+        """Record the size of one HTTP request sent for ``action``."""
+        totals = self._bytes.setdefault(action, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += request_bytes
+        totals[2] += response_bytes
+
+    def record_tool(self, tool: str, elapsed: float, round_trips: int, error: bool = False) -> None:
+        """Record one tool invocation, its wall time in seconds and its round trips."""
+        self._tools.setdefault(tool, _Series()).observe(elapsed * 1000, error)
+        self._tool_round_trips[tool] = self._tool_round_trips.get(tool, 0) + round_trips
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a JSON-serializable dictionary."""
+        actions = {name: series.snapshot() for name, series in sorted(self._actions.items())}
+        for name, (requests, sent, received) in self._bytes.items():
+            entry = actions.setdefault(name, {})
+            entry.update({"requests": requests, "requestBytes": sent, "responseBytes": received})
+        tools = {}
+        for name, series in sorted(self._tools.items()):
+            tools[name] = series.snapshot()
+            tools[name]["roundTrips"] = self._tool_round_trips[name]
+            tools[name]["roundTripsPerCall"] = round(self._tool_round_trips[name] / series.calls, 3)
+        return {
+            "uptimeSeconds": round(time.time() - self.started, 3),
+            "actions": actions,
+            "tools": tools,
+        }
+
+    def reset(self) -> None:
+        """Drop all recorded metrics."""
+        self.started = time.time()
+        self._actions.clear()
+        self._bytes.clear()
+        self._tools.clear()
+        self._tool_round_trips.clear()
+
+    def to_prometheus(self, cache: dict[str, Any] | None = None) -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            cache: Optional ``MetadataCache.stats()`` output to export alongside
+        """
+        lines: list[str] = []
+        self._histogram(lines, "anki_mcp_action_duration_seconds", "action", self._actions)
+        self._counter(
+            lines,
+            "anki_mcp_action_errors_total",
+            "action",
+            {name: s.errors for name, s in self._actions.items()},
+        )
+        self._counter(
+            lines,
+            "anki_mcp_http_requests_total",
+            "action",
+            {name: totals[0] for name, totals in self._bytes.items()},
+        )
+        self._counter(
+            lines,
+            "anki_mcp_request_bytes_total",
+            "action",
+            {name: totals[1] for name, totals in self._bytes.items()},
+        )
+        self._counter(
+            lines,
+            "anki_mcp_response_bytes_total",
+            "action",
+            {name: totals[2] for name, totals in self._bytes.items()},
+        )
+        self._histogram(lines, "anki_mcp_tool_duration_seconds", "tool", self._tools)
+        self._counter(
+            lines,
+            "anki_mcp_tool_errors_total",
+            "tool",
+            {name: s.errors for name, s in self._tools.items()},
+        )
+        self._counter(lines, "anki_mcp_tool_round_trips_total", "tool", self._tool_round_trips)
+        if cache:
+            for key in ("hits", "staleHits", "misses"):
+                lines.append(f"# TYPE anki_mcp_cache_{_snake(key)}_total counter")
+                lines.append(f"anki_mcp_cache_{_snake(key)}_total {cache[key]}")
+            lines.append("# TYPE anki_mcp_cache_entries gauge")
+            lines.append(f"anki_mcp_cache_entries {cache['entries']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path, cache: dict[str, Any] | None = None) -> None:
+        """Atomically write the Prometheus text dump to ``path``."""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(self.to_prometheus(cache), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _counter(lines: list[str], name: str, label: str, values: dict[str, int]) -> None:
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(values.items()):
+            lines.append(f'{name}{{{label}="{key}"}} {value}')
+
+    @staticmethod
+    def _histogram(lines: list[str], name: str, label: str, series: dict[str, _Series]) -> None:
+        lines.append(f"# TYPE {name} histogram")
+        for key, s in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, s.buckets, strict=False):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label}="{key}",le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {s.calls}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {s.total_ms / 1000:.6f}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {s.calls}')
+
+
+def _snake(name: str) -> str:
+    """Convert a camelCase stats key to snake_case."""
+    return "".join(f"_{c.lower()}" if c.isupper() else c for c in name)
@@ -0,0 +1,419 @@
+"""Local SQLite mirror of Anki notes, kept up to date incrementally."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from anki_mcp_server.client import AnkiClient
+from anki_mcp_server.search import LocalQuery, translate_query
+from anki_mcp_server.shaping import SNIPPET_LENGTH, fields_text
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    deck TEXT,
+    mod INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    cards TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    nid INTEGER NOT NULL,
+    deck TEXT
+);
+CREATE INDEX IF NOT EXISTS notes_model ON notes (model);
+CREATE INDEX IF NOT EXISTS notes_deck ON notes (deck);
+CREATE INDEX IF NOT EXISTS cards_nid ON cards (nid);
+"""
+
+# Trigram tokens give substring matching like Anki's plain-text search
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE notes_fts USING fts5(text, tokenize='trigram')"
+
+
+class NoteMirror:
+    """SQLite copy of the collection's notes for serving reads locally.
+
+    A sync asks AnkiConnect for every note ID (``findNotes``) and its mod time
+    (``notesModTime``), then pulls ``notesInfo`` only for notes that are new or
+    whose mod time changed, and drops notes that no longer exist. Moving cards
+    leaves a note's mod time unchanged, so the deck of every card is refreshed
+    with ``getDecks`` on each sync. With a file-backed database the mirror
+    survives restarts, so only notes changed in the meantime are transferred again.
+
+    Reads sync first when the last sync is older than ``max_age``. Notes created,
+    changed or deleted through this server should be passed to ``invalidate`` so
+    they are re-fetched before the next read.
+
+    Field text is indexed in an FTS5 trigram table (SQLite 3.34+), which lets
+    ``search`` answer a subset of Anki's search syntax locally.
+
+    Args:
+        client: AnkiConnect client
+        path: SQLite database file (default: in-memory)
+        max_age: Seconds a sync keeps the mirror fresh for reads (default: 30)
+        chunk_size: Notes per AnkiConnect request during a sync (default: 500)
+        concurrency: Maximum concurrent AnkiConnect requests during a sync (default: 4)
+    """
+
+    def __init__(
+        self,
+        client: AnkiClient,
+        path: str | Path = ":memory:",
+        max_age: float = 30.0,
+        chunk_size: int = 500,
+        concurrency: int = 4,
+    ):
+        self.client = client
+        self.path = str(path)
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+        self.fts_enabled = self._create_fts()
+        self._field_names = {
+            name.lower()
+            for (name,) in self._conn.execute(
+                "SELECT DISTINCT key FROM notes, json_each(notes.fields)"
+            )
+        }
+        self._lock = asyncio.Lock()
+        self._synced_at: float | None = None
+        self._last_sync: dict[str, Any] | None = None
+        self._dirty: set[int] = set()
+
+    def _create_fts(self) -> bool:
+        """Create (and fill, for older databases) the full-text index if SQLite supports it."""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            self._conn.execute(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search unavailable, searches go to Anki: {e}")
+            return False
+        with self._conn:
+            for note_id, fields in self._conn.execute("SELECT id, fields FROM notes").fetchall():
+                self._conn.execute(
+                    "INSERT INTO notes_fts (rowid, text) VALUES (?, ?)",
+                    (note_id, fields_text(json.loads(fields))),
+                )
+        return True
+
+    def is_fresh(self) -> bool:
+        """Return True if the last sync is younger than ``max_age``."""
+        return self._synced_at is not None and time.monotonic() - self._synced_at < self.max_age
+
+    async def ensure_fresh(self) -> None:
+        """Sync if stale, else re-fetch invalidated notes; concurrent callers share the work."""
+        if self.is_fresh() and not self._dirty:
+            return
+        async with self._lock:
+            if not self.is_fresh():
+                await self._sync()
+            elif self._dirty:
+                dirty, self._dirty = self._dirty, set()
+                try:
+                    rows, cards = await self._fetch_rows(list(dirty))
+                except BaseException:
+                    self._dirty |= dirty
+                    raise
+                with self._conn:
+                    self._delete(list(dirty))
+                    self._store(rows, cards)
+
+    async def sync(self) -> dict[str, Any]:
+        """Bring the mirror up to date with Anki.
+
+        Returns:
+            Dictionary with counts of added, updated, deleted and total notes
+
+        Raises:
+            AnkiConnectError: If AnkiConnect fails; the mirror keeps its previous state
+        """
+        async with self._lock:
+            return await self._sync()
+
+    async def _sync(self) -> dict[str, Any]:
+        start = time.perf_counter()
+        dirty, self._dirty = self._dirty, set()
+        try:
+            note_ids = await self.client.find_notes("deck:*")
+            remote: dict[int, int] = {}
+            for chunk in await self._map_chunks(self.client.notes_mod_time, note_ids):
+                remote.update((item["noteId"], item["mod"]) for item in chunk)
+
+            local = dict(self._conn.execute("SELECT id, mod FROM notes"))
+            changed = [
+                note_id
+                for note_id, mod in remote.items()
+                if local.get(note_id) != mod or note_id in dirty
+            ]
+            deleted = [note_id for note_id in local if note_id not in remote]
+            rows, cards = await self._fetch_rows(changed)
+
+            # Card moves leave mod times alone, so refresh the decks of unchanged notes too
+            refetched = set(changed)
+            kept = [
+                (card_id, note_id)
+                for note_id, card_id in self._conn.execute(
+                    "SELECT n.id, c.value FROM notes n, json_each(n.cards) c"
+                )
+                if note_id in remote and note_id not in refetched
+            ]
+            card_decks = await self._card_decks([card_id for card_id, _ in kept])
+        except BaseException:
+            self._dirty |= dirty
+            raise
+
+        with self._conn:
+            self._delete(deleted)
+            self._store(rows, cards)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cards VALUES (?, ?, ?)",
+                [(card_id, note_id, card_decks.get(card_id)) for card_id, note_id in kept],
+            )
+            # The deck shown with a note is that of its first card
+            self._conn.execute(
+                "UPDATE notes SET deck = (SELECT c.deck FROM cards c "
+                "WHERE c.id = json_extract(notes.cards, '$[0]'))"
+            )
+
+        self._synced_at = time.monotonic()
+        added = sum(1 for row in rows if row[0] not in local)
+        self._last_sync = {
+            "added": added,
+            "updated": len(rows) - added,
+            "deleted": len(deleted),
+            "total": len(remote),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logger.debug(f"Mirror sync: {self._last_sync}")
+        return self._last_sync
+
+    async def get_notes(self, note_ids: list[int]) -> list[dict[str, Any]]:
+        """Return notes in ``notesInfo`` format, in the order of ``note_ids``.
+
+        Notes missing from the mirror are fetched from AnkiConnect and stored;
+        IDs that do not exist yield an empty dictionary, as with ``notesInfo``.
+        """
+        await self.ensure_fresh()
+        found = self._load(note_ids)
+        missing = [note_id for note_id in note_ids if note_id not in found]
+        if missing:
+            rows, cards = await self._fetch_rows(missing)
+            with self._conn:
+                self._store(rows, cards)
+            found.update(self._load(missing))
+        return [found.get(note_id, {}) for note_id in note_ids]
+
+    async def find_notes(self, query: str) -> list[int] | None:
+        """Return the IDs of notes matching ``query`` in ascending order.
+
+        Returns:
+            List of note IDs, or None if the query must be answered by Anki
+        """
+        local = await self._translate(query)
+        if local is None:
+            return None
+        where, params = local.where()
+        return [
+            note_id
+            for (note_id,) in self._conn.execute(
+                f"SELECT n.id FROM notes n WHERE {where} ORDER BY n.id", params
+            )
+        ]
+
+    async def search(self, query: str, limit: int = 50, offset: int = 0) -> dict[str, Any] | None:
+        """Rank notes matching ``query`` and return compact results with snippets.
+
+        Notes are ranked by BM25 relevance of the query's plain-text terms; queries
+        without text terms return notes in ID order. Matches in snippets are
+        wrapped in ``<b>`` tags.
+
+        Args:
+            query: Anki search query
+            limit: Maximum number of results
+            offset: Number of leading results to skip
+
+        Returns:
+            Dictionary with total and results (noteId, modelName, deck, tags,
+            snippet, score), or None if the query must be answered by Anki
+        """
+        local = await self._translate(query)
+        if local is None:
+            return None
+        where, where_params = local.where()
+        (total,) = self._conn.execute(
+            f"SELECT COUNT(*) FROM notes n WHERE {where}", where_params
+        ).fetchone()
+        if local.match:
+            sql = (
+                "SELECT n.id, n.model, n.deck, n.tags, "
+                "snippet(notes_fts, 0, '<b>', '</b>', '…', 32), bm25(notes_fts) AS score "
+                "FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+                f"WHERE notes_fts MATCH ? AND {where} ORDER BY score, n.id LIMIT ? OFFSET ?"
+            )
+            params = [local.match, *where_params, limit, offset]
+        else:
+            sql = (
+                f"SELECT n.id, n.model, n.deck, n.tags, substr(f.text, 1, {SNIPPET_LENGTH}), "
+                "NULL FROM notes n JOIN notes_fts f ON f.rowid = n.id "
+                f"WHERE {where} ORDER BY n.id LIMIT ? OFFSET ?"
+            )
+            params = [*where_params, limit, offset]
+        results = [
+            {
+                "noteId": note_id,
+                "modelName": model,
+                "deck": deck,
+                "tags": json.loads(tags),
+                "snippet": snippet,
+                # bm25() is lower for better matches; flip it so higher is better
+                "score": None if score is None else round(-score, 4),
+            }
+            for note_id, model, deck, tags, snippet, score in self._conn.execute(sql, params)
+        ]
+        return {"total": total, "results": results}
+
+    async def _translate(self, query: str) -> LocalQuery | None:
+        """Bring the mirror up to date and translate ``query`` for it."""
+        if not self.fts_enabled:
+            return None
+        local = translate_query(query, self._field_names)
+        # Field names are only known once notes have been synced
+        if local is not None or self._synced_at is None:
+            await self.ensure_fresh()
+            local = translate_query(query, self._field_names)
+        return local
+
+    def invalidate(self, note_ids: list[int]) -> None:
+        """Mark notes created, changed or deleted through this server for re-fetching."""
+        self._dirty.update(note_ids)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the mirror size and the outcome of the last sync."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()
+        return {
+            "path": self.path,
+            "notes": count,
+            "fullTextSearch": self.fts_enabled,
+            "fresh": self.is_fresh(),
+            "pendingRefresh": len(self._dirty),
+            "secondsSinceSync": None
+            if self._synced_at is None
+            else round(time.monotonic() - self._synced_at, 3),
+            "lastSync": self._last_sync,
+        }
+
+    def close(self) -> None:
+        """Close the database."""
+        self._conn.close()
+
+    async def _map_chunks(
+        self, fetch: Callable[[list[int]], Awaitable[Any]], ids: list[int]
+    ) -> list[Any]:
+        """Call ``fetch`` on ``chunk_size`` slices of ``ids`` with bounded concurrency."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(chunk: list[int]) -> Any:
+            async with semaphore:
+                return await fetch(chunk)
+
+        return await asyncio.gather(
+            *(run(ids[i : i + self.chunk_size]) for i in range(0, len(ids), self.chunk_size))
+        )
+
+    async def _fetch_rows(
+        self, note_ids: list[int]
+    ) -> tuple[list[tuple[Any, ...]], list[tuple[Any, ...]]]:
+        """Fetch notes and the decks of their cards as note and card database rows."""
+        infos = [
+            info
+            for chunk in await self._map_chunks(self.client.notes_info, note_ids)
+            for info in chunk
+            if info
+        ]
+        card_decks = await self._card_decks(
+            [card_id for info in infos for card_id in info.get("cards", [])]
+        )
+        notes = [
+            (
+                info["noteId"],
+                info["modelName"],
+                card_decks.get(info["cards"][0]) if info.get("cards") else None,
+                info["mod"],
+                json.dumps(info["tags"]),
+                json.dumps(info["fields"]),
+                json.dumps(info.get("cards", [])),
+            )
+            for info in infos
+        ]
+        cards = [
+            (card_id, info["noteId"], card_decks.get(card_id))
+            for info in infos
+            for card_id in info.get("cards", [])
+        ]
+        return notes, cards
+
+    async def _card_decks(self, card_ids: list[int]) -> dict[int, str]:
+        """Return the deck of each card."""
+        card_decks: dict[int, str] = {}
+        for chunk in await self._map_chunks(self.client.get_decks, card_ids):
+            for deck, cards in chunk.items():
+                card_decks.update(dict.fromkeys(cards, deck))
+        return card_decks
+
+    def _store(self, rows: list[tuple[Any, ...]], cards: list[tuple[Any, ...]]) -> None:
+        self._delete([row[0] for row in rows])
+        self._conn.executemany("INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self._conn.executemany("INSERT OR REPLACE INTO cards VALUES (?, ?, ?)", cards)
+        for row in rows:
+            fields = json.loads(row[5])
+            self._field_names.update(name.lower() for name in fields)
+            if self.fts_enabled:
+                self._conn.execute(
+                    "INSERT INTO notes_fts (rowid, text) VALUES (?, ?)",
+                    (row[0], fields_text(fields)),
+                )
+
+    def _delete(self, note_ids: list[int]) -> None:
+        params = [(note_id,) for note_id in note_ids]
+        self._conn.executemany("DELETE FROM notes WHERE id = ?", params)
+        self._conn.executemany("DELETE FROM cards WHERE nid = ?", params)
+        if self.fts_enabled:
+            self._conn.executemany("DELETE FROM notes_fts WHERE rowid = ?", params)
+
+    def _load(self, note_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """Read notes from the database as ``notesInfo`` dictionaries."""
+        notes = {}
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(note_ids), 500):
+            chunk = note_ids[i : i + 500]
+            query = (
+                "SELECT id, model, mod, tags, fields, cards FROM notes "
+                f"WHERE id IN ({','.join('?' * len(chunk))})"
+            )
+            for note_id, model, mod, tags, fields, cards in self._conn.execute(query, chunk):
+                notes[note_id] = {
+                    "noteId": note_id,
+                    "modelName": model,
+                    "tags": json.loads(tags),
+                    "fields": json.loads(fields),
+                    "mod": mod,
+                    "cards": json.loads(cards),
+                }
+        return notes
@@ -0,0 +1,317 @@
+"""Read-only AnkiClient backend answering from an Anki package or collection file."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+import zipfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from anki_mcp_server.apkg import iter_notes, open_collection, read_decks, read_models
+from anki_mcp_server.client import AnkiClient, AnkiUnavailableError
+from anki_mcp_server.health import CircuitOpenError
+from anki_mcp_server.metrics import count_round_trip
+from anki_mcp_server.search import translate_query
+from anki_mcp_server.shaping import fields_text
+
+logger = logging.getLogger(__name__)
+
+# Same notes table as the mirror, so translate_query applies, plus a card index
+_SCHEMA = """
+CREATE TABLE notes (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    deck TEXT,
+    mod INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    cards TEXT NOT NULL
+);
+CREATE TABLE cards (
+    id INTEGER PRIMARY KEY,
+    nid INTEGER NOT NULL,
+    deck TEXT
+);
+CREATE INDEX notes_model ON notes (model);
+CREATE INDEX notes_deck ON notes (deck);
+CREATE INDEX cards_nid ON cards (nid);
+"""
+
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE notes_fts USING fts5(text, tokenize='trigram')"
+
+
+class _ActionError(Exception):
+    """Error returned in the ``error`` field of a response."""
+
+    pass
+
+
+class PackageClient(AnkiClient):
+    """AnkiClient that serves read actions from an .apkg package or collection file.
+
+    The file is opened read-only on first use and its notes are loaded into an
+    indexed in-memory SQLite database (with a full-text index where SQLite
+    supports FTS5), which then answers ``deckNames``, ``modelNames``, the model
+    schema actions, ``findNotes``, ``findCards``, ``notesInfo``,
+    ``notesModTime`` and ``getDecks`` without Anki running. ``findNotes``
+    supports the search subset of ``translate_query``. Write actions fail with
+    AnkiConnectError. Requests go through the regular client machinery, so
+    metrics, batching and ``multi`` behave as with AnkiConnect.
+
+    Args:
+        path: Path to an .apkg/.colpkg package or a collection SQLite file
+        **kwargs: Passed on to AnkiClient (metrics, batch_window_us, ...)
+    """
+
+    def __init__(self, path: str | Path, **kwargs: Any):
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise FileNotFoundError(f"Anki package not found: {self.path}")
+        super().__init__(url=self.path.resolve().as_uri(), **kwargs)
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._models: dict[str, dict[str, Any]] = {}
+        self._decks: dict[str, int] = {}
+        self._field_names: set[str] = set()
+
+    async def _post(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Answer a request from the collection in a worker thread.
+
+        Reports to ``self.health`` and ``self.metrics`` like an AnkiConnect round
+        trip, with the JSON sizes of the payload and answer as transfer bytes.
+
+        Raises:
+            AnkiUnavailableError: If the file cannot be read or the circuit is open
+        """
+        try:
+            self.health.before_request()
+        except CircuitOpenError as e:
+            raise AnkiUnavailableError(str(e)) from e
+
+        count_round_trip()
+        try:
+            data = await asyncio.to_thread(self._respond, payload)
+        except (OSError, ValueError, zipfile.BadZipFile, sqlite3.DatabaseError) as e:
+            self.health.record_failure(e)
+            raise AnkiUnavailableError(f"Failed to read Anki package {self.path.name}: {e}") from e
+
+        self.health.record_success()
+        self.metrics.record_transfer(
+            payload["action"], len(json.dumps(payload)), len(json.dumps(data))
+        )
+        return data
+
+    def _respond(self, payload: dict[str, Any]) -> Any:
+        with self._db_lock:
+            if self._db is None:
+                self._db = self._load()
+            return self._handle(payload)
+
+    def _handle(self, payload: dict[str, Any]) -> Any:
+        action = payload.get("action", "")
+        params = payload.get("params") or {}
+        if action == "multi":
+            return {
+                "result": [self._handle(sub) for sub in params.get("actions", [])],
+                "error": None,
+            }
+        handler: Callable[..., Any] | None = getattr(self, self._ACTIONS.get(action, ""), None)
+        if handler is None:
+            return {"result": None, "error": f"{action} is not supported by a read-only package"}
+        try:
+            return {"result": handler(**params), "error": None}
+        except (_ActionError, TypeError, sqlite3.OperationalError) as e:
+            return {"result": None, "error": str(e)}
+
+    _ACTIONS = {
+        "version": "_version",
+        "deckNames": "_deck_names",
+        "deckNamesAndIds": "_deck_names_and_ids",
+        "modelNames": "_model_names",
+        "modelNamesAndIds": "_model_names_and_ids",
+        "modelFieldNames": "_model_field_names",
+        "modelTemplates": "_model_templates",
+        "modelStyling": "_model_styling",
+        "findModelsById": "_find_models_by_id",
+        "findModelsByName": "_find_models_by_name",
+        "findNotes": "_find_notes",
+        "findCards": "_find_cards",
+        "notesInfo": "_notes_info",
+        "notesModTime": "_notes_mod_time",
+        "getDecks": "_get_decks",
+    }
+
+    def _load(self) -> sqlite3.Connection:
+        """Read the collection into an indexed in-memory database."""
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        db.executescript(_SCHEMA)
+        try:
+            db.execute(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # Plain-text terms then fall back to LIKE scans; longer ones fail
+            logger.warning(f"Full-text search unavailable for {self.path.name}: {e}")
+            db.execute("CREATE TABLE notes_fts (rowid INTEGER PRIMARY KEY, text TEXT)")
+
+        with tempfile.TemporaryDirectory(prefix="anki-mcp-") as workdir:
+            source = open_collection(self.path, workdir)
+            try:
+                models = read_models(source)
+                self._decks = read_decks(source)
+                deck_names = {deck_id: name for name, deck_id in self._decks.items()}
+                cards: dict[int, list[int]] = {}
+                for card_id, note_id, deck_id in source.execute(
+                    "SELECT id, nid, did FROM cards ORDER BY nid, ord"
+                ):
+                    cards.setdefault(note_id, []).append(card_id)
+                    db.execute(
+                        "INSERT INTO cards VALUES (?, ?, ?)",
+                        (card_id, note_id, deck_names.get(deck_id)),
+                    )
+
+                by_id = {model["id"]: model for model in models}
+                for note in iter_notes(source):
+                    model = by_id.get(note["mid"])
+                    if model is None:
+                        continue
+                    names = [f["name"] for f in sorted(model["flds"], key=lambda f: f["ord"])]
+                    fields = {
+                        name: {"value": value, "order": i}
+                        for i, (name, value) in enumerate(zip(names, note["fields"], strict=False))
+                    }
+                    db.execute(
+                        "INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            note["id"],
+                            model["name"],
+                            deck_names.get(note["did"]),
+                            note["mod"],
+                            json.dumps(note["tags"]),
+                            json.dumps(fields),
+                            json.dumps(cards.get(note["id"], [])),
+                        ),
+                    )
+                    db.execute(
+                        "INSERT INTO notes_fts (rowid, text) VALUES (?, ?)",
+                        (note["id"], fields_text(fields)),
+                    )
+            finally:
+                source.close()
+
+        db.commit()
+        self._models = {model["name"]: model for model in models}
+        self._field_names = {f["name"].lower() for model in models for f in model["flds"]}
+        return db
+
+    # Decks and note types
+
+    def _version(self) -> int:
+        return 6
+
+    def _deck_names(self) -> list[str]:
+        return sorted(self._decks)
+
+    def _deck_names_and_ids(self) -> dict[str, int]:
+        return dict(self._decks)
+
+    def _model(self, model_name: str) -> dict[str, Any]:
+        model = self._models.get(model_name)
+        if model is None:
+            raise _ActionError(f"model was not found: {model_name}")
+        return model
+
+    def _model_names(self) -> list[str]:
+        return list(self._models)
+
+    def _model_names_and_ids(self) -> dict[str, int]:
+        return {name: model["id"] for name, model in self._models.items()}
+
+    def _model_field_names(self, modelName: str) -> list[str]:
+        return [f["name"] for f in sorted(self._model(modelName)["flds"], key=lambda f: f["ord"])]
+
+    def _model_templates(self, modelName: str) -> dict[str, dict[str, str]]:
+        return {
+            t["name"]: {"Front": t["qfmt"], "Back": t["afmt"]}
+            for t in self._model(modelName)["tmpls"]
+        }
+
+    def _model_styling(self, modelName: str) -> dict[str, str]:
+        return {"css": self._model(modelName)["css"]}
+
+    def _find_models_by_id(self, modelIds: list[int]) -> list[dict[str, Any]]:
+        by_id = {model["id"]: model for model in self._models.values()}
+        missing = [i for i in modelIds if i not in by_id]
+        if missing:
+            raise _ActionError(f"model was not found: {missing[0]}")
+        return [by_id[i] for i in modelIds]
+
+    def _find_models_by_name(self, modelNames: list[str]) -> list[dict[str, Any]]:
+        return [self._model(name) for name in modelNames]
+
+    # Notes and cards
+
+    def _where(self, query: str, cards: bool = False) -> tuple[str, list[Any]]:
+        local = translate_query(query, self._field_names)
+        if local is None:
+            raise _ActionError(f"search not supported by a read-only package: {query}")
+        return local.where(cards)
+
+    def _find_notes(self, query: str) -> list[int]:
+        where, params = self._where(query)
+        sql = f"SELECT n.id FROM notes n WHERE {where} ORDER BY n.id"
+        return [note_id for (note_id,) in self._db.execute(sql, params)]
+
+    def _find_cards(self, query: str) -> list[int]:
+        where, params = self._where(query, cards=True)
+        sql = (
+            "SELECT c.id FROM cards c JOIN notes n ON n.id = c.nid "
+            f"WHERE {where} ORDER BY c.nid, c.id"
+        )
+        return [card_id for (card_id,) in self._db.execute(sql, params)]
+
+    def _rows(self, sql: str, ids: list[int]) -> list[tuple[Any, ...]]:
+        """Run ``sql`` (with an ``IN ({})`` placeholder) over ids in chunks."""
+        rows = []
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            rows.extend(self._db.execute(sql.format(",".join("?" * len(chunk))), chunk))
+        return rows
+
+    def _notes_info(self, notes: list[int]) -> list[dict[str, Any]]:
+        found = {
+            note_id: {
+                "noteId": note_id,
+                "profile": self.path.stem,
+                "modelName": model,
+                "tags": json.loads(tags),
+                "fields": json.loads(fields),
+                "mod": mod,
+                "cards": json.loads(cards),
+            }
+            for note_id, model, mod, tags, fields, cards in self._rows(
+                "SELECT id, model, mod, tags, fields, cards FROM notes WHERE id IN ({})", notes
+            )
+        }
+        return [found.get(note_id, {}) for note_id in notes]
+
+    def _notes_mod_time(self, notes: list[int]) -> list[dict[str, int]]:
+        mods = dict(self._rows("SELECT id, mod FROM notes WHERE id IN ({})", notes))
+        return [{"noteId": note_id, "mod": mods[note_id]} for note_id in notes if note_id in mods]
+
+    def _get_decks(self, cards: list[int]) -> dict[str, list[int]]:
+        result: dict[str, list[int]] = {}
+        for card_id, deck in self._rows("SELECT id, deck FROM cards WHERE id IN ({})", cards):
+            result.setdefault(deck, []).append(card_id)
+        return result
+
+    async def close(self) -> None:
+        """Close the in-memory database and the HTTP client."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        await super().close()
@@ -0,0 +1,97 @@
+"""Server-side result sets behind opaque pagination cursors."""
+
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+class CursorError(ValueError):
+    """Raised when a pagination cursor is malformed, expired or used for another query."""
+
+    pass
+
+
+@dataclass
+class ResultSet:
+    """Stored search whose pages are served through a cursor.
+
+    Attributes:
+        query: Search query the result set belongs to
+        note_ids: Matching note IDs in result order, or None if pages are
+            recomputed from the local mirror
+        expires_at: ``time.monotonic()`` deadline
+    """
+
+    query: str
+    note_ids: list[int] | None
+    expires_at: float
+
+
+class ResultSetCache:
+    """Keeps search results so later pages only fetch their own notes.
+
+    Cursors have the form ``<token>:<offset>``. Entries expire ``ttl`` seconds
+    after they were last used; once the stored IDs exceed ``max_ids`` the least
+    recently used result sets are dropped (the newest one is always kept).
+
+    Args:
+        ttl: Seconds a result set stays valid after its last use (default: 600)
+        max_ids: Maximum number of note IDs kept across all result sets (default: 500000)
+    """
+
+    def __init__(self, ttl: float = 600.0, max_ids: int = 500_000):
+        self.ttl = ttl
+        self.max_ids = max_ids
+        self._sets: OrderedDict[str, ResultSet] = OrderedDict()
+        self._size = 0
+
+    def put(self, query: str, note_ids: list[int] | None) -> str:
+        """Store a result set and return its token."""
+        self._expire()
+        token = secrets.token_urlsafe(8)
+        self._sets[token] = ResultSet(query, note_ids, time.monotonic() + self.ttl)
+        self._size += len(note_ids or ())
+        while self._size > self.max_ids and len(self._sets) > 1:
+            self._drop(next(iter(self._sets)))
+        return token
+
+    @staticmethod
+    def cursor(token: str, offset: int) -> str:
+        """Build the cursor for the page of result set ``token`` starting at ``offset``."""
+        return f"{token}:{offset}"
+
+    def get(self, cursor: str, query: str) -> tuple[str, ResultSet, int]:
+        """Resolve a cursor into its token, result set and offset.
+
+        Raises:
+            CursorError: If the cursor is malformed, expired or belongs to another query
+        """
+        token, _, offset = cursor.rpartition(":")
+        if not token or not offset.isdigit():
+            raise CursorError(f"Invalid cursor: {cursor}")
+        self._expire()
+        result_set = self._sets.get(token)
+        if result_set is None:
+            raise CursorError("Cursor expired; run the search again without a cursor")
+        if result_set.query != query:
+            raise CursorError("Cursor belongs to a different query")
+        result_set.expires_at = time.monotonic() + self.ttl
+        self._sets.move_to_end(token)
+        return token, result_set, int(offset)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of stored result sets and note IDs."""
+        return {"resultSets": len(self._sets), "noteIds": self._size, "maxNoteIds": self.max_ids}
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for token in [t for t, s in self._sets.items() if s.expires_at <= now]:
+            self._drop(token)
+
+    def _drop(self, token: str) -> None:
+        result_set = self._sets.pop(token)
+        self._size -= len(result_set.note_ids or ())
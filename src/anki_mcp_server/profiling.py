@@ -0,0 +1,115 @@
+"""Opt-in cProfile capture of slow MCP tool invocations."""
+
+import cProfile
+import heapq
+import logging
+import pstats
+import re
+import time
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class ToolProfiler:
+    """Profile tool invocations and keep the slowest ones on disk.
+
+    Each invocation runs under ``cProfile``; if it took at least ``threshold_ms``
+    its profile is written to ``directory`` as ``<tool>-<ms>ms-<n>.pstats`` (load
+    with ``python -m pstats`` or snakeviz) and as a ``.collapsed`` file in the
+    folded-stack format read by flamegraph.pl and speedscope. Only the ``keep``
+    slowest profiles per tool are retained.
+
+    cProfile hooks the whole thread, so a profile also contains whatever other
+    tasks ran on the event loop while the tool awaited AnkiConnect. Only one
+    invocation is profiled at a time; concurrent ones run unprofiled.
+
+    Args:
+        directory: Directory to write profiles to (created if missing)
+        threshold_ms: Minimum wall time for a profile to be kept (default: 100)
+        keep: Number of slowest profiles kept per tool (default: 5)
+    """
+
+    def __init__(self, directory: str | Path, threshold_ms: float = 100.0, keep: int = 5):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.threshold_ms = threshold_ms
+        self.keep = keep
+        self._active = False
+        self._count = 0
+        # Per tool: min-heap of (elapsed ms, file stem) so the fastest is evicted first
+        self._kept: dict[str, list[tuple[float, str]]] = {}
+
+    async def run(self, tool: str, call: Any) -> Any:
+        """Await ``call()`` under the profiler and store the profile if it was slow."""
+        if self._active:
+            return await call()
+
+        self._active = True
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return await call()
+        finally:
+            profile.disable()
+            self._active = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                try:
+                    self._store(tool, elapsed_ms, profile)
+                except OSError as e:
+                    logger.warning(f"Failed to write profile for {tool}: {e}")
+
+    def _store(self, tool: str, elapsed_ms: float, profile: cProfile.Profile) -> None:
+        """Write a profile and evict the fastest one beyond ``keep``."""
+        kept = self._kept.setdefault(tool, [])
+        if len(kept) >= self.keep and elapsed_ms <= kept[0][0]:
+            return
+
+        self._count += 1
+        stem = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', tool)}-{elapsed_ms:.0f}ms-{self._count}"
+        stats = pstats.Stats(profile)
+        stats.dump_stats(self.directory / f"{stem}.pstats")
+        (self.directory / f"{stem}.collapsed").write_text(collapse(stats), encoding="utf-8")
+
+        heapq.heappush(kept, (elapsed_ms, stem))
+        while len(kept) > self.keep:
+            _, evicted = heapq.heappop(kept)
+            for suffix in (".pstats", ".collapsed"):
+                (self.directory / f"{evicted}{suffix}").unlink(missing_ok=True)
+
+
+def _label(func: tuple[str, int, str]) -> str:
+    """Format a pstats function key as ``name (file:line)``."""
+    filename, line, name = func
+    label = f"{name} ({Path(filename).name}:{line})" if line else name
+    return label.replace(";", ",")
+
+
+def collapse(stats: pstats.Stats) -> str:
+    """Render profile stats as folded stacks (``a;b;c <microseconds>`` per line).
+
+    cProfile records caller/callee pairs rather than full stacks, so each
+    function's own time is attributed to the chain of its heaviest callers.
+    """
+    entries: dict[Any, Any] = stats.stats  # type: ignore[attr-defined]
+    lines = []
+    for func, (_, _, tottime, _, callers) in entries.items():
+        weight = round(tottime * 1_000_000)
+        if weight <= 0:
+            continue
+        chain = [_label(func)]
+        seen = {func}
+        current = callers
+        while current:
+            # Heaviest caller by cumulative time spent calling this frame
+            parent = max(current, key=lambda c: current[c][3])
+            if parent in seen or parent not in entries:
+                break
+            seen.add(parent)
+            chain.append(_label(parent))
+            current = entries[parent][4]
+        lines.append(f"{';'.join(reversed(chain))} {weight}")
+    return "\n".join(sorted(lines)) + "\n"
@@ -1,41 +1,58 @@
 """MCP resource handlers for Anki metadata."""
 
-import json
-import time
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from mcp.types import Resource, ResourceTemplate
 
-from anki_mcp_server.client import AnkiClient
+from anki_mcp_server.cache import MetadataCache
+from anki_mcp_server.client import AnkiClient, AnkiConnectError
+from anki_mcp_server.encoding import ResponseEncoder
+
+logger = logging.getLogger(__name__)
 
 
 class ResourceHandler:
     """Handles all MCP resource operations for Anki.
 
-    Provides cached access to Anki metadata like decks and note types.
+    Provides cached access to Anki metadata like decks and note types. The same
+    cache backs the metadata tools, and write tools invalidate the affected keys.
+
+    With ``stale_while_revalidate`` set, an entry past its TTL is still served
+    immediately for that many extra seconds while a background task refreshes it
+    (at most one refresh per key). Past that window reads block on a fetch again.
 
     Args:
         client: AnkiConnect client instance
-        cache_expiry: Cache TTL in seconds (default: 300 = 5 minutes)
+        cache_expiry: Cache TTL in seconds for note types and schemas (default: 300 = 5 minutes)
+        deck_cache_expiry: Cache TTL in seconds for the deck list (default: 60)
+        max_cache_entries: Maximum number of cached entries (default: 256)
+        stale_while_revalidate: Seconds past the TTL an entry may be served stale
+            while it is refreshed in the background (default: 0 = disabled)
+        encoder: Encoder for resource contents (default: one configured from the environment)
     """
 
-    def __init__(self, client: AnkiClient, cache_expiry: int = 300):
+    def __init__(
+        self,
+        client: AnkiClient,
+        cache_expiry: int = 300,
+        deck_cache_expiry: int = 60,
+        max_cache_entries: int = 256,
+        stale_while_revalidate: float = 0,
+        encoder: ResponseEncoder | None = None,
+    ):
         self.client = client
+        self.encoder = encoder or ResponseEncoder()
         self.cache_expiry = cache_expiry
-        self._cache: dict[str, tuple[Any, float]] = {}
-
-    def _get_cached(self, key: str) -> Any | None:
-        """Get cached value if not expired."""
-        if key in self._cache:
-            value, timestamp = self._cache[key]
-            if time.time() - timestamp < self.cache_expiry:
-                return value
-            del self._cache[key]
-        return None
-
-    def _set_cached(self, key: str, value: Any) -> None:
-        """Store value in cache with current timestamp."""
-        self._cache[key] = (value, time.time())
+        self.deck_cache_expiry = deck_cache_expiry
+        self._cache = MetadataCache(
+            max_entries=max_cache_entries,
+            default_ttl=cache_expiry,
+            stale_ttl=stale_while_revalidate,
+        )
+        self._refreshing: dict[str, asyncio.Task[None]] = {}
 
     def get_resource_list(self) -> list[Resource]:
         """Return list of available static resources."""
@@ -101,71 +118,163 @@ class ResourceHandler:
         else:
             raise ValueError(f"Unknown resource URI: {uri}")
 
+    async def get_decks(self) -> list[str]:
+        """Get all deck names with caching."""
+        return await self._get_or_fetch(
+            "decks", self.client.get_deck_names, ttl=self.deck_cache_expiry
+        )
+
+    async def get_note_types(self) -> list[str]:
+        """Get all note type names with caching."""
+        return await self._get_or_fetch("note_types", self.client.get_model_names)
+
+    async def get_model_schema(self, model_name: str) -> dict[str, Any]:
+        """Get fields, templates and CSS for a note type with caching."""
+        return await self._get_or_fetch(
+            f"schema:{model_name}", lambda: self._fetch_schema(model_name)
+        )
+
+    async def get_model_definition(self, model_name: str) -> dict[str, Any]:
+        """Get the full model definition of a note type (``findModelsByName``) with caching."""
+        return await self._get_or_fetch(
+            f"model:{model_name}",
+            lambda: self._fetch_model_definition(model_name),
+        )
+
+    async def get_all_schemas(self) -> list[dict[str, Any]]:
+        """Get schemas for all note types with caching."""
+        return await self._get_or_fetch("all_schemas", self._refresh_all_schemas)
+
+    async def _get_or_fetch(
+        self, key: str, fetch: Callable[[], Awaitable[Any]], ttl: float | None = None
+    ) -> Any:
+        """Return the cached value for ``key``, fetching or revalidating it as needed."""
+        found = self._cache.get_stale(key)
+        if found is None:
+            value = await fetch()
+            self._cache.set(key, value, ttl=ttl)
+            return value
+
+        value, fresh = found
+        if not fresh and key not in self._refreshing:
+            task = asyncio.get_running_loop().create_task(self._revalidate(key, fetch, ttl))
+            self._refreshing[key] = task
+            task.add_done_callback(
+                lambda t: self._refreshing.pop(key) if self._refreshing.get(key) is t else None
+            )
+        return value
+
+    async def _revalidate(
+        self, key: str, fetch: Callable[[], Awaitable[Any]], ttl: float | None
+    ) -> None:
+        """Refresh a stale entry in the background, keeping the stale value on failure."""
+        try:
+            self._cache.set(key, await fetch(), ttl=ttl)
+        except AnkiConnectError as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+
+    async def _refresh_all_schemas(self) -> list[dict[str, Any]]:
+        """Fetch every model definition in one round trip and rebuild all schemas.
+
+        The full definitions arrive in the same response, so every schema is rebuilt
+        locally and re-cached; comparing modification stamps would save no request.
+        """
+        names_and_ids = await self.client.get_model_names_and_ids()
+        self._cache.set("note_types", list(names_and_ids))
+
+        try:
+            models = await self.client.find_models_by_id(list(names_and_ids.values()))
+        except AnkiConnectError:
+            # Older AnkiConnect versions lack findModelsById
+            return list(await asyncio.gather(*(self.get_model_schema(n) for n in names_and_ids)))
+
+        schemas = []
+        for model in models:
+            schema = self._schema_from_model(model)
+            self._cache.set(f"schema:{model['name']}", schema)
+            schemas.append(schema)
+        return schemas
+
     async def _read_decks(self) -> str:
         """Read all decks."""
-        decks = await self.client.get_deck_names()
-        return json.dumps({"decks": decks, "count": len(decks)}, indent=2)
+        decks = await self.get_decks()
+        return self.encoder.encode({"decks": decks, "count": len(decks)})
 
     async def _read_note_types(self) -> str:
-        """Read all note type names with caching."""
-        cached = self._get_cached("note_types")
-        if cached:
-            return cached
-
-        note_types = await self.client.get_model_names()
-        result = json.dumps({"noteTypes": note_types, "count": len(note_types)}, indent=2)
-        self._set_cached("note_types", result)
-        return result
+        """Read all note type names."""
+        note_types = await self.get_note_types()
+        return self.encoder.encode({"noteTypes": note_types, "count": len(note_types)})
 
     async def _read_model_schema(self, model_name: str) -> str:
-        """Read schema for a specific note type with caching."""
-        cache_key = f"schema:{model_name}"
-        cached = self._get_cached(cache_key)
-        if cached:
-            return cached
+        """Read schema for a specific note type."""
+        return self.encoder.encode(await self.get_model_schema(model_name))
+
+    async def _read_all_schemas(self) -> str:
+        """Read schemas for all note types."""
+        return self.encoder.encode(await self.get_all_schemas())
 
-        fields = await self.client.get_model_field_names(model_name)
-        templates = await self.client.get_model_templates(model_name)
-        styling = await self.client.get_model_styling(model_name)
+    async def _fetch_schema(self, model_name: str) -> dict[str, Any]:
+        """Fetch fields, templates and styling for a note type.
 
-        schema = {
+        The three calls are issued concurrently so a batching client sends them
+        as a single ``multi`` request.
+        """
+        fields, templates, styling = await asyncio.gather(
+            self.client.get_model_field_names(model_name),
+            self.client.get_model_templates(model_name),
+            self.client.get_model_styling(model_name),
+        )
+        return {
             "modelName": model_name,
             "fields": fields,
             "templates": templates,
             "css": styling.get("css", ""),
         }
 
-        result = json.dumps(schema, indent=2)
-        self._set_cached(cache_key, result)
-        return result
+    async def _fetch_model_definition(self, model_name: str) -> dict[str, Any]:
+        """Fetch the full definition of one note type."""
+        [model] = await self.client.find_models_by_name([model_name])
+        return model
 
-    async def _read_all_schemas(self) -> str:
-        """Read schemas for all note types with caching."""
-        cached = self._get_cached("all_schemas")
-        if cached:
-            return cached
+    @staticmethod
+    def _schema_from_model(model: dict[str, Any]) -> dict[str, Any]:
+        """Build a schema in the ``_fetch_schema`` format from a full model definition."""
+        fields = sorted(model.get("flds", []), key=lambda f: f.get("ord", 0))
+        templates = sorted(model.get("tmpls", []), key=lambda t: t.get("ord", 0))
+        return {
+            "modelName": model["name"],
+            "fields": [f["name"] for f in fields],
+            "templates": {t["name"]: {"Front": t["qfmt"], "Back": t["afmt"]} for t in templates},
+            "css": model.get("css", ""),
+        }
 
-        note_types = await self.client.get_model_names()
-        schemas = []
+    def invalidate_decks(self) -> None:
+        """Drop the cached deck list after a deck was created or removed."""
+        self._invalidate("decks")
 
-        for model_name in note_types:
-            fields = await self.client.get_model_field_names(model_name)
-            templates = await self.client.get_model_templates(model_name)
-            styling = await self.client.get_model_styling(model_name)
-
-            schemas.append(
-                {
-                    "modelName": model_name,
-                    "fields": fields,
-                    "templates": templates,
-                    "css": styling.get("css", ""),
-                }
-            )
+    def invalidate_note_types(self) -> None:
+        """Drop the cached note type list after a note type may have been added in Anki."""
+        self._invalidate("note_types", "all_schemas")
+
+    def invalidate_note_type(self, model_name: str) -> None:
+        """Drop cached data for a note type after it was created or changed."""
+        self._invalidate("note_types", "all_schemas", f"schema:{model_name}", f"model:{model_name}")
+
+    def _invalidate(self, *keys: str) -> None:
+        """Drop cache keys and cancel background refreshes that would restore old data."""
+        for key in keys:
+            task = self._refreshing.pop(key, None)
+            if task is not None:
+                task.cancel()
+        self._cache.invalidate(*keys)
 
-        result = json.dumps(schemas, indent=2)
-        self._set_cached("all_schemas", result)
-        return result
+    def cache_stats(self) -> dict[str, Any]:
+        """Return cache size and hit/miss counters."""
+        return self._cache.stats()
 
     def clear_cache(self) -> None:
         """Clear all cached data."""
+        for task in self._refreshing.values():
+            task.cancel()
+        self._refreshing.clear()
         self._cache.clear()
@@ -0,0 +1,179 @@
+"""Translate a subset of Anki's search syntax into SQL over the note mirror."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+# Whitespace-separated tokens; double quotes may group text containing spaces
+_TOKEN_RE = re.compile(r'-?(?:[^\s"]*"[^"]*"|\S+)')
+
+# Prefixes whose semantics the mirror cannot reproduce (card state, review history, ...)
+_UNSUPPORTED_KEYS = frozenset(
+    {
+        "added",
+        "card",
+        "cid",
+        "dupe",
+        "edited",
+        "flag",
+        "introduced",
+        "is",
+        "mid",
+        "nc",
+        "prop",
+        "preset",
+        "rated",
+        "re",
+        "resched",
+        "w",
+    }
+)
+
+# Shortest plain term the trigram index can look up; shorter terms scan the index
+MIN_TRIGRAM_LENGTH = 3
+
+
+@dataclass
+class LocalQuery:
+    """SQL translation of an Anki search over a ``notes n`` table.
+
+    ``deck:`` terms also need a ``cards c`` table with the ``nid`` and ``deck`` of
+    every card: as in Anki they are checked per card, and a note matches if one
+    of its cards satisfies all of them.
+
+    Attributes:
+        match: FTS5 expression of the positive plain-text terms (used for ranking),
+            or None if the query has none
+        conditions: SQL conditions on the note that must all hold
+        params: Parameters for ``conditions``, in order
+        card_conditions: SQL conditions on a card that must all hold
+        card_params: Parameters for ``card_conditions``, in order
+    """
+
+    match: str | None = None
+    conditions: list[str] = field(default_factory=list)
+    params: list[Any] = field(default_factory=list)
+    card_conditions: list[str] = field(default_factory=list)
+    card_params: list[Any] = field(default_factory=list)
+
+    def where(self, cards: bool = False) -> tuple[str, list[Any]]:
+        """Return the WHERE clause and its parameters.
+
+        Args:
+            cards: Filter rows of ``cards c`` joined to their ``notes n`` instead of
+                notes, which then match if one of their cards does
+
+        Returns:
+            SQL condition and its parameters, in order
+        """
+        conditions, params = list(self.conditions), list(self.params)
+        if self.card_conditions and cards:
+            conditions.extend(self.card_conditions)
+            params.extend(self.card_params)
+        elif self.card_conditions:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM cards c WHERE c.nid = n.id AND "
+                f"{' AND '.join(self.card_conditions)})"
+            )
+            params.extend(self.card_params)
+        return " AND ".join(conditions) or "1", params
+
+
+def _like(value: str) -> str:
+    """Turn an Anki wildcard pattern into a LIKE pattern (``*`` any, ``_`` one char)."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%")
+    return escaped.replace("*", "%")
+
+
+def _phrase(term: str) -> str:
+    """Quote a term as an FTS5 phrase."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def translate_query(query: str, field_names: set[str]) -> LocalQuery | None:
+    """Translate an Anki search into SQL, or return None if it needs Anki.
+
+    Supported terms, implicitly combined with AND and each optionally negated
+    with ``-``: ``*``, plain text (substring match without wildcards),
+    ``deck:``, ``tag:``, ``note:``, ``nid:`` and ``field:value`` for a known
+    field name, with ``*`` wildcards where Anki allows them. ``or``, grouping
+    and card- or review-based searches return None.
+
+    Args:
+        query: Anki search query
+        field_names: Lower-cased field names of all note types
+
+    Returns:
+        LocalQuery, or None if the query uses unsupported syntax
+    """
+    result = LocalQuery()
+    match_terms: list[str] = []
+    for token in _TOKEN_RE.findall(query):
+        negate = token.startswith("-") and len(token) > 1
+        if negate:
+            token = token[1:]
+        if token.lower() in ("and", "or") or token.startswith("(") or token.endswith(")"):
+            if token.lower() == "and":
+                continue
+            return None
+
+        key, sep, value = token.partition(":")
+        key = key.replace('"', "").lower()
+        if not sep:
+            key, value = "", token
+        value = value.replace('"', "")
+
+        if token == "*":
+            condition, params = "1", []
+        elif not key:
+            if not value:
+                continue
+            if "*" in value or "_" in value or "\\" in value:
+                return None
+            if len(value) >= MIN_TRIGRAM_LENGTH:
+                condition = "n.id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)"
+                params = [_phrase(value)]
+                if not negate:
+                    match_terms.append(_phrase(value))
+            else:
+                condition = "n.id IN (SELECT rowid FROM notes_fts WHERE text LIKE ? ESCAPE '\\')"
+                params = [f"%{_like(value)}%"]
+        elif key == "deck":
+            if value == "*":
+                condition, params = "1", []
+            else:
+                condition = "(c.deck LIKE ? ESCAPE '\\' OR c.deck LIKE ? ESCAPE '\\')"
+                params = [_like(value), _like(value) + "::%"]
+            result.card_conditions.append(f"NOT ({condition})" if negate else condition)
+            result.card_params.extend(params)
+            continue
+        elif key == "tag":
+            condition = (
+                "EXISTS (SELECT 1 FROM json_each(n.tags) "
+                "WHERE value LIKE ? ESCAPE '\\' OR value LIKE ? ESCAPE '\\')"
+            )
+            params = [_like(value), _like(value) + "::%"]
+        elif key == "note":
+            condition, params = "n.model LIKE ? ESCAPE '\\'", [_like(value)]
+        elif key == "nid":
+            try:
+                ids = [int(i) for i in value.split(",") if i]
+            except ValueError:
+                return None
+            condition = f"n.id IN ({','.join('?' * len(ids))})" if ids else "0"
+            params = ids
+        elif key in field_names and key not in _UNSUPPORTED_KEYS:
+            condition = (
+                "EXISTS (SELECT 1 FROM json_each(n.fields) "
+                "WHERE lower(key) = ? AND json_extract(value, '$.value') LIKE ? ESCAPE '\\')"
+            )
+            params = [key, _like(value)]
+        else:
+            return None
+
+        result.conditions.append(f"NOT ({condition})" if negate else condition)
+        result.params.extend(params)
+
+    if match_terms:
+        result.match = " AND ".join(match_terms)
+    return result
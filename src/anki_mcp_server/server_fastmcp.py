@@ -1,37 +1,377 @@
 """Anki MCP Server implementation with FastMCP."""
 
+import asyncio
 import json
 import logging
+import os
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
+import anyio
 from docling.document_converter import DocumentConverter
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from fastmcp.server.middleware import Middleware, MiddlewareContext
 from mcp.types import TextContent
 
+from anki_mcp_server.apkg import build_package
+from anki_mcp_server.bulk import (
+    BulkImporter,
+    ImportResult,
+    RejectedNote,
+    run_chunked,
+    update_notes,
+)
+from anki_mcp_server.cards_file import CardsFileError, iter_json_values
 from anki_mcp_server.client import AnkiClient, AnkiConnectError
+from anki_mcp_server.dedupe import DuplicateIndex, duplicate_error, first_field_hash
+from anki_mcp_server.encoding import ResponseEncoder
+from anki_mcp_server.journal import WriteBehindQueue, WriteJournal
+from anki_mcp_server.media import MediaLedger, MediaUploader
+from anki_mcp_server.metrics import track_round_trips
+from anki_mcp_server.mirror import NoteMirror
+from anki_mcp_server.package_client import PackageClient
+from anki_mcp_server.pagination import ResultSetCache
+from anki_mcp_server.profiling import ToolProfiler
+from anki_mcp_server.resources import ResourceHandler
+from anki_mcp_server.shaping import shape_note, shape_notes, snippet_result
+from anki_mcp_server.validation import NoteValidator
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Replay journaled writes on startup and flush pending writes on shutdown."""
+    queue = get_write_queue()
+    if queue is not None:
+        queue.start()
+    try:
+        yield
+    finally:
+        if queue is not None:
+            # The server's task group may already be cancelled at shutdown
+            with anyio.CancelScope(shield=True):
+                await queue.close()
+
+
 # Create FastMCP server
-mcp = FastMCP("anki-mcp-server")
+mcp = FastMCP("anki-mcp-server", lifespan=lifespan)
 
 # Global client instance
 _client: AnkiClient | None = None
 
+# Global metadata cache shared by tools and resources
+_resources: ResourceHandler | None = None
+
+# Optional local note mirror (enabled by ANKI_MCP_MIRROR)
+_mirror: NoteMirror | None = None
+
+# Search results paged through search_notes cursors
+_result_sets: ResultSetCache | None = None
+
+# Response encoder shared by tools and resources
+_encoder: ResponseEncoder | None = None
+
+# Media uploader with its ledger of stored hashes (ANKI_MCP_MEDIA_LEDGER)
+_media: MediaUploader | None = None
+
+# Optional first-field duplicate index (enabled by ANKI_MCP_DUPLICATE_INDEX)
+_duplicates: DuplicateIndex | None = None
+
+# Pre-flight note validation against cached schemas and decks
+_validator: NoteValidator | None = None
+
+# Optional journaled write-behind queue (enabled by ANKI_MCP_WRITE_BEHIND)
+_writes: WriteBehindQueue | None = None
+
+# Largest page search_notes returns
+MAX_PAGE_SIZE = 500
+
 
 def get_client() -> AnkiClient:
-    """Get or create the global AnkiClient instance."""
+    """Get or create the global AnkiClient instance.
+
+    With ANKI_MCP_PACKAGE set, reads are served from that package or collection
+    file without Anki, and writes fail.
+    """
     global _client
     if _client is None:
-        _client = AnkiClient()
+        package = os.environ.get("ANKI_MCP_PACKAGE")
+        _client = PackageClient(package) if package else AnkiClient()
     return _client
 
 
+def get_resource_handler() -> ResourceHandler:
+    """Get or create the global ResourceHandler backing all metadata reads."""
+    global _resources
+    if _resources is None:
+        _resources = ResourceHandler(
+            get_client(),
+            stale_while_revalidate=float(os.environ.get("ANKI_MCP_STALE_WHILE_REVALIDATE", "0")),
+            encoder=get_encoder(),
+        )
+    return _resources
+
+
+def get_encoder() -> ResponseEncoder:
+    """Get or create the global ResponseEncoder (ANKI_MCP_COMPACT_JSON, ANKI_MCP_MAX_RESPONSE_BYTES)."""
+    global _encoder
+    if _encoder is None:
+        _encoder = ResponseEncoder()
+    return _encoder
+
+
+def get_mirror() -> NoteMirror | None:
+    """Get or create the global NoteMirror, or None if the mirror is disabled."""
+    global _mirror
+    if _mirror is None and os.environ.get("ANKI_MCP_MIRROR"):
+        _mirror = NoteMirror(
+            get_client(),
+            os.environ["ANKI_MCP_MIRROR"],
+            max_age=float(os.environ.get("ANKI_MCP_MIRROR_MAX_AGE", "30")),
+        )
+    return _mirror
+
+
+def get_media_uploader() -> MediaUploader:
+    """Get or create the global MediaUploader."""
+    global _media
+    if _media is None:
+        _media = MediaUploader(get_client(), MediaLedger(os.environ.get("ANKI_MCP_MEDIA_LEDGER")))
+    return _media
+
+
+def get_result_sets() -> ResultSetCache:
+    """Get or create the global cache of paginated search results."""
+    global _result_sets
+    if _result_sets is None:
+        _result_sets = ResultSetCache()
+    return _result_sets
+
+
+def get_validator() -> NoteValidator:
+    """Get or create the global NoteValidator."""
+    global _validator
+    if _validator is None:
+        _validator = NoteValidator(get_resource_handler())
+    return _validator
+
+
+def get_duplicate_index() -> DuplicateIndex | None:
+    """Get or create the global DuplicateIndex, or None if it is disabled."""
+    global _duplicates
+    if _duplicates is None and os.environ.get("ANKI_MCP_DUPLICATE_INDEX"):
+        _duplicates = DuplicateIndex(
+            get_resource_handler(),
+            find_note_ids,
+            get_notes,
+            lambda cards: get_client().get_decks(cards),
+        )
+    return _duplicates
+
+
+def get_write_queue() -> WriteBehindQueue | None:
+    """Get or create the global WriteBehindQueue, or None if write-behind is disabled.
+
+    Creating the queue replays the journal at ANKI_MCP_WRITE_BEHIND.
+    """
+    global _writes
+    path = os.environ.get("ANKI_MCP_WRITE_BEHIND")
+    if _writes is None and path:
+        _writes = WriteBehindQueue(
+            get_client(),
+            WriteJournal(path),
+            max_batch=int(os.environ.get("ANKI_MCP_WRITE_BEHIND_BATCH", "50")),
+            max_delay=float(os.environ.get("ANKI_MCP_WRITE_BEHIND_DELAY", "1.0")),
+            on_created=record_created,
+            on_written=invalidate_notes,
+        )
+        if _writes.replayed:
+            logger.info(f"Replaying {_writes.replayed} journaled writes from {path}")
+    return _writes
+
+
+async def reset_state() -> None:
+    """Close and drop all module-level state so the next tool call starts afresh.
+
+    Lets the benchmark and tests point the server at another AnkiConnect. Writes
+    queued for write-behind are flushed first; any that fail stay in the journal.
+    """
+    global _client, _resources, _mirror, _result_sets, _encoder, _media
+    global _duplicates, _validator, _writes, _metrics_written
+    client, mirror, writes = _client, _mirror, _writes
+    _client = _resources = _mirror = _result_sets = _encoder = _media = None
+    _duplicates = _validator = _writes = None
+    _metrics_written = 0.0
+    if writes is not None:
+        await writes.close()
+    if mirror is not None:
+        mirror.close()
+    if client is not None:
+        await client.close()
+
+
+async def find_note_ids(query: str) -> list[int]:
+    """Find note IDs with the mirror if enabled and able to answer, else with Anki."""
+    mirror = get_mirror()
+    note_ids = await mirror.find_notes(query) if mirror is not None else None
+    if note_ids is None:
+        note_ids = await get_client().find_notes(query)
+    return note_ids
+
+
+async def get_notes(note_ids: list[int]) -> list[dict[str, Any]]:
+    """Get notes in ``notesInfo`` format from the mirror if enabled, else from Anki."""
+    mirror = get_mirror()
+    if mirror is not None:
+        return await mirror.get_notes(note_ids)
+    return await get_client().notes_info(note_ids)
+
+
+def to_anki_note(note: dict[str, Any], allow_duplicate: bool = False) -> dict[str, Any]:
+    """Convert a tool note (type, deck, fields, tags) to AnkiConnect's note format."""
+    return {
+        "deckName": note.get("deck"),
+        "modelName": note.get("type"),
+        "fields": note.get("fields"),
+        "tags": note.get("tags", []),
+        "options": {"allowDuplicate": allow_duplicate},
+    }
+
+
+async def check_duplicates(notes: list[dict[str, Any]]) -> list[dict[str, int] | None]:
+    """Find duplicates of AnkiConnect-format notes locally (all None if the index is disabled)."""
+    index = get_duplicate_index()
+    if index is None:
+        return [None] * len(notes)
+    return await index.check(notes)
+
+
+async def prefilter_notes(notes: list[dict[str, Any]]) -> list[dict[str, Any] | None]:
+    """Validate AnkiConnect-format notes and check them for duplicates, all locally.
+
+    Returns:
+        Per note None if it should be sent, else a rejection with ``error`` and,
+        for duplicates, ``duplicateOf`` or ``duplicateOfIndex``
+    """
+    errors = await get_validator().validate_many(notes)
+    rejections: list[dict[str, Any] | None] = [
+        None if error is None else {"error": error} for error in errors
+    ]
+    valid = [i for i, error in enumerate(errors) if error is None]
+    duplicates = await check_duplicates([notes[i] for i in valid])
+    for i, duplicate in zip(valid, duplicates, strict=True):
+        if duplicate is not None:
+            if "duplicateOfIndex" in duplicate:
+                duplicate = {"duplicateOfIndex": valid[duplicate["duplicateOfIndex"]]}
+            rejections[i] = {"error": duplicate_error(duplicate), **duplicate}
+    return rejections
+
+
+async def record_created(note: dict[str, Any], note_id: int) -> None:
+    """Add a note created through this server to the duplicate index (if enabled)."""
+    index = get_duplicate_index()
+    if index is not None:
+        await index.add(note, note_id)
+
+
+def forget_duplicates(note_ids: list[int]) -> None:
+    """Drop changed or deleted notes from the duplicate index (if enabled)."""
+    index = get_duplicate_index()
+    if index is not None:
+        index.forget(note_ids)
+
+
+def invalidate_notes(note_ids: list[int]) -> None:
+    """Tell the mirror (if enabled) that notes were written through this server."""
+    mirror = get_mirror()
+    if mirror is not None:
+        mirror.invalidate(note_ids)
+
+
+# Minimum seconds between two writes of the Prometheus metrics file
+METRICS_FILE_INTERVAL = 1.0
+
+_metrics_written = 0.0
+
+
+def write_metrics_file() -> None:
+    """Dump metrics in Prometheus text format to ANKI_MCP_METRICS_FILE, if set.
+
+    Writes are throttled to one per ``METRICS_FILE_INTERVAL`` seconds.
+    """
+    global _metrics_written
+    path = os.environ.get("ANKI_MCP_METRICS_FILE")
+    now = time.monotonic()
+    if not path or now - _metrics_written < METRICS_FILE_INTERVAL:
+        return
+    _metrics_written = now
+    try:
+        get_client().metrics.write_prometheus(path, get_resource_handler().cache_stats())
+    except OSError as e:
+        logger.warning(f"Failed to write metrics file {path}: {e}")
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Record wall time and AnkiConnect round trips of every tool invocation."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        start = time.perf_counter()
+        failed = True
+        with track_round_trips() as round_trips:
+            try:
+                result = await call_next(context)
+                failed = False
+                return result
+            finally:
+                get_client().metrics.record_tool(
+                    context.message.name,
+                    time.perf_counter() - start,
+                    round_trips[0],
+                    error=failed,
+                )
+                write_metrics_file()
+
+
+class ToolProfilingMiddleware(Middleware):
+    """Capture CPU profiles of slow tool invocations."""
+
+    def __init__(self, profiler: ToolProfiler):
+        self.profiler = profiler
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        return await self.profiler.run(context.message.name, lambda: call_next(context))
+
+
+mcp.add_middleware(ToolMetricsMiddleware())
+
+if os.environ.get("ANKI_MCP_PROFILE_DIR"):
+    mcp.add_middleware(
+        ToolProfilingMiddleware(
+            ToolProfiler(
+                os.environ["ANKI_MCP_PROFILE_DIR"],
+                threshold_ms=float(os.environ.get("ANKI_MCP_PROFILE_THRESHOLD_MS", "100")),
+                keep=int(os.environ.get("ANKI_MCP_PROFILE_KEEP", "5")),
+            )
+        )
+    )
+
+
 async def check_anki_connection():
-    """Check if Anki is running and available."""
+    """Check if Anki is running and available.
+
+    Skips the ``version`` probe while a recent request has already succeeded, and
+    fails fast while the connection circuit is open.
+    """
+    client = get_client()
+    if client.health.is_healthy():
+        return
     try:
-        await get_client().check_connection()
+        await client.check_connection()
     except AnkiConnectError as e:
         raise RuntimeError(
             f"Failed to connect to Anki: {e}\n"
@@ -46,26 +386,27 @@ async def check_anki_connection():
 
 
 @mcp.tool()
-async def list_decks() -> str:
+async def list_decks(compact: bool | None = None) -> str:
     """List all available Anki decks.
 
+    Args:
+        compact: Return compact JSON instead of indented (default: server setting)
+
     Returns:
         JSON string with list of deck names and count
     """
     await check_anki_connection()
-    client = get_client()
-    decks = await client.get_deck_names()
-    import json
-
-    return json.dumps({"decks": decks, "count": len(decks)}, indent=2)
+    decks = await get_resource_handler().get_decks()
+    return get_encoder().encode({"decks": decks, "count": len(decks)}, compact=compact)
 
 
 @mcp.tool()
-async def create_deck(name: str) -> str:
+async def create_deck(name: str, compact: bool | None = None) -> str:
     """Create a new Anki deck.
 
     Args:
         name: Name of the deck to create (can include :: for nesting)
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
         JSON string with success status and deck ID
@@ -73,60 +414,64 @@ async def create_deck(name: str) -> str:
     await check_anki_connection()
     client = get_client()
     deck_id = await client.create_deck(name)
-    import json
-
-    return json.dumps({"success": True, "deckId": deck_id}, indent=2)
+    get_resource_handler().invalidate_decks()
+    return get_encoder().encode({"success": True, "deckId": deck_id}, compact=compact)
 
 
 # Note Type Management Tools
 
 
 @mcp.tool()
-async def list_note_types() -> str:
+async def list_note_types(compact: bool | None = None) -> str:
     """List all available note types.
 
+    Args:
+        compact: Return compact JSON instead of indented (default: server setting)
+
     Returns:
         JSON string with list of note type names and count
     """
     await check_anki_connection()
-    client = get_client()
-    note_types = await client.get_model_names()
-    import json
-
-    return json.dumps({"noteTypes": note_types, "count": len(note_types)}, indent=2)
+    note_types = await get_resource_handler().get_note_types()
+    return get_encoder().encode({"noteTypes": note_types, "count": len(note_types)}, compact=compact)
 
 
 @mcp.tool()
-async def get_note_type_info(model_name: str, include_css: bool = False) -> str:
+async def get_note_type_info(
+    model_name: str, include_css: bool = False, compact: bool | None = None
+) -> str:
     """Get detailed structure of a note type.
 
     Args:
         model_name: Name of the note type/model
         include_css: Whether to include CSS styling information
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
         JSON string with note type structure (fields, templates, css)
     """
     await check_anki_connection()
-    client = get_client()
+    schema = await get_resource_handler().get_model_schema(model_name)
 
-    fields = await client.get_model_field_names(model_name)
-    templates = await client.get_model_templates(model_name)
-
-    result: dict[str, Any] = {"modelName": model_name, "fields": fields, "templates": templates}
+    result: dict[str, Any] = {
+        "modelName": model_name,
+        "fields": schema["fields"],
+        "templates": schema["templates"],
+    }
 
     if include_css:
-        styling = await client.get_model_styling(model_name)
-        result["css"] = styling.get("css", "")
+        result["css"] = schema["css"]
 
-    import json
-
-    return json.dumps(result, indent=2)
+    return get_encoder().encode(result, compact=compact)
 
 
 @mcp.tool()
 async def create_note_type(
-    name: str, fields: list[str], templates: list[dict[str, str]], css: str = ""
+    name: str,
+    fields: list[str],
+    templates: list[dict[str, str]],
+    css: str = "",
+    compact: bool | None = None,
 ) -> str:
     """Create a new note type.
 
@@ -135,6 +480,7 @@ async def create_note_type(
         fields: List of field names
         templates: List of card templates with 'name', 'front', 'back' keys
         css: Optional CSS styling
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
         JSON string with success status and model info
@@ -147,9 +493,8 @@ async def create_note_type(
     ]
 
     result = await client.create_model(name, fields, css, card_templates)
-    import json
-
-    return json.dumps({"success": True, "model": result}, indent=2)
+    get_resource_handler().invalidate_note_type(name)
+    return get_encoder().encode({"success": True, "model": result}, compact=compact)
 
 
 # Note Management Tools
@@ -162,6 +507,7 @@ async def create_note(
     fields: dict[str, str],
     tags: list[str] | None = None,
     allow_duplicate: bool = False,
+    compact: bool | None = None,
 ) -> str:
     """Create a single note in Anki.
 
@@ -171,9 +517,11 @@ async def create_note(
         fields: Dictionary of field names to values
         tags: Optional list of tags
         allow_duplicate: Whether to allow duplicate notes
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
-        JSON string with success status and note ID
+        JSON string with success status and note ID, or a handle for
+        flush_writes/write_status if write-behind is enabled
     """
     await check_anki_connection()
     client = get_client()
@@ -185,23 +533,38 @@ async def create_note(
         "tags": tags or [],
         "options": {"allowDuplicate": allow_duplicate},
     }
+    [rejection] = await prefilter_notes([note])
+    if rejection is not None:
+        raise ValueError(rejection["error"])
+
+    queue = get_write_queue()
+    if queue is not None:
+        handle = queue.create(note)
+        return get_encoder().encode(
+            {"success": True, "queued": True, "handle": handle}, compact=compact
+        )
 
     note_id = await client.add_note(note)
-    import json
-
-    return json.dumps({"success": True, "noteId": note_id}, indent=2)
+    invalidate_notes([note_id])
+    await record_created(note, note_id)
+    return get_encoder().encode({"success": True, "noteId": note_id}, compact=compact)
 
 
 @mcp.tool()
 async def batch_create_notes(
-    notes: list[dict[str, Any]], allow_duplicate: bool = False, stop_on_error: bool = False
+    notes: list[dict[str, Any]],
+    allow_duplicate: bool = False,
+    stop_on_error: bool = False,
+    compact: bool | None = None,
 ) -> str:
     """Create multiple notes at once (recommended: 10-20 notes per batch, max: 50).
 
     Args:
         notes: List of note dictionaries with 'type', 'deck', 'fields', optional 'tags'
         allow_duplicate: Whether to allow duplicate notes
-        stop_on_error: Whether to stop on first error
+        stop_on_error: Whether to stop at the first note rejected before sending; notes
+            are sent in one call, so all notes sent are reported even if one fails in Anki
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
         JSON string with results for each note
@@ -212,121 +575,552 @@ async def batch_create_notes(
     if len(notes) > 50:
         raise ValueError("Maximum 50 notes per batch")
 
-    note_data = []
-    for note in notes:
-        note_data.append(
-            {
-                "deckName": note["deck"],
-                "modelName": note["type"],
-                "fields": note["fields"],
-                "tags": note.get("tags", []),
-                "options": {"allowDuplicate": allow_duplicate},
-            }
-        )
-
-    note_ids = await client.add_notes(note_data)
-
+    note_data = [to_anki_note(note, allow_duplicate) for note in notes]
+    rejections = await prefilter_notes(note_data)
+
+    # Invalid notes and duplicates found locally are never sent, and with
+    # stop_on_error neither is anything after the first of them
+    end = len(note_data)
+    if stop_on_error:
+        end = next((i for i, rejection in enumerate(rejections) if rejection is not None), end)
+    send = [i for i in range(end) if rejections[i] is None]
+    note_ids: list[int | None] = [None] * len(note_data)
+    if send:
+        added = await client.add_notes([note_data[i] for i in send])
+        for i, note_id in zip(send, added, strict=True):
+            note_ids[i] = note_id
+    invalidate_notes([note_id for note_id in note_ids if note_id is not None])
+
+    # Notes sent in the one addNotes call are all reported, even after a failure
     results = []
-    for i, note_id in enumerate(note_ids):
-        if note_id is None:
+    for i in range(end):
+        if note_ids[i] is not None:
+            await record_created(note_data[i], note_ids[i])
+            results.append({"index": i, "success": True, "noteId": note_ids[i]})
+        elif rejections[i] is None:
             results.append({"index": i, "success": False, "error": "Failed to create note"})
-            if stop_on_error:
-                break
         else:
-            results.append({"index": i, "success": True, "noteId": note_id})
+            results.append({"index": i, "success": False, **rejections[i]})
+    if end < len(note_data):
+        results.append({"index": end, "success": False, **rejections[end]})
 
-    import json
+    return get_encoder().encode({"results": results, "total": len(results)}, compact=compact)
 
-    return json.dumps({"results": results, "total": len(results)}, indent=2)
+
+@mcp.tool()
+async def bulk_create_notes(
+    notes: list[dict[str, Any]],
+    ctx: Context,
+    allow_duplicate: bool = False,
+    stop_on_error: bool = False,
+    include_note_ids: bool = True,
+    compact: bool | None = None,
+) -> str:
+    """Create any number of notes, e.g. a whole lecture series, in one call.
+
+    Notes are sent in chunks whose size adapts to Anki's measured latency, with
+    the next chunk pipelined behind the current one. Progress is reported after
+    every chunk.
+
+    Args:
+        notes: List of note dictionaries with 'type', 'deck', 'fields', optional 'tags'
+        allow_duplicate: Whether to allow duplicate notes
+        stop_on_error: Whether to send no further chunks after a note failed
+        include_note_ids: Include the created note ID of every index (null if failed)
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with counts, failed indexes with their errors and note IDs
+    """
+    await check_anki_connection()
+
+    async def progress(done: int, total: int | None) -> None:
+        await ctx.report_progress(done, total, f"{done}/{total} notes sent")
+
+    note_data = [to_anki_note(note, allow_duplicate) for note in notes]
+    rejections = await prefilter_notes(note_data)
+    result = await BulkImporter(get_client(), on_created=record_created).run(
+        [
+            note if rejection is None else RejectedNote(rejection["error"])
+            for note, rejection in zip(note_data, rejections, strict=True)
+        ],
+        total=len(notes),
+        progress=progress,
+        stop_on_error=stop_on_error,
+    )
+    invalidate_notes(result.created)
+    return get_encoder().encode(
+        result.summary(include_note_ids=include_note_ids), compact=compact, list_key="failures"
+    )
 
 
 @mcp.tool()
-async def search_notes(query: str) -> str:
-    """Search for notes using Anki query syntax.
+async def import_cards_file(
+    path: str,
+    ctx: Context,
+    deck: str | None = None,
+    note_type: str | None = None,
+    tags: list[str] | None = None,
+    allow_duplicate: bool = False,
+    stop_on_error: bool = False,
+    create_decks: bool = True,
+    compact: bool | None = None,
+) -> str:
+    """Import a file of pre-generated cards into Anki without passing them through the chat.
+
+    The file is a JSON array or NDJSON of card objects with 'fields' and
+    optional 'type', 'deck' and 'tags', as taken by batch_create_notes. It is
+    streamed from disk, every card is checked against the cached note type
+    schema, and valid cards are added in adaptively sized chunks. Only a
+    summary is returned.
 
     Args:
-        query: Anki search query string
+        path: Path to the cards file on the server
+        deck: Deck for cards without a 'deck'
+        note_type: Note type for cards without a 'type'
+        tags: Tags added to every card
+        allow_duplicate: Whether to allow duplicate notes
+        stop_on_error: Whether to stop at the first invalid or failed card
+        create_decks: Create missing decks instead of rejecting their cards
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
-        JSON string with matching notes (up to 50) and total count
+        JSON string with counts and the index and error of every rejected or
+        failed card
     """
+    if not Path(path).is_file():
+        raise ValueError(f"Cards file not found: {path}")
     await check_anki_connection()
     client = get_client()
+    resources = get_resource_handler()
+    validator = get_validator()
+    known_decks = set(await resources.get_decks())
+
+    async def cards():
+        try:
+            for card in iter_json_values(path):
+                if not isinstance(card, dict):
+                    yield RejectedNote("Card must be a JSON object")
+                    continue
+                card_tags = card.get("tags", [])
+                if not isinstance(card_tags, list):
+                    yield RejectedNote("Tags must be a list of strings")
+                    continue
+                note = to_anki_note(
+                    {
+                        "type": card.get("type", note_type),
+                        "deck": card.get("deck", deck),
+                        "fields": card.get("fields"),
+                        "tags": [*(tags or []), *card_tags],
+                    },
+                    allow_duplicate,
+                )
+                error = await validator.validate(note, require_deck=False)
+                new_deck = error is None and note["deckName"] not in known_decks
+                if new_deck and not create_decks:
+                    error = f"Unknown deck: {note['deckName']}"
+                if error is None:
+                    [duplicate] = await check_duplicates([note])
+                    if duplicate is not None:
+                        error = duplicate_error(duplicate)
+                if error is None and new_deck:
+                    # Only for cards that passed every check
+                    await client.create_deck(note["deckName"])
+                    resources.invalidate_decks()
+                    known_decks.add(note["deckName"])
+                yield RejectedNote(error) if error else note
+        except CardsFileError as e:
+            yield RejectedNote(str(e))
+
+    async def progress(done: int, total: int | None) -> None:
+        await ctx.report_progress(done, total, f"{done} cards processed")
+
+    result = await BulkImporter(client, on_created=record_created).run(
+        cards(), progress=progress, stop_on_error=stop_on_error
+    )
+    invalidate_notes(result.created)
+    return get_encoder().encode(
+        {"file": path, **result.summary(include_note_ids=False)},
+        compact=compact,
+        list_key="failures",
+    )
 
-    note_ids = await client.find_notes(query)
 
-    notes = []
-    if note_ids:
-        limit = min(len(note_ids), 50)
-        notes_info = await client.notes_info(note_ids[:limit])
-        notes = notes_info
+@mcp.tool()
+async def import_notes_as_package(
+    notes: list[dict[str, Any]],
+    ctx: Context,
+    media: list[str] | None = None,
+    allow_duplicate: bool = False,
+    include_note_ids: bool = True,
+    compact: bool | None = None,
+) -> str:
+    """Create thousands of notes fast by importing them as one Anki package.
 
-    import json
+    The notes are written to an .apkg file locally, using the cached note type
+    definitions, and Anki imports it with a single importPackage call. This
+    skips the per-note work of addNotes, but Anki must run on this machine to
+    read the file. Notes are validated and checked for duplicates first.
 
-    return json.dumps(
-        {
-            "query": query,
-            "total": len(note_ids),
-            "notes": notes,
-            "limitApplied": len(note_ids) > 50,
-        },
-        indent=2,
+    Args:
+        notes: List of note dictionaries with 'type', 'deck', 'fields', optional 'tags'
+        media: Paths of media files the notes reference, stored under their base names
+        allow_duplicate: Whether to allow duplicate notes
+        include_note_ids: Include the created note ID of every index (null if failed)
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with counts, failed indexes with their errors and note IDs
+    """
+    missing = [path for path in media or [] if not Path(path).is_file()]
+    if missing:
+        raise ValueError(f"Media files not found: {', '.join(missing)}")
+    await check_anki_connection()
+    client = get_client()
+    resources = get_resource_handler()
+    start = time.perf_counter()
+
+    note_data = [to_anki_note(note, allow_duplicate) for note in notes]
+    rejections = await prefilter_notes(note_data)
+    send = [i for i, rejection in enumerate(rejections) if rejection is None]
+    if send and not allow_duplicate and get_duplicate_index() is None:
+        # The importer only skips notes it already has, so check duplicates in one call
+        addable = await client.can_add_notes([note_data[i] for i in send])
+        seen: dict[tuple[str, bytes], int] = {}
+        for i, ok in zip(send, addable, strict=True):
+            note = note_data[i]
+            first = (await resources.get_model_schema(note["modelName"]))["fields"][0].lower()
+            value = next(v for k, v in note["fields"].items() if k.lower() == first)
+            key = (note["modelName"], first_field_hash(value))
+            if not ok:
+                rejections[i] = {"error": "Duplicate of an existing note"}
+            elif key in seen:
+                duplicate = {"duplicateOfIndex": seen[key]}
+                rejections[i] = {"error": duplicate_error(duplicate), **duplicate}
+            else:
+                seen[key] = i
+        send = [i for i in send if rejections[i] is None]
+
+    result = ImportResult(
+        note_ids=[None] * len(notes),
+        errors={i: r["error"] for i, r in enumerate(rejections) if r is not None},
+    )
+    if send:
+        model_names = sorted({note_data[i]["modelName"] for i in send})
+        models = dict(
+            zip(
+                model_names,
+                await asyncio.gather(*(resources.get_model_definition(m) for m in model_names)),
+                strict=True,
+            )
+        )
+        decks = await client.get_deck_names_and_ids()
+        await ctx.report_progress(0, 2, f"Building package of {len(send)} notes")
+        with tempfile.TemporaryDirectory(prefix="anki-mcp-") as workdir:
+            package = Path(workdir) / "import.apkg"
+            package_ids = await asyncio.to_thread(
+                build_package, package, [note_data[i] for i in send], models, decks, media or []
+            )
+            await ctx.report_progress(1, 2, "Importing package into Anki")
+            await client.import_package(str(package))
+        result.chunks = 1
+        resources.invalidate_decks()
+
+        # Anki keeps the package's note IDs unless they clash with existing notes
+        imported = set(await client.find_notes("nid:" + ",".join(map(str, package_ids))))
+        for i, note_id in zip(send, package_ids, strict=True):
+            if note_id in imported:
+                result.note_ids[i] = note_id
+                await record_created(note_data[i], note_id)
+            else:
+                result.errors[i] = "Not found after import"
+        invalidate_notes(result.created)
+        await ctx.report_progress(2, 2, f"{len(result.created)} notes imported")
+
+    result.elapsed = time.perf_counter() - start
+    return get_encoder().encode(
+        result.summary(include_note_ids=include_note_ids), compact=compact, list_key="failures"
     )
 
 
 @mcp.tool()
-async def get_note_info(noteId: int) -> str:
+async def search_notes(
+    query: str,
+    ranked: bool = False,
+    limit: int = 50,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    strip_html: bool = False,
+    max_field_length: int | None = None,
+    metadata_only: bool = False,
+    compact: bool | None = None,
+) -> str:
+    """Search for notes using Anki query syntax.
+
+    With the local mirror enabled, queries using only ``deck:``, ``tag:``,
+    ``note:``, ``nid:``, ``field:value`` and plain-text terms are answered from
+    the mirror's full-text index; anything else is sent to Anki.
+
+    Args:
+        query: Anki search query string
+        ranked: Return relevance-ranked results with text snippets instead of
+            full notes (ranking needs the local mirror; otherwise results keep
+            Anki's order)
+        limit: Maximum number of notes per page (1-500, default: 50)
+        cursor: nextCursor of the previous page to continue the same query
+        fields: Only return these fields (default: all)
+        strip_html: Return field values as plain text
+        max_field_length: Truncate field values longer than this many characters
+        metadata_only: Return note IDs, note types, tags and field names without
+            field content
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with one page of matching notes, the total count and a
+        nextCursor while more pages remain
+    """
+    await check_anki_connection()
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    client = get_client()
+    mirror = get_mirror()
+    result_sets = get_result_sets()
+
+    token, note_ids, offset = None, None, 0
+    if cursor is not None:
+        token, result_set, offset = result_sets.get(cursor, query)
+        note_ids = result_set.note_ids
+
+    if ranked and mirror is not None and note_ids is None:
+        found = await mirror.search(query, limit=limit, offset=offset)
+        if found is not None:
+            more = offset + limit < found["total"]
+            if more and token is None:
+                token = result_sets.put(query, None)
+            ranked_token = token
+
+            def continue_ranked(count: int) -> dict[str, Any]:
+                # Trimmed by the byte budget: resume right after the last returned result
+                nonlocal ranked_token
+                if ranked_token is None:
+                    ranked_token = result_sets.put(query, None)
+                return {
+                    "limitApplied": True,
+                    "nextCursor": result_sets.cursor(ranked_token, offset + count),
+                }
+
+            return get_encoder().encode(
+                {
+                    "query": query,
+                    "total": found["total"],
+                    "results": found["results"],
+                    "limitApplied": more,
+                    "nextCursor": result_sets.cursor(token, offset + limit) if more else None,
+                },
+                compact=compact,
+                list_key="results",
+                continuation=continue_ranked,
+            )
+
+    if note_ids is None and mirror is not None:
+        note_ids = await mirror.find_notes(query)
+    if note_ids is None:
+        note_ids = await client.find_notes(query)
+
+    page = note_ids[offset : offset + limit]
+    notes = await get_notes(page) if page else []
+    more = offset + limit < len(note_ids)
+    if more and token is None:
+        token = result_sets.put(query, note_ids)
+
+    result: dict[str, Any] = {"query": query, "total": len(note_ids)}
+    if ranked:
+        result["results"] = [snippet_result(note) for note in notes if note]
+    else:
+        result["notes"] = shape_notes(
+            notes,
+            fields=fields,
+            strip=strip_html,
+            max_field_length=max_field_length,
+            metadata_only=metadata_only,
+        )
+    result["limitApplied"] = more
+    result["nextCursor"] = result_sets.cursor(token, offset + limit) if more else None
+
+    def continue_page(count: int) -> dict[str, Any]:
+        # Trimmed by the byte budget: resume right after the last returned note
+        nonlocal token
+        if token is None:
+            token = result_sets.put(query, note_ids)
+        return {"limitApplied": True, "nextCursor": result_sets.cursor(token, offset + count)}
+
+    return get_encoder().encode(
+        result,
+        compact=compact,
+        list_key="results" if ranked else "notes",
+        continuation=continue_page,
+    )
+
+
+@mcp.tool()
+async def get_note_info(
+    noteId: int,
+    fields: list[str] | None = None,
+    strip_html: bool = False,
+    max_field_length: int | None = None,
+    metadata_only: bool = False,
+    compact: bool | None = None,
+) -> str:
     """Get detailed information about a specific note.
 
     Args:
         noteId: Note ID
+        fields: Only return these fields (default: all)
+        strip_html: Return field values as plain text
+        max_field_length: Truncate field values longer than this many characters
+        metadata_only: Return the note type, tags and field names without field content
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
         JSON string with complete note details
     """
     await check_anki_connection()
-    client = get_client()
 
-    notes_info = await client.notes_info([noteId])
-    if not notes_info:
+    notes_info = await get_notes([noteId])
+    if not notes_info or not notes_info[0]:
         raise ValueError(f"Note not found: {noteId}")
 
-    import json
-
-    return json.dumps(notes_info[0], indent=2)
+    return get_encoder().encode(
+        shape_note(
+            notes_info[0],
+            fields=fields,
+            strip=strip_html,
+            max_field_length=max_field_length,
+            metadata_only=metadata_only,
+        ),
+        compact=compact,
+    )
 
 
 @mcp.tool()
-async def update_note(id: int, fields: dict[str, str], tags: list[str] | None = None) -> str:
+async def update_note(
+    id: int, fields: dict[str, str], tags: list[str] | None = None, compact: bool | None = None
+) -> str:
     """Update an existing note.
 
     Args:
         id: Note ID
         fields: Dictionary of field names to new values
         tags: Optional new tags (replaces all existing tags)
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
-        JSON string with success status
+        JSON string with success status, plus a handle for flush_writes/write_status
+        if write-behind is enabled
     """
     await check_anki_connection()
-    client = get_client()
 
-    await client.update_note_fields(id, fields)
+    queue = get_write_queue()
+    if queue is not None:
+        handle = queue.update(id, fields, tags)
+        forget_duplicates([id])
+        return get_encoder().encode(
+            {"success": True, "queued": True, "handle": handle, "noteId": id}, compact=compact
+        )
+
+    [result] = await update_notes(get_client(), [{"id": id, "fields": fields, "tags": tags}])
+    invalidate_notes([id])
+    forget_duplicates([id])
+    if not result["success"]:
+        raise AnkiConnectError(result["error"])
+
+    return get_encoder().encode({"success": True, "noteId": id}, compact=compact)
+
+
+@mcp.tool()
+async def flush_writes(compact: bool | None = None) -> str:
+    """Send all writes queued by create_note/update_note in write-behind mode now.
+
+    Args:
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with flush counts and the status of every remembered write,
+        including the final note IDs
+    """
+    queue = get_write_queue()
+    if queue is None:
+        raise ValueError("Write-behind is disabled; start the server with --write-behind")
+    await check_anki_connection()
+    flushed = await queue.flush()
+    return get_encoder().encode(
+        {**flushed, "writes": queue.status()}, compact=compact, list_key="writes"
+    )
+
+
+@mcp.tool()
+async def write_status(handles: list[str] | None = None, compact: bool | None = None) -> str:
+    """Report queued writes: pending, done with their final note ID, or failed.
+
+    Args:
+        handles: Handles returned by create_note/update_note (default: all remembered)
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with queue statistics and the status of each write
+    """
+    queue = get_write_queue()
+    if queue is None:
+        raise ValueError("Write-behind is disabled; start the server with --write-behind")
+    return get_encoder().encode(
+        {**queue.stats(), "writes": queue.status(handles)}, compact=compact, list_key="writes"
+    )
+
+
+@mcp.tool()
+async def batch_update_notes(
+    updates: list[dict[str, Any]],
+    compact: bool | None = None,
+) -> str:
+    """Update fields and/or tags of many notes, batched into few AnkiConnect requests.
+
+    Args:
+        updates: List of dictionaries with 'id' and optional 'fields' (field names
+            to new values) and 'tags' (replaces all existing tags)
+        compact: Return compact JSON instead of indented (default: server setting)
 
-    if tags is not None:
-        await client.update_note_tags(id, tags)
+    Returns:
+        JSON string with results for each update
+    """
+    await check_anki_connection()
+    for i, update in enumerate(updates):
+        if not isinstance(update.get("id"), int):
+            raise ValueError(f"Update {i} needs an integer 'id'")
 
-    import json
+    results = await update_notes(get_client(), updates)
+    invalidate_notes([update["id"] for update in updates])
+    forget_duplicates([update["id"] for update in updates if update.get("fields") is not None])
 
-    return json.dumps({"success": True, "noteId": id}, indent=2)
+    failed = sum(not result["success"] for result in results)
+    return get_encoder().encode(
+        {
+            "results": results,
+            "total": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+        },
+        compact=compact,
+        list_key="results",
+    )
 
 
 @mcp.tool()
-async def delete_note(id: int) -> str:
+async def delete_note(id: int, compact: bool | None = None) -> str:
     """Delete a note permanently.
 
     Args:
         id: Note ID to delete
+        compact: Return compact JSON instead of indented (default: server setting)
 
     Returns:
         JSON string with success status
@@ -335,9 +1129,197 @@ async def delete_note(id: int) -> str:
     client = get_client()
 
     await client.delete_notes([id])
-    import json
+    invalidate_notes([id])
+    forget_duplicates([id])
+    return get_encoder().encode({"success": True, "noteId": id}, compact=compact)
 
-    return json.dumps({"success": True, "noteId": id}, indent=2)
+
+# Media Tools
+
+
+@mcp.tool()
+async def upload_media(paths: list[str], compact: bool | None = None) -> str:
+    """Upload image or audio files from disk to Anki's media folder.
+
+    Files are stored under names derived from their content hash, so the same
+    file is never uploaded twice. Reference the returned filename in a field,
+    e.g. <img src="FILENAME">.
+
+    Args:
+        paths: Paths of the files on the server (e.g. image_path of intermediate sections)
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with the stored filename of every path and how many were uploaded
+    """
+    await check_anki_connection()
+    results = await get_media_uploader().upload(paths)
+    return get_encoder().encode(
+        {
+            "results": results,
+            "uploaded": sum(bool(result.get("uploaded")) for result in results),
+            "failed": sum("error" in result for result in results),
+        },
+        compact=compact,
+        list_key="results",
+    )
+
+
+# Query-driven bulk operations
+
+
+async def apply_to_query(
+    query: str,
+    action: str,
+    call: Any,
+    dry_run: bool,
+    compact: bool | None,
+    cards: bool = False,
+) -> str:
+    """Run ``call`` over the note (or card) IDs matching ``query`` in chunks and report counts."""
+    await check_anki_connection()
+    client = get_client()
+    ids = await (client.find_cards(query) if cards else client.find_notes(query))
+    chunks = 0
+    if ids and not dry_run:
+        # Resolve the notes first: after a deck move the query may no longer match them
+        note_ids = await client.find_notes(query) if cards and get_mirror() is not None else []
+        chunks = await run_chunked(ids, call)
+        if cards:
+            invalidate_notes(note_ids)
+        else:
+            invalidate_notes(ids)
+            if action == "deleteNotes":
+                forget_duplicates(ids)
+    return get_encoder().encode(
+        {
+            "query": query,
+            "action": action,
+            "cards" if cards else "notes": len(ids),
+            "chunks": chunks,
+            "dryRun": dry_run,
+        },
+        compact=compact,
+    )
+
+
+@mcp.tool()
+async def add_tags_by_query(
+    query: str, tags: list[str], dry_run: bool = False, compact: bool | None = None
+) -> str:
+    """Add tags to every note matching a query, without fetching the notes.
+
+    Args:
+        query: Anki search query string
+        tags: Tags to add (existing tags are kept)
+        dry_run: Only count the matching notes
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with the number of matching notes and requests made
+    """
+    client = get_client()
+    return await apply_to_query(
+        query, "addTags", lambda ids: client.add_tags(ids, tags), dry_run, compact
+    )
+
+
+@mcp.tool()
+async def remove_tags_by_query(
+    query: str, tags: list[str], dry_run: bool = False, compact: bool | None = None
+) -> str:
+    """Remove tags from every note matching a query, without fetching the notes.
+
+    Args:
+        query: Anki search query string
+        tags: Tags to remove
+        dry_run: Only count the matching notes
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with the number of matching notes and requests made
+    """
+    client = get_client()
+    return await apply_to_query(
+        query, "removeTags", lambda ids: client.remove_tags(ids, tags), dry_run, compact
+    )
+
+
+@mcp.tool()
+async def replace_tag_by_query(
+    query: str, tag: str, replacement: str, dry_run: bool = False, compact: bool | None = None
+) -> str:
+    """Rename a tag on every note matching a query, without fetching the notes.
+
+    Args:
+        query: Anki search query string
+        tag: Tag to replace
+        replacement: Tag to put in its place
+        dry_run: Only count the matching notes
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with the number of matching notes and requests made
+    """
+    client = get_client()
+    return await apply_to_query(
+        query,
+        "replaceTags",
+        lambda ids: client.replace_tags(ids, tag, replacement),
+        dry_run,
+        compact,
+    )
+
+
+@mcp.tool()
+async def move_cards_by_query(
+    query: str, deck: str, dry_run: bool = False, compact: bool | None = None
+) -> str:
+    """Move every card matching a query to a deck, without fetching the cards.
+
+    Args:
+        query: Anki search query string
+        deck: Target deck (created if it does not exist)
+        dry_run: Only count the matching cards
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with the number of matching cards and requests made
+    """
+    client = get_client()
+    result = await apply_to_query(
+        query,
+        "changeDeck",
+        lambda ids: client.change_deck(ids, deck),
+        dry_run,
+        compact,
+        cards=True,
+    )
+    if not dry_run:
+        get_resource_handler().invalidate_decks()
+        index = get_duplicate_index()
+        if index is not None:
+            # Deck-scoped indexes cannot tell which notes moved
+            index.clear()
+    return result
+
+
+@mcp.tool()
+async def delete_notes_by_query(
+    query: str, dry_run: bool = False, compact: bool | None = None
+) -> str:
+    """Delete every note matching a query permanently. Run with dry_run first.
+
+    Args:
+        query: Anki search query string
+        dry_run: Only count the matching notes
+        compact: Return compact JSON instead of indented (default: server setting)
+
+    Returns:
+        JSON string with the number of matching notes and requests made
+    """
+    client = get_client()
+    return await apply_to_query(query, "deleteNotes", client.delete_notes, dry_run, compact)
 
 
 # Resources
@@ -347,42 +1329,53 @@ async def delete_note(id: int) -> str:
 async def get_all_decks() -> str:
     """Get all available Anki decks."""
     await check_anki_connection()
-    client = get_client()
-    decks = await client.get_deck_names()
-    import json
-
-    return json.dumps({"decks": decks, "count": len(decks)}, indent=2)
+    return await get_resource_handler().read_resource("anki://decks/all")
 
 
 @mcp.resource("anki://note-types/all")
 async def get_all_note_types() -> str:
     """Get all available note types."""
     await check_anki_connection()
-    client = get_client()
-    note_types = await client.get_model_names()
-    import json
+    return await get_resource_handler().read_resource("anki://note-types/all")
+
 
-    return json.dumps({"noteTypes": note_types, "count": len(note_types)}, indent=2)
+@mcp.resource("anki://note-types/all-with-schemas")
+async def get_all_note_type_schemas() -> str:
+    """Get schemas for all note types."""
+    await check_anki_connection()
+    return await get_resource_handler().read_resource("anki://note-types/all-with-schemas")
 
 
 @mcp.resource("anki://note-types/{model_name}")
 async def get_note_type_schema(model_name: str) -> str:
     """Get schema for a specific note type."""
     await check_anki_connection()
+    return await get_resource_handler().read_resource(f"anki://note-types/{model_name}")
+
+
+@mcp.resource("anki://connection/status")
+async def get_connection_status() -> str:
+    """Get the last known AnkiConnect health and circuit breaker state."""
     client = get_client()
+    return get_encoder().encode({"url": client.url, **client.health.snapshot()})
 
-    fields = await client.get_model_field_names(model_name)
-    templates = await client.get_model_templates(model_name)
-    styling = await client.get_model_styling(model_name)
 
-    return json.dumps(
+@mcp.resource("anki://stats")
+async def get_stats() -> str:
+    """Get per-action and per-tool call counts, latencies, payload sizes and cache hit ratios."""
+    client = get_client()
+    mirror = get_mirror()
+    duplicates = get_duplicate_index()
+    writes = get_write_queue()
+    return get_encoder().encode(
         {
-            "modelName": model_name,
-            "fields": fields,
-            "templates": templates,
-            "css": styling.get("css", ""),
-        },
-        indent=2,
+            **client.metrics.snapshot(),
+            "cache": get_resource_handler().cache_stats(),
+            "mirror": mirror.stats() if mirror is not None else None,
+            "cursors": get_result_sets().stats(),
+            "duplicateIndex": duplicates.stats() if duplicates is not None else None,
+            "writeBehind": writes.stats() if writes is not None else None,
+        }
     )
 
 
@@ -391,7 +1384,8 @@ async def get_note_type_schema(model_name: str) -> str:
 
 async def _convert_pdf_to_docling_raw_impl(
     source: str,
-    output_dir: str | None = None
+    output_dir: str | None = None,
+    compact: bool | None = None
 ) -> str:
     """Convert PDF to Docling raw JSON format.
     
@@ -400,6 +1394,7 @@ async def _convert_pdf_to_docling_raw_impl(
     Args:
         source: Path to source PDF file
         output_dir: Output directory for Docling raw JSON files (defaults to ANKI_MCP_DOCLING_RAW_DIR env var)
+        compact: Return compact JSON instead of indented (default: server setting)
         
     Returns:
         JSON string with conversion result and file paths
@@ -412,10 +1407,10 @@ async def _convert_pdf_to_docling_raw_impl(
     # Validate source exists
     source_path = Path(source)
     if not source_path.exists():
-        return json.dumps({
+        return get_encoder().encode({
             "success": False,
             "error": f"Source PDF not found: {source}"
-        }, indent=2)
+        }, compact=compact)
     
     # Create output directory
     output_path = Path(output_dir)
@@ -442,28 +1437,29 @@ async def _convert_pdf_to_docling_raw_impl(
         with open(md_file, "w", encoding="utf-8") as f:
             f.write(doc.export_to_markdown())
         
-        return json.dumps({
+        return get_encoder().encode({
             "success": True,
             "source": str(source_path),
             "json_file": str(json_file),
             "md_file": str(md_file),
             "message": f"Converted {source_path.name} to Docling format",
             "pages": len(doc.pages) if hasattr(doc, "pages") else None
-        }, indent=2)
+        }, compact=compact)
         
     except Exception as e:
         logger.error(f"Failed to convert PDF: {e}", exc_info=True)
-        return json.dumps({
+        return get_encoder().encode({
             "success": False,
             "error": str(e),
             "source": str(source)
-        }, indent=2)
+        }, compact=compact)
 
 
 @mcp.tool()
 async def convert_pdf_to_docling_raw(
     source: str,
-    output_dir: str | None = None
+    output_dir: str | None = None,
+    compact: bool | None = None
 ) -> str:
     """Convert PDF to Docling raw JSON format.
     
@@ -473,16 +1469,18 @@ async def convert_pdf_to_docling_raw(
     Args:
         source: Path to source PDF file
         output_dir: Output directory for Docling raw JSON files (defaults to ANKI_MCP_DOCLING_RAW_DIR env var or data/input/intermediate/docling_raw/)
+        compact: Return compact JSON instead of indented (default: server setting)
         
     Returns:
         JSON string with conversion result and file paths
     """
-    return await _convert_pdf_to_docling_raw_impl(source, output_dir)
+    return await _convert_pdf_to_docling_raw_impl(source, output_dir, compact)
 
 
 async def _convert_docling_raw_to_intermediate_impl(
     source: str,
-    output_dir: str | None = None
+    output_dir: str | None = None,
+    compact: bool | None = None
 ) -> str:
     """Internal implementation for converting Docling raw to intermediate format."""
     import re
@@ -495,10 +1493,10 @@ async def _convert_docling_raw_to_intermediate_impl(
     # Validate source exists
     source_path = Path(source)
     if not source_path.exists():
-        return json.dumps({
+        return get_encoder().encode({
             "success": False,
             "error": f"Source file not found: {source}"
-        }, indent=2)
+        }, compact=compact)
     
     # Create output directory
     output_path = Path(output_dir)
@@ -592,27 +1590,28 @@ async def _convert_docling_raw_to_intermediate_impl(
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(doc_dict, f, indent=2, ensure_ascii=False)
         
-        return json.dumps({
+        return get_encoder().encode({
             "success": True,
             "source": str(source_path),
             "output_file": str(output_file),
             "sections": len(sections),
             "message": f"Converted {source_path.name} to structured format"
-        }, indent=2)
+        }, compact=compact)
         
     except Exception as e:
         logger.error(f"Failed to convert Docling raw to intermediate: {e}", exc_info=True)
-        return json.dumps({
+        return get_encoder().encode({
             "success": False,
             "error": str(e),
             "source": str(source)
-        }, indent=2)
+        }, compact=compact)
 
 
 @mcp.tool()
 async def convert_docling_raw_to_intermediate(
     source: str,
-    output_dir: str | None = None
+    output_dir: str | None = None,
+    compact: bool | None = None
 ) -> str:
     """Convert Docling raw JSON to structured intermediate JSON format.
     
@@ -622,8 +1621,9 @@ async def convert_docling_raw_to_intermediate(
     Args:
         source: Path to Docling raw JSON file (*_docling.json)
         output_dir: Output directory for structured JSON files (defaults to ANKI_MCP_INTERMEDIATE_DIR env var or data/input/intermediate/)
+        compact: Return compact JSON instead of indented (default: server setting)
         
     Returns:
         JSON string with conversion result and file paths
     """
-    return await _convert_docling_raw_to_intermediate_impl(source, output_dir)
+    return await _convert_docling_raw_to_intermediate_impl(source, output_dir, compact)
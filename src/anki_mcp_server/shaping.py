@@ -0,0 +1,100 @@
+"""Response shaping for tools that return notes."""
+
+import html
+import re
+from typing import Any
+
+_BREAK_RE = re.compile(r"<br\s*/?>|</(?:div|p|li|tr)>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Characters of note text used as snippet when no search match is highlighted
+SNIPPET_LENGTH = 160
+
+# Appended to field values cut at max_field_length
+ELLIPSIS = "…"
+
+
+def strip_html(value: str) -> str:
+    """Convert field HTML to plain text: line breaks kept, tags dropped, entities decoded."""
+    return html.unescape(_TAG_RE.sub("", _BREAK_RE.sub("\n", value))).strip()
+
+
+def fields_text(fields: dict[str, Any]) -> str:
+    """Return the plain text of ``notesInfo`` fields (``{name: {value, order}}``) in order."""
+    ordered = sorted(fields.values(), key=lambda f: f["order"])
+    return "\n".join(strip_html(f["value"]) for f in ordered)
+
+
+def shape_note(
+    note: dict[str, Any],
+    fields: list[str] | None = None,
+    strip: bool = False,
+    max_field_length: int | None = None,
+    metadata_only: bool = False,
+) -> dict[str, Any]:
+    """Project a ``notesInfo`` entry down to what the caller asked for.
+
+    Without options the note is returned unchanged. With any option the note is
+    returned compactly: noteId, modelName, tags and ``fields`` as a flat
+    ``{name: value}`` mapping in field order.
+
+    Args:
+        note: Note as returned by ``notesInfo`` (empty for missing notes)
+        fields: Field names to include, matched case-insensitively (default: all)
+        strip: Convert field HTML to plain text
+        max_field_length: Truncate longer field values, listing them in ``truncated``
+        metadata_only: Return noteId, modelName, tags, mod, field names and card
+            count without any field content
+
+    Returns:
+        Shaped note
+    """
+    if not note or (
+        fields is None and not strip and max_field_length is None and not metadata_only
+    ):
+        return note
+
+    ordered = sorted(note["fields"].items(), key=lambda item: item[1]["order"])
+    shaped: dict[str, Any] = {
+        "noteId": note["noteId"],
+        "modelName": note["modelName"],
+        "tags": note["tags"],
+    }
+    if metadata_only:
+        shaped["mod"] = note.get("mod")
+        shaped["fieldNames"] = [name for name, _ in ordered]
+        shaped["cardCount"] = len(note.get("cards", []))
+        return shaped
+
+    wanted = {name.lower() for name in fields} if fields is not None else None
+    values: dict[str, str] = {}
+    truncated = []
+    for name, field in ordered:
+        if wanted is not None and name.lower() not in wanted:
+            continue
+        value = strip_html(field["value"]) if strip else field["value"]
+        if max_field_length is not None and len(value) > max_field_length:
+            value = value[:max_field_length] + ELLIPSIS
+            truncated.append(name)
+        values[name] = value
+    shaped["fields"] = values
+    if truncated:
+        shaped["truncated"] = truncated
+    return shaped
+
+
+def shape_notes(notes: list[dict[str, Any]], **options: Any) -> list[dict[str, Any]]:
+    """Apply ``shape_note`` with the same options to every note."""
+    return [shape_note(note, **options) for note in notes]
+
+
+def snippet_result(note: dict[str, Any], deck: str | None = None) -> dict[str, Any]:
+    """Shape a ``notesInfo`` entry like a ranked search result, without a score."""
+    return {
+        "noteId": note["noteId"],
+        "modelName": note["modelName"],
+        "deck": deck,
+        "tags": note["tags"],
+        "snippet": fields_text(note["fields"])[:SNIPPET_LENGTH],
+        "score": None,
+    }
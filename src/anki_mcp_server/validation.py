@@ -0,0 +1,163 @@
+"""Local validation of notes against cached note type schemas and decks."""
+
+import asyncio
+import re
+from typing import Any
+
+from anki_mcp_server.resources import ResourceHandler
+
+# Fields a cloze template renders with {{cloze:Field}}
+_CLOZE_FIELD_RE = re.compile(r"\{\{(?:[^}]*:)?cloze:([^}]+)\}\}")
+
+# Opening of a cloze deletion, well-formed ({{c1::) or not ({{c1:, {{c::, {{ c1::)
+_CLOZE_OPEN_RE = re.compile(r"\{\{\s*c(\d*)\s*:+", re.IGNORECASE)
+
+
+def cloze_fields(schema: dict[str, Any]) -> list[str]:
+    """Return the fields the templates of a schema render as cloze, empty if not a cloze type."""
+    names: list[str] = []
+    for template in schema.get("templates", {}).values():
+        for match in _CLOZE_FIELD_RE.finditer(template.get("Front", "")):
+            if match.group(1) not in names:
+                names.append(match.group(1))
+    return names
+
+
+def check_cloze(value: str) -> str | None:
+    """Return what is wrong with the cloze deletions in a field value, or None."""
+    openings = list(_CLOZE_OPEN_RE.finditer(value))
+    if not openings:
+        return "has no cloze deletions (use {{c1::text}})"
+    for match in openings:
+        number = match.group(1)
+        if match.group(0) != f"{{{{c{number}::" or not number:
+            return f"has a malformed cloze deletion '{match.group(0)}' (use {{{{c1::text}}}})"
+        if int(number) < 1:
+            return "has cloze number 0 (numbers start at 1)"
+    if value.count("}}") < len(openings) or "}}" not in value[openings[-1].end() :]:
+        return "has a cloze deletion without closing '}}'"
+    return None
+
+
+class NoteValidator:
+    """Checks notes in AnkiConnect format before they are sent.
+
+    Note types, field lists and decks come from the ``ResourceHandler`` cache,
+    so a batch is validated in one pass after at most one fetch per note type.
+    A note type or deck missing from the cache is looked up once more before
+    notes using it are rejected, in case it was created in Anki meanwhile.
+
+    Args:
+        resources: Resource handler whose cache provides decks, note types and schemas
+    """
+
+    def __init__(self, resources: ResourceHandler):
+        self.resources = resources
+
+    async def validate(self, note: dict[str, Any], require_deck: bool = True) -> str | None:
+        """Return why a note would be rejected, or None if it looks valid."""
+        [error] = await self.validate_many([note], require_deck=require_deck)
+        return error
+
+    async def validate_many(
+        self, notes: list[dict[str, Any]], require_deck: bool = True
+    ) -> list[str | None]:
+        """Validate a batch of notes.
+
+        Args:
+            notes: Notes with deckName, modelName, fields and optional tags
+            require_deck: Reject notes whose deck does not exist
+
+        Returns:
+            Per note the reason it would be rejected, or None if it looks valid
+        """
+        model_names = {n.get("modelName") for n in notes if isinstance(n.get("modelName"), str)}
+        known_models = await self._known(
+            self.resources.get_note_types, self.resources.invalidate_note_types, model_names
+        )
+        found = sorted(model_names & known_models)
+        schemas = dict(
+            zip(
+                found,
+                await asyncio.gather(*(self.resources.get_model_schema(m) for m in found)),
+                strict=True,
+            )
+        )
+        known_decks: set[str] = set()
+        if require_deck:
+            deck_names = {n.get("deckName") for n in notes if isinstance(n.get("deckName"), str)}
+            known_decks = await self._known(
+                self.resources.get_decks, self.resources.invalidate_decks, deck_names
+            )
+        cloze = {name: cloze_fields(schema) for name, schema in schemas.items()}
+
+        return [
+            self._check(note, schemas, cloze, known_decks if require_deck else None)
+            for note in notes
+        ]
+
+    @staticmethod
+    async def _known(fetch: Any, invalidate: Any, wanted: set[Any]) -> set[Any]:
+        """Return the cached names, refetched once if some wanted name is missing."""
+        known = set(await fetch())
+        if not wanted <= known:
+            invalidate()
+            known = set(await fetch())
+        return known
+
+    @staticmethod
+    def _check(
+        note: dict[str, Any],
+        schemas: dict[str, dict[str, Any]],
+        cloze: dict[str, list[str]],
+        known_decks: set[str] | None,
+    ) -> str | None:
+        model_name = note.get("modelName")
+        deck = note.get("deckName")
+        if not model_name:
+            return "Missing note type"
+        if not deck:
+            return "Missing deck"
+        if model_name not in schemas:
+            return f"Unknown note type: {model_name}"
+        if known_decks is not None and deck not in known_decks:
+            return f"Unknown deck: {deck}"
+
+        fields = note.get("fields")
+        if not isinstance(fields, dict) or not all(isinstance(v, str) for v in fields.values()):
+            return "Fields must map field names to strings"
+        names = schemas[model_name]["fields"]
+        by_lower = {name.lower(): name for name in names}
+        unknown = [name for name in fields if name.lower() not in by_lower]
+        if unknown:
+            return (
+                f"Unknown field(s) for {model_name}: {', '.join(unknown)} "
+                f"(expected: {', '.join(names)})"
+            )
+        values = {by_lower[name.lower()]: value for name, value in fields.items()}
+        if not values.get(names[0], "").strip():
+            return f"First field '{names[0]}' is empty"
+
+        # Anki needs a deletion in one of the cloze fields, but checks the syntax of all
+        with_deletions = 0
+        for name in cloze[model_name]:
+            value = values.get(name, "")
+            if not _CLOZE_OPEN_RE.search(value):
+                continue
+            with_deletions += 1
+            problem = check_cloze(value)
+            if problem is not None:
+                return f"Field '{name}' {problem}"
+        if cloze[model_name] and not with_deletions:
+            if len(cloze[model_name]) == 1:
+                return f"Field '{cloze[model_name][0]}' {check_cloze('')}"
+            names = ", ".join(f"'{name}'" for name in cloze[model_name])
+            return f"None of the cloze fields {names} has cloze deletions (use {{{{c1::text}}}})"
+
+        tags = note.get("tags") or []
+        if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+            return "Tags must be a list of strings"
+        spaced = [tag for tag in tags if not tag or any(c.isspace() for c in tag)]
+        if spaced:
+            return f"Tags must be non-empty and contain no spaces: {spaced}"
+        return None
@@ -0,0 +1,65 @@
+"""Shared fixtures: AnkiClients answered in-process instead of by AnkiConnect."""
+
+import json
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+import pytest
+
+from anki_mcp_server.client import AnkiClient
+from anki_mcp_server.fake_anki import FakeCollection
+
+
+class MockAnki:
+    """Answers AnkiClient requests through an httpx MockTransport.
+
+    Args:
+        answer: FakeCollection to answer from, or a function mapping a request
+            payload to a response body or a complete httpx.Response (default: a
+            new FakeCollection)
+
+    Attributes:
+        collection: The FakeCollection answering requests, if any
+        requests: Decoded payloads of all requests answered, in order
+        down: While True every request fails with a connection error
+    """
+
+    def __init__(self, answer: FakeCollection | Callable[[dict], Any] | None = None):
+        if answer is None:
+            answer = FakeCollection()
+        self.collection = answer if isinstance(answer, FakeCollection) else None
+        self._answer = answer.handle if isinstance(answer, FakeCollection) else answer
+        self.requests: list[dict[str, Any]] = []
+        self.down = False
+
+    @property
+    def actions(self) -> list[str]:
+        """Action names of all requests answered, in order."""
+        return [payload["action"] for payload in self.requests]
+
+    @property
+    def calls(self) -> Counter[str]:
+        """Number of requests answered per action."""
+        return Counter(self.actions)
+
+    def client(self, **kwargs: Any) -> AnkiClient:
+        """Create an AnkiClient whose requests this instance answers."""
+        client = AnkiClient(url="http://anki.test", **kwargs)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+        return client
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        if self.down:
+            raise httpx.ConnectError("connection refused")
+        payload = json.loads(request.content)
+        self.requests.append(payload)
+        body = self._answer(payload)
+        return body if isinstance(body, httpx.Response) else httpx.Response(200, json=body)
+
+
+@pytest.fixture
+def mock_anki() -> type[MockAnki]:
+    """Factory for MockAnki instances: ``mock_anki(collection).client()``."""
+    return MockAnki
@@ -0,0 +1,100 @@
+"""Tests for building Anki packages offline."""
+
+import zipfile
+
+from anki_mcp_server.apkg import (
+    build_package,
+    card_ords,
+    field_checksum,
+    iter_notes,
+    open_collection,
+    read_decks,
+    read_models,
+)
+from anki_mcp_server.fake_anki import FakeCollection
+
+REVERSED = {
+    "id": 3,
+    "name": "Basic (optional reversed card)",
+    "type": 0,
+    "flds": [
+        {"name": "Front", "ord": 0},
+        {"name": "Back", "ord": 1},
+        {"name": "Add Reverse", "ord": 2},
+    ],
+    "tmpls": [
+        {"name": "Card 1", "ord": 0, "qfmt": "{{Front}}", "afmt": "{{Back}}"},
+        {
+            "name": "Card 2",
+            "ord": 1,
+            "qfmt": "{{#Add Reverse}}{{Back}}{{/Add Reverse}}",
+            "afmt": "{{Front}}",
+        },
+    ],
+    "css": "",
+}
+
+
+def test_card_ords():
+    models = FakeCollection().models
+    assert card_ords(models["Basic"], ["q", "a"]) == [0]
+    assert card_ords(models["Cloze"], ["{{c1::a}} {{c3::b}} {{c1::c}}", ""]) == [0, 2]
+    assert card_ords(REVERSED, ["q", "a", ""]) == [0]
+    assert card_ords(REVERSED, ["q", "a", "y"]) == [0, 1]
+
+
+def test_field_checksum_ignores_markup():
+    assert field_checksum("<b>Paris</b>") == field_checksum("Paris")
+    assert field_checksum("Paris") != field_checksum("Rome")
+
+
+def test_build_package_round_trip(tmp_path):
+    models = FakeCollection().models
+    image = tmp_path / "map.png"
+    image.write_bytes(b"\x89PNG")
+    notes = [
+        {
+            "deckName": "Geo::Europe",
+            "modelName": "Basic",
+            "fields": {"front": "Paris", "Back": "FR"},
+        },
+        {
+            "deckName": "Default",
+            "modelName": "Cloze",
+            "fields": {"Text": "{{c1::Rome}}"},
+            "tags": ["it"],
+        },
+    ]
+
+    path = tmp_path / "notes.apkg"
+    note_ids = build_package(path, notes, models, decks={"Default": 1}, media=[image])
+
+    with zipfile.ZipFile(path) as package:
+        assert package.read("media") == b'{"0": "map.png"}'
+        assert package.read("0") == b"\x89PNG"
+    conn = open_collection(path, tmp_path)
+    try:
+        assert {m["name"] for m in read_models(conn)} == {"Basic", "Cloze"}
+        decks = read_decks(conn)
+        assert {"Default", "Geo", "Geo::Europe"} <= set(decks)
+        stored = list(iter_notes(conn))
+    finally:
+        conn.close()
+    assert [n["id"] for n in stored] == note_ids
+    assert stored[0]["fields"] == ["Paris", "FR"]
+    assert stored[0]["did"] == decks["Geo::Europe"]
+    assert stored[1]["tags"] == ["it"]
+    assert stored[1]["did"] == 1
+
+
+def test_fake_imports_package(tmp_path):
+    collection = FakeCollection()
+    notes = [
+        {"deckName": "Bulk", "modelName": "Basic", "fields": {"Front": f"q{i}", "Back": "a"}}
+        for i in range(300)
+    ]
+    path = tmp_path / "bulk.apkg"
+    note_ids = build_package(path, notes, collection.models)
+
+    assert collection.import_package(str(path)) is True
+    assert sorted(collection.find_notes("deck:Bulk")) == sorted(note_ids)
@@ -0,0 +1,133 @@
+"""Tests for chunked bulk writes."""
+
+import asyncio
+
+from anki_mcp_server.bulk import BulkImporter, ChunkSizer, run_chunked, update_notes
+from anki_mcp_server.fake_anki import FakeCollection
+
+
+def chunk_sizes(anki) -> list[int]:
+    """Notes per addNotes request and actions per multi request, in order."""
+    return [
+        len(payload["params"]["notes" if payload["action"] == "addNotes" else "actions"])
+        for payload in anki.requests
+        if payload["action"] in ("addNotes", "multi")
+    ]
+
+
+def basic_notes(count: int) -> list[dict]:
+    return [
+        {"deckName": "Default", "modelName": "Basic", "fields": {"Front": f"q{i}", "Back": "a"}}
+        for i in range(count)
+    ]
+
+
+def test_chunk_sizer_adapts_to_latency():
+    """Fast chunks grow the size (at most twofold), slow chunks shrink it."""
+    sizer = ChunkSizer(initial=50, target_seconds=1.0)
+    sizer.observe(50, 0.01)
+    assert sizer.size == 100
+    sizer.observe(100, 10.0)
+    assert sizer.size == 55
+    for _ in range(5):
+        sizer.observe(sizer.size, 1000.0)
+    assert sizer.size == sizer.minimum
+
+
+async def test_import_chunks_notes_and_reports_progress(mock_anki):
+    """All notes are added in several chunks, with progress after each one."""
+    collection = FakeCollection()
+    anki = mock_anki(collection)
+    events = []
+
+    async def progress(done, total):
+        events.append((done, total))
+
+    importer = BulkImporter(anki.client(), ChunkSizer(initial=10, minimum=10))
+    result = await importer.run(basic_notes(95), total=95, progress=progress)
+
+    assert len(result.created) == 95
+    assert len(collection.notes) == 95
+    chunks = chunk_sizes(anki)
+    assert sum(chunks) == 95 and len(chunks) == result.chunks > 1
+    assert events[-1] == (95, 95)
+    assert [done for done, _ in events] == sorted(done for done, _ in events)
+
+
+async def test_failures_are_reported_by_index(mock_anki):
+    """Failed notes keep their input index; stop_on_error skips later chunks."""
+    notes = basic_notes(40)
+    notes[3]["fields"]["Front"] = "q0"
+
+    result = await BulkImporter(
+        mock_anki().client(), ChunkSizer(initial=10, minimum=10), depth=1
+    ).run(notes, total=40)
+    summary = result.summary(include_note_ids=False)
+    assert summary["created"] == 39
+    assert summary["failures"] == [{"index": 3, "error": "Failed to create note"}]
+    assert "noteIds" not in summary
+
+    anki = mock_anki()
+    result = await BulkImporter(anki.client(), ChunkSizer(initial=10, minimum=10), depth=1).run(
+        notes, total=40, stop_on_error=True
+    )
+    summary = result.summary()
+    assert summary["stopped"] is True
+    assert chunk_sizes(anki) == [10]
+    assert (summary["created"], summary["failed"], summary["skipped"]) == (9, 1, 30)
+    assert len(summary["noteIds"]) == 40
+
+
+async def test_import_accepts_async_iterables(mock_anki):
+    """Notes may come from an async generator, e.g. a file being read."""
+
+    async def generate():
+        for note in basic_notes(25):
+            yield note
+
+    result = await BulkImporter(mock_anki().client(), ChunkSizer(initial=10)).run(generate())
+    assert len(result.created) == 25
+
+
+async def test_update_notes_batches_fields_and_tags(mock_anki):
+    """Updates are sent as multi requests and reported per entry."""
+    collection = FakeCollection.synthetic(120, cloze_ratio=0)
+    note_ids = list(collection.notes)
+    anki = mock_anki(collection)
+    updates = [
+        {"id": note_id, "fields": {"Back": "new"}, "tags": ["fixed"]} for note_id in note_ids
+    ]
+    updates.append({"id": 1, "fields": {"Back": "x"}})
+    updates.append({"id": note_ids[0]})
+
+    results = await update_notes(anki.client(), updates, chunk_size=50)
+
+    assert chunk_sizes(anki) == [100, 100, 41]
+    assert all(result["success"] for result in results[:120])
+    assert collection.notes[note_ids[5]]["fields"]["Back"] == "new"
+    assert collection.notes[note_ids[5]]["tags"] == ["fixed"]
+    assert results[120] == {
+        "index": 120,
+        "noteId": 1,
+        "success": False,
+        "error": "Note was not found: 1",
+    }
+    assert results[121]["error"].startswith("Nothing to update")
+
+
+async def test_run_chunked_bounds_concurrency():
+    """IDs are split into chunks with at most ``concurrency`` calls in flight."""
+    seen: list[list[int]] = []
+    in_flight = peak = 0
+
+    async def call(chunk):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        seen.append(chunk)
+        in_flight -= 1
+
+    assert await run_chunked(list(range(2500)), call, chunk_size=1000, concurrency=2) == 3
+    assert peak == 2
+    assert sorted(i for chunk in seen for i in chunk) == list(range(2500))
@@ -0,0 +1,55 @@
+"""Tests for the metadata cache."""
+
+from anki_mcp_server.cache import MetadataCache
+
+
+def test_get_and_set():
+    """Stored values are returned until they expire."""
+    cache = MetadataCache()
+    assert cache.get("decks") is None
+    cache.set("decks", ["Default"])
+    assert cache.get("decks") == ["Default"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_per_key_ttl():
+    """Entries expire according to their own TTL."""
+    cache = MetadataCache(default_ttl=300)
+    cache.set("decks", ["Default"], ttl=0)
+    cache.set("note_types", ["Basic"])
+    assert cache.get("decks") is None
+    assert cache.get("note_types") == ["Basic"]
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted when full."""
+    cache = MetadataCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_invalidate():
+    """Invalidated keys are dropped, others kept."""
+    cache = MetadataCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a", "missing")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_stale_window():
+    """Expired entries are only returned by get_stale within the stale window."""
+    cache = MetadataCache(stale_ttl=60)
+    cache.set("decks", ["Default"], ttl=0)
+    assert cache.get("decks") is None
+    assert cache.get_stale("decks") == (["Default"], False)
+    cache.set("decks", ["Default"])
+    assert cache.get_stale("decks") == (["Default"], True)
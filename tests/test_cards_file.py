@@ -0,0 +1,157 @@
+"""Tests for streaming card files and note validation."""
+
+import json
+
+import pytest
+
+from anki_mcp_server.cards_file import CardsFileError, iter_json_values
+from anki_mcp_server.resources import ResourceHandler
+from anki_mcp_server.validation import NoteValidator, check_cloze
+
+CARDS = [{"fields": {"Front": f"q{i} " + "x" * i, "Back": "a"}, "tags": ["t"]} for i in range(40)]
+
+
+@pytest.mark.parametrize("read_size", [7, 1 << 16])
+def test_reads_json_array_in_small_pieces(tmp_path, read_size):
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(CARDS, indent=2))
+    assert list(iter_json_values(path, read_size=read_size)) == CARDS
+
+
+@pytest.mark.parametrize("read_size", [5, 1 << 16])
+def test_reads_ndjson(tmp_path, read_size):
+    path = tmp_path / "cards.ndjson"
+    path.write_text("\n".join(json.dumps(card) for card in CARDS) + "\n")
+    assert list(iter_json_values(path, read_size=read_size)) == CARDS
+
+
+def test_numbers_split_across_reads_are_not_cut(tmp_path):
+    path = tmp_path / "numbers.ndjson"
+    path.write_text("12345 678")
+    assert list(iter_json_values(path, read_size=3)) == [12345, 678]
+
+
+def test_malformed_json_reports_position_after_valid_items(tmp_path):
+    path = tmp_path / "cards.json"
+    path.write_text('[{"fields": {}}, {"fields": }]')
+    values = iter_json_values(path, read_size=4)
+    assert next(values) == {"fields": {}}
+    with pytest.raises(CardsFileError, match="character 28"):
+        next(values)
+
+
+def test_unterminated_array(tmp_path):
+    path = tmp_path / "cards.json"
+    path.write_text('[{"a": 1}, ')
+    with pytest.raises(CardsFileError, match="Unterminated"):
+        list(iter_json_values(path))
+
+
+class _SchemaClient:
+    """Minimal client serving Basic, Cloze and a two-field cloze note type, and one deck."""
+
+    def __init__(self):
+        self.deck_calls = 0
+
+    async def get_deck_names(self):
+        self.deck_calls += 1
+        return ["D"]
+
+    async def get_model_names(self):
+        return ["Basic", "Cloze", "Cloze Pair"]
+
+    async def get_model_field_names(self, model_name):
+        return {"Cloze": ["Text", "Back Extra"], "Cloze Pair": ["Text", "Extra"]}.get(
+            model_name, ["Front", "Back"]
+        )
+
+    async def get_model_templates(self, model_name):
+        if model_name == "Cloze":
+            return {"Cloze": {"Front": "{{cloze:Text}}", "Back": "{{cloze:Text}}"}}
+        if model_name == "Cloze Pair":
+            front = "{{cloze:Text}}<br>{{cloze:Extra}}"
+            return {"Cloze": {"Front": front, "Back": front}}
+        return {}
+
+    async def get_model_styling(self, model_name):
+        return {"css": ""}
+
+
+@pytest.mark.parametrize(
+    ("note", "error"),
+    [
+        ({"deckName": "D", "modelName": "Basic", "fields": {"front": "q"}}, None),
+        ({"deckName": "D", "fields": {"Front": "q"}}, "Missing note type"),
+        ({"deckName": "D", "modelName": "Nope", "fields": {"Front": "q"}}, "Unknown note type"),
+        ({"deckName": "D", "modelName": "Basic", "fields": {"Frnt": "q"}}, "Unknown field"),
+        ({"deckName": "D", "modelName": "Basic", "fields": {"Back": "a"}}, "is empty"),
+        ({"deckName": "D", "modelName": "Basic", "fields": {"Front": 1}}, "to strings"),
+        ({"modelName": "Basic", "fields": {"Front": "q"}}, "Missing deck"),
+        ({"deckName": "E", "modelName": "Basic", "fields": {"Front": "q"}}, "Unknown deck"),
+        ({"deckName": "D", "modelName": "Cloze", "fields": {"Text": "{{c1::x}}"}}, None),
+        ({"deckName": "D", "modelName": "Cloze", "fields": {"Text": "plain"}}, "no cloze"),
+        # One cloze field with deletions is enough, but all must be well-formed
+        (
+            {"deckName": "D", "modelName": "Cloze Pair", "fields": {"Text": "{{c1::x}}"}},
+            None,
+        ),
+        (
+            {"deckName": "D", "modelName": "Cloze Pair", "fields": {"Text": "a", "Extra": "b"}},
+            "None of the cloze fields 'Text', 'Extra'",
+        ),
+        (
+            {
+                "deckName": "D",
+                "modelName": "Cloze Pair",
+                "fields": {"Text": "{{c1::x}}", "Extra": "{{c2:y}}"},
+            },
+            "Field 'Extra' has a malformed",
+        ),
+        (
+            {"deckName": "D", "modelName": "Basic", "fields": {"Front": "q"}, "tags": ["a b"]},
+            "no spaces",
+        ),
+    ],
+)
+async def test_validator(note, error):
+    validator = NoteValidator(ResourceHandler(_SchemaClient()))
+    result = await validator.validate(note)
+    if error is None:
+        assert result is None
+    else:
+        assert error in result
+
+
+@pytest.mark.parametrize(
+    ("value", "error"),
+    [
+        ("{{c1::Paris}} is in {{c2::France::country}}", None),
+        ("no deletions", "no cloze"),
+        ("{{c1:Paris}}", "malformed"),
+        ("{{c::Paris}}", "malformed"),
+        ("{{c0::Paris}}", "number 0"),
+        ("{{c1::Paris", "closing"),
+    ],
+)
+def test_check_cloze(value, error):
+    result = check_cloze(value)
+    if error is None:
+        assert result is None
+    else:
+        assert error in result
+
+
+async def test_validator_fetches_decks_once_per_batch():
+    client = _SchemaClient()
+    validator = NoteValidator(ResourceHandler(client))
+    notes = [
+        {"deckName": "D", "modelName": "Basic", "fields": {"Front": f"q{i}"}} for i in range(5)
+    ]
+    notes.append({"deckName": "New", "modelName": "Basic", "fields": {"Front": "q"}})
+
+    errors = await validator.validate_many(notes)
+
+    assert errors[:5] == [None] * 5
+    assert "Unknown deck" in errors[5]
+    # One fetch, plus one refetch for the deck missing from the cache
+    assert client.deck_calls == 2
@@ -0,0 +1,162 @@
+"""Tests for AnkiClient request handling."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from anki_mcp_server.client import AnkiClient, AnkiConnectError, AnkiUnavailableError
+
+
+def answer(payload: dict) -> dict:
+    """Answer single and multi requests like AnkiConnect."""
+    if payload["action"] == "multi":
+        return {"result": [answer(a) for a in payload["params"]["actions"]], "error": None}
+    if payload["action"] == "modelFieldNames":
+        if payload["params"]["modelName"] == "Missing":
+            return {"result": None, "error": "model was not found: Missing"}
+        return {"result": ["Front", "Back"], "error": None}
+    if payload["action"] == "deckNames":
+        return {"result": ["Default"], "error": None}
+    return {"result": 6, "error": None}
+
+
+async def test_unbatched_sends_one_request_per_call(mock_anki):
+    """Without a batch window every call is its own request."""
+    anki = mock_anki(answer)
+    client = anki.client()
+    assert await client.get_deck_names() == ["Default"]
+    assert await client.get_model_field_names("Basic") == ["Front", "Back"]
+    assert anki.actions == ["deckNames", "modelFieldNames"]
+
+
+async def test_batched_calls_share_one_multi_request(mock_anki):
+    """Calls issued in the same tick are sent as one multi request."""
+    anki = mock_anki(answer)
+    client = anki.client(batch_window_us=0)
+    decks, fields, version = await asyncio.gather(
+        client.get_deck_names(),
+        client.get_model_field_names("Basic"),
+        client._invoke("version"),
+    )
+    assert decks == ["Default"]
+    assert fields == ["Front", "Back"]
+    assert version == 6
+    assert len(anki.requests) == 1
+    assert anki.requests[0]["action"] == "multi"
+    assert len(anki.requests[0]["params"]["actions"]) == 3
+
+
+async def test_batched_errors_are_delivered_per_caller(mock_anki):
+    """A failing action in a multi request only fails its own caller."""
+    anki = mock_anki(answer)
+    client = anki.client(batch_window_us=0)
+    results = await asyncio.gather(
+        client.get_model_field_names("Missing"),
+        client.get_deck_names(),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], AnkiConnectError)
+    assert results[1] == ["Default"]
+
+
+async def test_single_batched_call_is_not_wrapped(mock_anki):
+    """A window containing one call sends it directly."""
+    anki = mock_anki(answer)
+    client = anki.client(batch_window_us=0)
+    assert await client.get_deck_names() == ["Default"]
+    assert anki.requests[0]["action"] == "deckNames"
+
+
+async def test_batch_size_is_capped(mock_anki):
+    """Full batches are sent without waiting for the window."""
+    anki = mock_anki(answer)
+    client = anki.client(batch_window_us=1_000_000, max_batch_size=2)
+    await asyncio.wait_for(
+        asyncio.gather(client.get_deck_names(), client.get_model_names()), timeout=0.5
+    )
+    assert len(anki.requests) == 1
+
+
+async def test_batch_connection_error_fails_all_callers(mock_anki):
+    """Transport errors are raised to every caller in the batch."""
+    anki = mock_anki(answer)
+    anki.down = True
+    client = anki.client(batch_window_us=0)
+    results = await asyncio.gather(
+        client.get_deck_names(), client.get_model_names(), return_exceptions=True
+    )
+    assert all(isinstance(r, AnkiConnectError) for r in results)
+
+
+async def test_non_json_response_fails_every_caller(mock_anki):
+    """A response that is not JSON raises instead of leaving batched callers waiting."""
+    anki = mock_anki(lambda payload: httpx.Response(200, text="<html>Not AnkiConnect</html>"))
+    for client in (anki.client(), anki.client(batch_window_us=0)):
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                client.get_deck_names(), client.get_model_names(), return_exceptions=True
+            ),
+            timeout=2,
+        )
+        assert all(isinstance(r, AnkiUnavailableError) for r in results)
+        assert "non-JSON" in str(results[0])
+        assert client.health.consecutive_failures > 0
+
+
+async def test_unexpected_batch_errors_fail_every_caller(mock_anki, monkeypatch):
+    """Any exception while sending a batch is delivered to all of its callers."""
+    client = mock_anki(answer).client(batch_window_us=0)
+
+    async def broken(payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(client, "_post", broken)
+    results = await asyncio.wait_for(
+        asyncio.gather(client.get_deck_names(), client.get_model_names(), return_exceptions=True),
+        timeout=2,
+    )
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+
+
+def test_batch_window_from_env(monkeypatch: pytest.MonkeyPatch):
+    """Batch window can be configured through the environment."""
+    monkeypatch.setenv("ANKI_MCP_BATCH_WINDOW_US", "250")
+    assert AnkiClient().batch_window_us == 250
+
+
+async def test_identical_concurrent_reads_share_one_request(mock_anki):
+    """Concurrent identical read calls are deduplicated."""
+    anki = mock_anki(answer)
+    client = anki.client()
+    results = await asyncio.gather(*(client.get_deck_names() for _ in range(5)))
+    assert results == [["Default"]] * 5
+    assert len(anki.requests) == 1
+
+
+async def test_reads_with_different_params_are_not_shared(mock_anki):
+    """Single-flight keys include the canonicalised params."""
+    anki = mock_anki(answer)
+    client = anki.client()
+    await asyncio.gather(
+        client.get_model_field_names("Basic"),
+        client.get_model_field_names("Basic"),
+        client.get_model_field_names("Cloze"),
+    )
+    assert len(anki.requests) == 2
+
+
+async def test_writes_are_never_shared(mock_anki):
+    """Identical concurrent write calls are all sent."""
+    anki = mock_anki(answer)
+    client = anki.client()
+    await asyncio.gather(client.create_deck("New"), client.create_deck("New"))
+    assert len(anki.requests) == 2
+
+
+async def test_single_flight_can_be_disabled(mock_anki):
+    """With single_flight=False every read is sent."""
+    anki = mock_anki(answer)
+    client = anki.client(single_flight=False)
+    await asyncio.gather(client.get_deck_names(), client.get_deck_names())
+    assert len(anki.requests) == 2
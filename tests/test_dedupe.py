@@ -0,0 +1,87 @@
+"""Tests for the local duplicate index."""
+
+from anki_mcp_server.client import AnkiClient
+from anki_mcp_server.dedupe import DuplicateIndex, duplicate_error, first_field_hash
+from anki_mcp_server.fake_anki import FakeCollection
+from anki_mcp_server.resources import ResourceHandler
+
+
+def make_index(client: AnkiClient) -> DuplicateIndex:
+    """Create a DuplicateIndex that looks up notes through ``client``."""
+    return DuplicateIndex(
+        ResourceHandler(client), client.find_notes, client.notes_info, client.get_decks
+    )
+
+
+def basic(front: str, deck: str = "Default", **options) -> dict:
+    return {
+        "deckName": deck,
+        "modelName": "Basic",
+        "fields": {"Front": front, "Back": "a"},
+        "options": options,
+    }
+
+
+def test_first_field_hash_ignores_markup_but_keeps_media_names():
+    assert first_field_hash("<b>Bayes</b> rule ") == first_field_hash("Bayes rule")
+    assert first_field_hash('<img src="a.png">') != first_field_hash('<img src="b.png">')
+
+
+async def test_flags_existing_and_in_batch_duplicates(mock_anki):
+    collection = FakeCollection()
+    existing = collection.add_note(basic("What is a prior?"))
+    anki = mock_anki(collection)
+    index = make_index(anki.client())
+
+    results = await index.check(
+        [
+            basic("<div>What is a prior?</div>"),
+            basic("New question"),
+            basic("New question"),
+            basic("New question", allowDuplicate=True),
+        ]
+    )
+
+    assert results == [{"duplicateOf": existing}, None, {"duplicateOfIndex": 1}, None]
+    assert duplicate_error(results[0]) == f"Duplicate of existing note {existing}"
+    assert anki.calls["findNotes"] == 1
+
+
+async def test_index_follows_creates_and_deletes(mock_anki):
+    collection = FakeCollection()
+    anki = mock_anki(collection)
+    index = make_index(anki.client())
+    assert await index.check([basic("Q")]) == [None]
+
+    note_id = collection.add_note(basic("Q"))
+    await index.add(basic("Q"), note_id)
+    assert await index.check([basic("Q")]) == [{"duplicateOf": note_id}]
+
+    index.forget([note_id])
+    assert await index.check([basic("Q")]) == [None]
+    assert anki.calls["findNotes"] == 1
+
+
+async def test_deck_scope_only_checks_the_same_deck(mock_anki):
+    collection = FakeCollection()
+    collection.create_deck("Other")
+    other = collection.add_note(basic("Q", deck="Other"))
+    index = make_index(mock_anki(collection).client())
+
+    assert await index.check([basic("Q", duplicateScope="deck")]) == [None]
+    assert await index.check([basic("Q")]) == [{"duplicateOf": other}]
+
+
+async def test_deck_scope_ignores_decks_matched_by_wildcards(mock_anki):
+    """Anki reads ``*`` and ``_`` in a deck search as wildcards; such matches are not duplicates."""
+    collection = FakeCollection()
+    for deck in ("Lab*", "Lab 2"):
+        collection.create_deck(deck)
+    other = collection.add_note(basic("Q", deck="Lab 2"))
+    index = make_index(mock_anki(collection).client())
+
+    assert other in collection.find_notes('"deck:Lab*"')
+    assert await index.check([basic("Q", deck="Lab*", duplicateScope="deck")]) == [None]
+    assert await index.check([basic("Q", deck="lab 2", duplicateScope="deck")]) == [
+        {"duplicateOf": other}
+    ]
@@ -0,0 +1,59 @@
+"""Tests for response encoding."""
+
+import json
+
+from anki_mcp_server.encoding import ResponseEncoder, dumps
+
+
+def test_dumps_indented_and_compact():
+    data = {"a": [1, 2], "b": "é"}
+    assert json.loads(dumps(data)) == data
+    assert "\n" in dumps(data)
+    compact = dumps(data, compact=True)
+    assert json.loads(compact) == data
+    assert " " not in compact and "\n" not in compact
+    # Both modes keep non-ASCII text instead of escaping it
+    assert "é" in dumps(data) and "é" in compact
+
+
+def test_encoder_default_and_override(monkeypatch):
+    monkeypatch.setenv("ANKI_MCP_COMPACT_JSON", "1")
+    encoder = ResponseEncoder()
+    assert encoder.encode({"a": 1}) == '{"a":1}'
+    assert "\n" in encoder.encode({"a": 1}, compact=False)
+
+
+def test_under_budget_is_untouched():
+    encoder = ResponseEncoder(compact=True, max_bytes=1000)
+    assert json.loads(encoder.encode({"notes": [1, 2, 3]})) == {"notes": [1, 2, 3]}
+
+
+def test_trims_longest_list_to_budget():
+    encoder = ResponseEncoder(compact=True, max_bytes=400)
+    data = {"tags": ["a"], "notes": [{"text": "x" * 20, "id": i} for i in range(50)]}
+
+    text = encoder.encode(data)
+    result = json.loads(text)
+
+    assert len(text.encode()) <= 400
+    assert result["tags"] == ["a"]
+    returned = result["truncated"]["returned"]
+    assert 0 < returned < 50
+    assert result["notes"] == data["notes"][:returned]
+    assert result["truncated"]["omitted"] == 50 - returned
+    assert result["truncated"]["key"] == "notes"
+
+
+def test_continuation_is_merged():
+    encoder = ResponseEncoder(compact=True, max_bytes=300)
+    data = {"notes": list(range(1000)), "nextCursor": None}
+
+    result = json.loads(encoder.encode(data, continuation=lambda n: {"nextCursor": f"t:{n}"}))
+
+    assert result["nextCursor"] == f"t:{result['truncated']['returned']}"
+
+
+def test_nothing_to_trim_returns_full_response():
+    encoder = ResponseEncoder(compact=True, max_bytes=10)
+    data = {"text": "x" * 100}
+    assert json.loads(encoder.encode(data)) == data
@@ -0,0 +1,124 @@
+"""Tests for the fake AnkiConnect server."""
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from anki_mcp_server.client import AnkiClient, AnkiConnectError
+from anki_mcp_server.fake_anki import FakeAnkiConnect, FakeCollection
+
+EXPORT_DIR = Path(__file__).parent.parent / "export"
+
+
+@pytest.fixture
+def fake():
+    """Running fake AnkiConnect server with an empty stock collection."""
+    with FakeAnkiConnect() as server:
+        yield server
+
+
+async def test_note_lifecycle(fake: FakeAnkiConnect):
+    """Notes can be created, searched, updated and deleted through AnkiClient."""
+    client = AnkiClient(url=fake.url)
+    await client.create_deck("PGM::Homework1")
+    assert "PGM" in await client.get_deck_names()
+
+    note_id = await client.add_note(
+        {
+            "deckName": "PGM::Homework1",
+            "modelName": "Basic",
+            "fields": {"Front": "What is Bayes' rule?", "Back": "P(A|B) = ..."},
+            "tags": ["hw1"],
+        }
+    )
+    assert await client.find_notes("deck:PGM tag:hw1") == [note_id]
+    assert await client.find_notes("front:what*") == [note_id]
+    assert await client.find_notes("-tag:hw1") == []
+
+    await client.update_note_fields(note_id, {"Back": "P(B|A) P(A) / P(B)"})
+    await client.update_note_tags(note_id, ["hw1", "bayes"])
+    (info,) = await client.notes_info([note_id])
+    assert info["fields"]["Back"]["value"] == "P(B|A) P(A) / P(B)"
+    assert info["tags"] == ["hw1", "bayes"]
+    assert info["modelName"] == "Basic"
+
+    await client.delete_notes([note_id])
+    assert await client.find_notes("deck:PGM") == []
+    await client.close()
+
+
+async def test_bulk_tag_and_deck_actions(fake: FakeAnkiConnect):
+    """Tags and decks of many notes can be changed by ID without fetching them."""
+    fake.collection = FakeCollection.synthetic(20, num_decks=2)
+    client = AnkiClient(url=fake.url)
+    note_ids = await client.find_notes("deck:Synthetic::Deck*")
+
+    await client.add_tags(note_ids[:5], ["extra", "synthetic"])
+    assert sorted(await client.find_notes("tag:extra")) == sorted(note_ids[:5])
+    await client.replace_tags(note_ids, "extra", "renamed")
+    assert await client.find_notes("tag:extra") == []
+    await client.remove_tags(note_ids, ["renamed"])
+    assert await client.find_notes("tag:renamed") == []
+
+    cards = await client.find_cards("deck:Synthetic::Deck?00")
+    await client.change_deck(cards, "Moved::Here")
+    assert len(await client.find_notes("deck:Moved")) == 10
+    assert "Moved::Here" in await client.get_deck_names()
+    await client.close()
+
+
+async def test_duplicates_and_errors(fake: FakeAnkiConnect):
+    """Duplicate and invalid notes fail like AnkiConnect."""
+    client = AnkiClient(url=fake.url)
+    note = {"deckName": "Default", "modelName": "Basic", "fields": {"Front": "Q", "Back": "A"}}
+    assert (await client.add_notes([note, note]))[1] is None
+    with pytest.raises(AnkiConnectError, match="duplicate"):
+        await client.add_note(note)
+    with pytest.raises(AnkiConnectError, match="model was not found"):
+        await client.get_model_field_names("Missing")
+    await client.close()
+
+
+async def test_multi_is_counted_as_one_request(fake: FakeAnkiConnect):
+    """Batched calls reach the server as one multi request."""
+    client = AnkiClient(url=fake.url, batch_window_us=0)
+    fields, templates, styling = await asyncio.gather(
+        client.get_model_field_names("Cloze"),
+        client.get_model_templates("Cloze"),
+        client.get_model_styling("Cloze"),
+    )
+    assert fields == ["Text", "Back Extra"]
+    assert "Cloze" in templates
+    assert "css" in styling
+    assert fake.requests == 1
+    assert fake.action_counts["multi"] == 1
+    await client.close()
+
+
+async def test_requests_are_serialized_with_latency():
+    """Concurrent requests queue behind each other like Anki's main thread."""
+    with FakeAnkiConnect(latency=0.05) as server:
+        client = AnkiClient(url=server.url, single_flight=False)
+        start = time.perf_counter()
+        await asyncio.gather(client.get_deck_names(), client.get_model_names())
+        assert time.perf_counter() - start >= 0.1
+        await client.close()
+
+
+def test_synthetic_collection():
+    """Synthetic collections generate the requested number of notes."""
+    collection = FakeCollection.synthetic(200, num_decks=4)
+    assert len(collection.notes) == 200
+    assert len(collection.find_notes('deck:"Synthetic::Deck 00"')) == 50
+    assert collection.find_notes("note:Cloze") != []
+
+
+def test_seed_from_apkg():
+    """Collections can be seeded from the exported packages."""
+    pytest.importorskip("zstandard")
+    collection = FakeCollection.from_packages(EXPORT_DIR / "PGM__Homework1.apkg")
+    assert "PGM::Homework1" in collection.decks
+    assert "AllInOne (kprim, mc, sc)" in collection.models
+    assert len(collection.find_notes("deck:PGM::Homework1")) == 50
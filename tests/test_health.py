@@ -0,0 +1,77 @@
+"""Tests for connection health tracking."""
+
+import httpx
+import pytest
+
+from anki_mcp_server.client import AnkiClient, AnkiConnectError
+from anki_mcp_server.health import CircuitOpenError, ConnectionState
+
+
+def test_success_marks_healthy():
+    """A successful request vouches for the connection."""
+    state = ConnectionState()
+    assert not state.is_healthy()
+    state.record_success()
+    assert state.is_healthy()
+    assert state.state == ConnectionState.CLOSED
+
+
+def test_circuit_opens_after_threshold():
+    """Repeated failures open the circuit and reject requests."""
+    state = ConnectionState(failure_threshold=2, reset_timeout=60)
+    state.record_failure(RuntimeError("refused"))
+    state.before_request()
+    state.record_failure(RuntimeError("refused"))
+    assert state.state == ConnectionState.OPEN
+    with pytest.raises(CircuitOpenError):
+        state.before_request()
+
+
+def test_circuit_half_opens_after_reset_timeout():
+    """After the reset timeout a probe request is allowed and success closes the circuit."""
+    state = ConnectionState(failure_threshold=1, reset_timeout=0)
+    state.record_failure(RuntimeError("refused"))
+    assert state.state == ConnectionState.HALF_OPEN
+    state.before_request()
+    state.record_success()
+    assert state.state == ConnectionState.CLOSED
+
+
+def test_snapshot_is_serializable():
+    """Snapshot reports the state for the status resource."""
+    state = ConnectionState()
+    state.record_failure(RuntimeError("refused"))
+    snapshot = state.snapshot()
+    assert snapshot["state"] == "closed"
+    assert snapshot["consecutiveFailures"] == 1
+    assert snapshot["lastError"] == "refused"
+
+
+async def test_client_fails_fast_when_circuit_open():
+    """The client stops sending requests once the circuit is open."""
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused")
+
+    client = AnkiClient(url="http://anki.test", health=ConnectionState(failure_threshold=2))
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    for _ in range(3):
+        with pytest.raises(AnkiConnectError):
+            await client.get_deck_names()
+    assert calls == 2
+
+
+async def test_client_action_error_counts_as_healthy():
+    """An AnkiConnect error response still proves Anki is reachable."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"result": None, "error": "deck was not found"})
+
+    client = AnkiClient(url="http://anki.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pytest.raises(AnkiConnectError):
+        await client.get_deck_names()
+    assert client.health.is_healthy()
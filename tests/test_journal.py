@@ -0,0 +1,139 @@
+"""Tests for the journaled write-behind queue."""
+
+import asyncio
+
+from anki_mcp_server.fake_anki import FakeCollection
+from anki_mcp_server.journal import WriteBehindQueue, WriteJournal
+
+
+def note(front: str) -> dict:
+    return {"deckName": "Default", "modelName": "Basic", "fields": {"Front": front, "Back": "a"}}
+
+
+async def test_writes_are_batched_and_updates_merged(mock_anki, tmp_path):
+    collection = FakeCollection()
+    existing = collection.add_note(note("old"))
+    anki = mock_anki(collection)
+    queue = WriteBehindQueue(anki.client(), WriteJournal(tmp_path / "j"), max_delay=60)
+
+    creates = [queue.create(note(f"q{i}")) for i in range(10)]
+    first = queue.update(existing, fields={"Front": "new"})
+    second = queue.update(existing, fields={"Back": "b"}, tags=["t"])
+    assert queue.status([creates[0]])[0]["status"] == "pending"
+    assert anki.actions == []
+
+    result = await queue.flush()
+
+    assert result == {"sent": 11, "done": 11, "failed": 0, "pending": 0, "error": None}
+    assert anki.actions == ["addNotes", "multi"]
+    assert collection.notes[existing]["fields"] == {"Front": "new", "Back": "b"}
+    assert collection.notes[existing]["tags"] == ["t"]
+    statuses = queue.status([*creates, first, second])
+    assert all(s["status"] == "done" for s in statuses)
+    assert statuses[0]["noteId"] in collection.notes
+    assert statuses[-1]["mergedInto"] == first
+
+
+async def test_full_batch_flushes_in_background(mock_anki, tmp_path):
+    collection = FakeCollection()
+    anki = mock_anki(collection)
+    queue = WriteBehindQueue(anki.client(), max_batch=5, max_delay=60)
+    for i in range(5):
+        queue.create(note(f"q{i}"))
+    await asyncio.sleep(0.05)
+    assert anki.actions == ["addNotes"]
+    assert queue.stats()["pending"] == 0
+
+
+async def test_journal_replays_after_crash(mock_anki, tmp_path):
+    collection = FakeCollection()
+    anki = mock_anki(collection)
+    anki.down = True
+    path = tmp_path / "writes.jsonl"
+    queue = WriteBehindQueue(anki.client(), WriteJournal(path), max_delay=60)
+    handle = queue.create(note("survives"))
+    assert (await queue.flush())["error"] is not None
+    assert queue.status([handle])[0]["status"] == "pending"
+
+    # A new queue over the same journal, as after a restart
+    anki.down = False
+    restarted = WriteBehindQueue(anki.client(), WriteJournal(path), max_delay=60)
+    assert restarted.replayed == 1
+    await restarted.flush()
+
+    [status] = restarted.status([handle])
+    assert status["status"] == "done"
+    assert collection.notes[status["noteId"]]["fields"]["Front"] == "survives"
+    # The compacted journal only remembers outcomes
+    records = WriteJournal(path).records()
+    assert [r["op"] for r in records] == ["done"]
+    assert WriteBehindQueue(anki.client(), WriteJournal(path)).replayed == 0
+
+
+async def test_failed_writes_are_reported(mock_anki, tmp_path):
+    collection = FakeCollection()
+    anki = mock_anki(collection)
+    queue = WriteBehindQueue(anki.client(), max_delay=60)
+    handles = [queue.create(note("same")), queue.create(note("same")), queue.update(1, tags=["x"])]
+
+    result = await queue.flush()
+
+    assert (result["done"], result["failed"]) == (1, 2)
+    statuses = queue.status(handles)
+    assert [s["status"] for s in statuses] == ["done", "failed", "failed"]
+    assert "not found" in statuses[2]["error"]
+
+
+async def test_updates_stay_queued_while_anki_is_down(mock_anki, tmp_path):
+    collection = FakeCollection()
+    existing = collection.add_note(note("old"))
+    anki = mock_anki(collection)
+    anki.down = True
+    path = tmp_path / "writes.jsonl"
+    queue = WriteBehindQueue(anki.client(), WriteJournal(path), max_delay=60)
+    handle = queue.update(existing, fields={"Front": "new"})
+
+    result = await queue.flush()
+
+    assert (result["sent"], result["failed"], result["pending"]) == (0, 0, 1)
+    assert result["error"] is not None
+    assert queue.status([handle])[0]["status"] == "pending"
+    assert WriteBehindQueue(anki.client(), WriteJournal(path)).replayed == 1
+
+    anki.down = False
+    assert (await queue.flush())["done"] == 1
+    assert collection.notes[existing]["fields"]["Front"] == "new"
+
+
+async def test_writes_rejected_by_anki_do_not_block_the_queue(mock_anki, tmp_path):
+    collection = FakeCollection()
+    existing = collection.add_note(note("old"))
+
+    def answer(payload):
+        if payload["action"] == "addNotes":
+            return {"result": None, "error": "['cannot create note because it is a duplicate']"}
+        return collection.handle(payload)
+
+    anki = mock_anki(answer)
+    path = tmp_path / "writes.jsonl"
+    queue = WriteBehindQueue(anki.client(), WriteJournal(path), max_delay=60)
+    duplicate, fresh = queue.create(note("old")), queue.create(note("fresh"))
+    update = queue.update(existing, fields={"Back": "b"})
+
+    result = await queue.flush()
+
+    assert result == {"sent": 3, "done": 2, "failed": 1, "pending": 0, "error": None}
+    statuses = queue.status([duplicate, fresh, update])
+    assert [s["status"] for s in statuses] == ["failed", "done", "done"]
+    assert "duplicate" in statuses[0]["error"]
+    assert collection.notes[statuses[1]["noteId"]]["fields"]["Front"] == "fresh"
+    assert collection.notes[existing]["fields"]["Back"] == "b"
+    assert WriteBehindQueue(anki.client(), WriteJournal(path)).replayed == 0
+
+
+def test_truncated_last_record_is_ignored(tmp_path):
+    path = tmp_path / "writes.jsonl"
+    WriteJournal(path).append([{"op": "create", "handle": "w-1", "note": note("a")}])
+    with open(path, "a") as f:
+        f.write('{"op": "create", "han')
+    assert [r["handle"] for r in WriteJournal(path).records()] == ["w-1"]
@@ -0,0 +1,42 @@
+"""Tests for content-addressed media upload."""
+
+import base64
+
+from anki_mcp_server.fake_anki import FakeCollection
+from anki_mcp_server.media import MediaLedger, MediaUploader, encode_file, hash_file
+
+
+def test_encode_file_matches_one_shot_encoding(tmp_path):
+    path = tmp_path / "slide.png"
+    content = bytes(range(256)) * 5000
+    path.write_bytes(content)
+    assert encode_file(path) == base64.b64encode(content).decode()
+    assert len(hash_file(path)) == 64
+
+
+async def test_identical_content_is_uploaded_once(mock_anki, tmp_path):
+    """Copies of a file share one upload; the ledger skips it on later calls."""
+    for name in ("a.PNG", "b.png"):
+        (tmp_path / name).write_bytes(b"same image")
+    (tmp_path / "c.png").write_bytes(b"other image")
+    collection = FakeCollection()
+    ledger_path = tmp_path / "ledger.txt"
+    anki = mock_anki(collection)
+    uploader = MediaUploader(anki.client(), MediaLedger(ledger_path))
+
+    paths = [str(tmp_path / name) for name in ("a.PNG", "b.png", "c.png", "missing.png")]
+    results = await uploader.upload(paths)
+
+    assert anki.calls["storeMediaFile"] == 2
+    assert results[0]["filename"] == results[1]["filename"]
+    assert results[0]["filename"].startswith("mcp-") and results[0]["filename"].endswith(".png")
+    assert [r.get("uploaded") for r in results[:3]] == [True, False, True]
+    assert "error" in results[3]
+    assert collection.media[results[2]["filename"]] == b"other image"
+
+    # A new uploader with the same ledger file does not contact Anki again
+    anki = mock_anki(collection)
+    uploader = MediaUploader(anki.client(), MediaLedger(ledger_path))
+    results = await uploader.upload(paths[:3])
+    assert anki.calls["storeMediaFile"] == 0
+    assert not any(r["uploaded"] for r in results)
@@ -0,0 +1,77 @@
+"""Tests for action and tool metrics."""
+
+import asyncio
+
+import pytest
+
+from anki_mcp_server.client import AnkiConnectError
+from anki_mcp_server.metrics import Metrics, track_round_trips
+
+
+def answer(payload: dict) -> dict:
+    """Answer single and multi requests like AnkiConnect."""
+    if payload["action"] == "multi":
+        return {"result": [answer(a) for a in payload["params"]["actions"]], "error": None}
+    if payload["action"] == "modelFieldNames":
+        return {"result": None, "error": "model was not found"}
+    return {"result": ["Default"], "error": None}
+
+
+async def test_client_records_actions_and_bytes(mock_anki):
+    """Every call is counted with latency and payload sizes."""
+    client = mock_anki(answer).client()
+    await client.get_deck_names()
+    await client.get_deck_names()
+    stats = client.metrics.snapshot()["actions"]["deckNames"]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 0
+    assert stats["requests"] == 2
+    assert stats["requestBytes"] > 0
+    assert stats["responseBytes"] > 0
+    assert sum(stats["histogram"].values()) == 2
+
+
+async def test_client_records_errors(mock_anki):
+    """Failed actions are counted as errors."""
+    client = mock_anki(answer).client()
+    with pytest.raises(AnkiConnectError):
+        await client.get_model_field_names("Missing")
+    assert client.metrics.snapshot()["actions"]["modelFieldNames"]["errors"] == 1
+
+
+async def test_batched_bytes_are_attributed_to_multi(mock_anki):
+    """Batched calls are counted per action; the HTTP request under multi."""
+    client = mock_anki(answer).client(batch_window_us=0)
+    await asyncio.gather(client.get_deck_names(), client.get_model_names())
+    actions = client.metrics.snapshot()["actions"]
+    assert actions["deckNames"]["calls"] == 1
+    assert actions["modelNames"]["calls"] == 1
+    assert actions["multi"]["requests"] == 1
+    assert "requests" not in actions["deckNames"]
+
+
+async def test_round_trips_are_tracked_per_context(mock_anki):
+    """Only requests made inside the tracking block are counted."""
+    client = mock_anki(answer).client()
+    await client.get_deck_names()
+    with track_round_trips() as round_trips:
+        await client.get_deck_names()
+        await client.get_model_names()
+    await client.get_model_names()
+    assert round_trips[0] == 2
+
+
+def test_tool_metrics_and_prometheus_output():
+    """Tool metrics appear in the snapshot and the Prometheus dump."""
+    metrics = Metrics()
+    metrics.record_tool("search_notes", 0.012, round_trips=2)
+    metrics.record_tool("search_notes", 0.003, round_trips=2, error=True)
+    tool = metrics.snapshot()["tools"]["search_notes"]
+    assert tool["calls"] == 2
+    assert tool["errors"] == 1
+    assert tool["roundTripsPerCall"] == 2
+
+    text = metrics.to_prometheus({"entries": 1, "hits": 3, "staleHits": 0, "misses": 1})
+    assert 'anki_mcp_tool_duration_seconds_count{tool="search_notes"} 2' in text
+    assert 'anki_mcp_tool_round_trips_total{tool="search_notes"} 4' in text
+    assert "anki_mcp_cache_stale_hits_total 0" in text
@@ -0,0 +1,220 @@
+"""Tests for the local note mirror."""
+
+import pytest
+
+from anki_mcp_server.fake_anki import FakeCollection
+from anki_mcp_server.mirror import NoteMirror
+
+
+async def test_initial_sync_copies_all_notes(mock_anki):
+    """The first sync stores every note with its deck."""
+    collection = FakeCollection.synthetic(30, num_decks=3)
+    mirror = NoteMirror(mock_anki(collection).client(), chunk_size=7)
+    result = await mirror.sync()
+    assert result["added"] == 30
+    assert mirror.stats()["notes"] == 30
+
+    note_id = next(iter(collection.notes))
+    [note] = await mirror.get_notes([note_id])
+    assert note == {
+        key: value for key, value in collection.notes_info([note_id])[0].items() if key != "profile"
+    }
+
+
+async def test_sync_only_fetches_changed_notes_and_detects_deletions(mock_anki):
+    """A re-sync pulls notesInfo only for changed notes and drops deleted ones."""
+    collection = FakeCollection.synthetic(20)
+    anki = mock_anki(collection)
+    mirror = NoteMirror(anki.client())
+    await mirror.sync()
+
+    changed, deleted = list(collection.notes)[:2]
+    collection.notes[changed]["mod"] += 10
+    collection.notes[changed]["tags"].append("edited")
+    collection.delete_notes([deleted])
+    anki.requests.clear()
+
+    result = await mirror.sync()
+    assert result == {**result, "added": 0, "updated": 1, "deleted": 1, "total": 19}
+    assert anki.calls["notesInfo"] == 1
+    [note, gone] = await mirror.get_notes([changed, deleted])
+    assert "edited" in note["tags"]
+    assert gone == {}
+
+
+async def test_unchanged_sync_fetches_no_notes(mock_anki):
+    """Without changes a sync only lists IDs, mod times and card decks."""
+    anki = mock_anki(FakeCollection.synthetic(10))
+    mirror = NoteMirror(anki.client())
+    await mirror.sync()
+    anki.requests.clear()
+    assert (await mirror.sync())["updated"] == 0
+    assert set(anki.calls) == {"findNotes", "notesModTime", "getDecks"}
+
+
+async def test_sync_picks_up_cards_moved_in_anki(mock_anki):
+    """Moving cards leaves mod times alone, so deck searches rely on refreshed card decks."""
+    collection = search_collection()
+    mirror = NoteMirror(mock_anki(collection).client(), max_age=0)
+    [note_id] = await mirror.find_notes("deck:History")
+    collection.change_deck(collection.notes[note_id]["cards"], "Archive")
+
+    assert await mirror.find_notes("deck:History") == []
+    assert await mirror.find_notes("deck:Archive") == [note_id]
+    [result] = (await mirror.search("deck:Archive"))["results"]
+    assert result["deck"] == "Archive"
+
+
+async def test_notes_match_the_deck_of_every_card(mock_anki):
+    """A note whose cards are in several decks matches each of them."""
+    collection = FakeCollection()
+    collection.create_deck("Words")
+    collection.create_model(
+        "Two Way",
+        ["Front", "Back"],
+        [{"Front": "{{Front}}", "Back": "{{Back}}"}, {"Front": "{{Back}}", "Back": "{{Front}}"}],
+    )
+    note_id = collection.add_note(
+        {"deckName": "Words", "modelName": "Two Way", "fields": {"Front": "dog", "Back": "Hund"}}
+    )
+    first, second = collection.notes[note_id]["cards"]
+
+    def answer(payload):
+        if payload["action"] == "getDecks":
+            # The reverse cards were moved to their own deck
+            cards = payload["params"]["cards"]
+            decks = {"Words": [c for c in cards if c != second], "Words::Reverse": [second]}
+            return {"result": {d: ids for d, ids in decks.items() if ids}, "error": None}
+        return collection.handle(payload)
+
+    mirror = NoteMirror(mock_anki(answer).client())
+    assert await mirror.find_notes("deck:Words::Reverse") == [note_id]
+    # Deck terms hold per card, as in Anki
+    assert await mirror.find_notes("-deck:Words::Reverse") == [note_id]
+    assert await mirror.find_notes('"deck:Words" -"deck:Words::*"') == [note_id]
+    assert await mirror.find_notes("deck:Words::Reverse -deck:Words::Reverse") == []
+    [result] = (await mirror.search("deck:Words::Reverse"))["results"]
+    assert result["deck"] == "Words"
+
+
+async def test_fresh_mirror_serves_reads_locally(mock_anki):
+    """Reads within max_age do not contact AnkiConnect."""
+    collection = FakeCollection.synthetic(10)
+    anki = mock_anki(collection)
+    mirror = NoteMirror(anki.client(), max_age=60)
+    ids = list(collection.notes)
+    await mirror.get_notes(ids)
+    anki.requests.clear()
+    await mirror.get_notes(ids[:5])
+    assert not anki.requests
+
+
+async def test_invalidated_notes_are_refetched(mock_anki):
+    """Notes passed to invalidate are read from AnkiConnect again."""
+    collection = FakeCollection.synthetic(5)
+    anki = mock_anki(collection)
+    mirror = NoteMirror(anki.client(), max_age=60)
+    note_id = next(iter(collection.notes))
+    await mirror.get_notes([note_id])
+    collection.update_note_tags(note_id, ["fresh"])
+    mirror.invalidate([note_id])
+    anki.requests.clear()
+    [note] = await mirror.get_notes([note_id])
+    assert note["tags"] == ["fresh"]
+    assert anki.calls["notesInfo"] == 1
+
+
+async def test_mirror_persists_across_instances(mock_anki, tmp_path):
+    """A file-backed mirror only transfers changes after a restart."""
+    collection = FakeCollection.synthetic(10)
+    path = tmp_path / "mirror.db"
+    first = NoteMirror(mock_anki(collection).client(), path=path)
+    await first.sync()
+    first.close()
+
+    anki = mock_anki(collection)
+    second = NoteMirror(anki.client(), path=path)
+    assert (await second.sync())["added"] == 0
+    assert anki.calls["notesInfo"] == 0
+
+
+async def test_notes_created_elsewhere_are_found_after_invalidate(mock_anki):
+    """Invalidated new notes are fetched before the next local search."""
+    collection = FakeCollection.synthetic(5)
+    mirror = NoteMirror(mock_anki(collection).client(), max_age=60)
+    await mirror.sync()
+    note_id = collection.add_note(
+        {"deckName": "Default", "modelName": "Basic", "fields": {"Front": "zebra", "Back": "x"}}
+    )
+    mirror.invalidate([note_id])
+    assert await mirror.find_notes("zebra") == [note_id]
+
+
+def search_collection() -> FakeCollection:
+    """Collection with a few hand-written notes for search tests."""
+    collection = FakeCollection()
+    collection.create_deck("Biology::Cells")
+    collection.create_deck("History")
+    notes = [
+        ("Biology::Cells", "The <b>mitochondria</b> is the powerhouse", "cell", ["bio"]),
+        ("Biology::Cells", "Ribosomes build proteins; mitochondria make ATP", "cell", ["bio"]),
+        ("History", "The Roman empire fell in 476", "rome", ["history::ancient"]),
+    ]
+    for deck, front, back, tags in notes:
+        collection.add_note(
+            {"deckName": deck, "modelName": "Basic", "fields": {"Front": front, "Back": back}}
+            | {"tags": tags}
+        )
+    return collection
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "mitochondria",
+        "MITO",
+        "deck:Biology",
+        "deck:biology::cells -ribosomes",
+        "tag:history",
+        "tag:hist*",
+        "note:Basic back:cell",
+        "front:*empire*",
+        "-deck:History",
+        "*",
+        '"roman empire"',
+    ],
+)
+async def test_local_search_matches_fake_anki(mock_anki, query):
+    """Translated queries return the same notes as the fake AnkiConnect."""
+    collection = search_collection()
+    mirror = NoteMirror(mock_anki(collection).client())
+    assert await mirror.find_notes(query) == sorted(collection.find_notes(query))
+
+
+@pytest.mark.parametrize(
+    "query", ["is:due", "deck:A or deck:B", "(tag:x)", "mito*", "added:1", "flag:1"]
+)
+async def test_unsupported_queries_fall_back(mock_anki, query):
+    """Queries the mirror cannot answer return None."""
+    anki = mock_anki(search_collection())
+    mirror = NoteMirror(anki.client(), max_age=60)
+    await mirror.sync()
+    anki.requests.clear()
+    assert await mirror.find_notes(query) is None
+    assert await mirror.search(query) is None
+    assert not anki.requests
+
+
+async def test_ranked_search_returns_snippets(mock_anki):
+    """Ranked results carry a highlighted snippet and the best match first."""
+    mirror = NoteMirror(mock_anki(search_collection()).client())
+    found = await mirror.search("mitochondria powerhouse")
+    assert found["total"] == 1
+    [result] = found["results"]
+    assert result["deck"] == "Biology::Cells"
+    assert "<b>mitochondria</b>" in result["snippet"]
+    assert result["score"] > 0
+
+    found = await mirror.search("mitochondria", limit=1)
+    assert found["total"] == 2
+    assert len(found["results"]) == 1
@@ -0,0 +1,133 @@
+"""Tests for the read-only package backend."""
+
+from pathlib import Path
+
+import pytest
+
+from anki_mcp_server.apkg import build_package
+from anki_mcp_server.client import AnkiConnectError
+from anki_mcp_server.fake_anki import FakeCollection
+from anki_mcp_server.metrics import track_round_trips
+from anki_mcp_server.package_client import PackageClient
+
+EXPORT_DIR = Path(__file__).parent.parent / "export"
+
+
+@pytest.fixture
+def package(tmp_path):
+    """Package with 20 Basic notes in two decks and 5 Cloze notes."""
+    notes = [
+        {
+            "deckName": f"Course::Week {i % 2}",
+            "modelName": "Basic",
+            "fields": {"Front": f"What is term {i}?", "Back": "graph" if i % 4 else "tree"},
+            "tags": ["basic", f"t{i % 3}"],
+        }
+        for i in range(20)
+    ]
+    notes += [
+        {"deckName": "Cloze", "modelName": "Cloze", "fields": {"Text": f"{{{{c1::x{i}}}}}"}}
+        for i in range(5)
+    ]
+    path = tmp_path / "course.apkg"
+    build_package(path, notes, FakeCollection().models)
+    return path
+
+
+async def test_metadata(package):
+    client = PackageClient(package)
+    try:
+        await client.check_connection()
+        assert {"Course::Week 0", "Course::Week 1", "Cloze"} <= set(await client.get_deck_names())
+        assert sorted(await client.get_model_names()) == ["Basic", "Cloze"]
+        assert await client.get_model_field_names("Cloze") == ["Text", "Back Extra"]
+        [model] = await client.find_models_by_name(["Basic"])
+        assert model["tmpls"][0]["qfmt"] == "{{Front}}"
+    finally:
+        await client.close()
+
+
+async def test_search_and_notes_info(package):
+    client = PackageClient(package)
+    try:
+        assert len(await client.find_notes("deck:Course")) == 20
+        assert len(await client.find_notes('"deck:Course::Week 1" tag:t0')) == 3
+        assert len(await client.find_notes("back:tree")) == 5
+        assert len(await client.find_notes("note:Cloze")) == 5
+        assert len(await client.find_notes("term -deck:Cloze")) == 20
+
+        note_ids = await client.find_notes("note:Basic")
+        [info, missing] = await client.notes_info([note_ids[0], 1])
+        assert info["modelName"] == "Basic"
+        assert info["fields"]["Front"] == {"value": "What is term 0?", "order": 0}
+        assert missing == {}
+        assert await client.get_decks(info["cards"]) == {"Course::Week 0": info["cards"]}
+        assert len(await client.find_cards("deck:Course")) == 20
+        assert len(await client.find_cards('"deck:Course::Week 1" -deck:Cloze')) == 10
+    finally:
+        await client.close()
+
+
+async def test_multi_batches_and_rejects_writes(package):
+    client = PackageClient(package, batch_window_us=0)
+    try:
+        results = await client.multi(
+            [
+                {"action": "deckNames"},
+                {"action": "addNote", "params": {"note": {}}},
+                {"action": "findNotes", "params": {"query": "(a or b)"}},
+            ]
+        )
+        assert "Cloze" in results[0]
+        assert "not supported" in str(results[1])
+        assert "not supported" in str(results[2])
+        with pytest.raises(AnkiConnectError, match="read-only"):
+            await client.create_deck("New")
+    finally:
+        await client.close()
+
+
+async def test_reports_round_trips_transfers_and_health(package, tmp_path):
+    client = PackageClient(package, batch_window_us=0)
+    try:
+        with track_round_trips() as round_trips:
+            await client.get_deck_names()
+        assert round_trips[0] == 1
+        stats = client.metrics.snapshot()["actions"]["deckNames"]
+        assert stats["requests"] == 1
+        assert stats["requestBytes"] > 0 and stats["responseBytes"] > 0
+        assert client.health.last_success is not None
+    finally:
+        await client.close()
+
+    broken = tmp_path / "broken.apkg"
+    broken.write_bytes(b"not a package")
+    client = PackageClient(broken)
+    try:
+        with pytest.raises(AnkiConnectError, match="broken.apkg"):
+            await client.get_deck_names()
+        assert client.health.consecutive_failures == 1
+    finally:
+        await client.close()
+
+
+async def test_matches_fake_collection_for_exported_package():
+    pytest.importorskip("zstandard")
+    path = EXPORT_DIR / "PGM__Homework1.apkg"
+    collection = FakeCollection.from_packages(path)
+    client = PackageClient(path)
+    try:
+        query = "deck:PGM::Homework1"
+        note_ids = await client.find_notes(query)
+        assert sorted(note_ids) == sorted(collection.find_notes(query))
+        [info] = await client.notes_info(note_ids[:1])
+        [expected] = collection.notes_info(note_ids[:1])
+        assert info["fields"] == expected["fields"]
+        assert info["tags"] == expected["tags"]
+    finally:
+        await client.close()
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        PackageClient(tmp_path / "missing.apkg")
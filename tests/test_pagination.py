@@ -0,0 +1,63 @@
+"""Tests for paginated search result sets."""
+
+import time
+
+import pytest
+
+from anki_mcp_server.pagination import CursorError, ResultSetCache
+
+
+def test_cursor_round_trip():
+    """A cursor resolves to its result set and offset."""
+    cache = ResultSetCache()
+    token = cache.put("deck:A", [1, 2, 3])
+    _, result_set, offset = cache.get(cache.cursor(token, 2), "deck:A")
+    assert result_set.note_ids == [1, 2, 3]
+    assert offset == 2
+
+
+def test_cursor_must_match_query():
+    """A cursor cannot be reused for a different query."""
+    cache = ResultSetCache()
+    token = cache.put("deck:A", [1])
+    with pytest.raises(CursorError):
+        cache.get(cache.cursor(token, 1), "deck:B")
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "abc:", ":5", "abc:-1"])
+def test_malformed_cursors_are_rejected(cursor):
+    """Malformed cursors raise CursorError."""
+    with pytest.raises(CursorError):
+        ResultSetCache().get(cursor, "q")
+
+
+def test_result_sets_expire(monkeypatch: pytest.MonkeyPatch):
+    """Result sets are dropped after the TTL."""
+    cache = ResultSetCache(ttl=10)
+    token = cache.put("q", [1])
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    with pytest.raises(CursorError, match="expired"):
+        cache.get(cache.cursor(token, 0), "q")
+    assert len(cache) == 0
+
+
+def test_id_cap_evicts_least_recently_used():
+    """Older result sets are dropped once the ID cap is exceeded."""
+    cache = ResultSetCache(max_ids=5)
+    first = cache.put("a", [1, 2, 3])
+    second = cache.put("b", [4, 5])
+    cache.get(cache.cursor(first, 0), "a")
+    cache.put("c", [6, 7])
+    with pytest.raises(CursorError):
+        cache.get(cache.cursor(second, 0), "b")
+    assert cache.stats()["noteIds"] == 5
+
+
+def test_oversized_result_set_is_kept_alone():
+    """A result set larger than the cap replaces all others but is still stored."""
+    cache = ResultSetCache(max_ids=2)
+    cache.put("a", [1])
+    token = cache.put("b", [1, 2, 3])
+    assert len(cache) == 1
+    cache.get(cache.cursor(token, 2), "b")
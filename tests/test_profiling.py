@@ -0,0 +1,68 @@
+"""Tests for the tool profiler."""
+
+import asyncio
+import pstats
+import time
+
+from anki_mcp_server.profiling import ToolProfiler
+
+
+def busy(ms: float) -> None:
+    """Spin the CPU for about ``ms`` milliseconds."""
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+async def test_slow_calls_are_written(tmp_path):
+    """Calls above the threshold leave a pstats and a collapsed-stack file."""
+    profiler = ToolProfiler(tmp_path, threshold_ms=5)
+
+    async def tool():
+        busy(10)
+        return "done"
+
+    assert await profiler.run("search_notes", tool) == "done"
+    [stats_file] = tmp_path.glob("search_notes-*.pstats")
+    assert pstats.Stats(str(stats_file)).total_tt > 0
+    collapsed = stats_file.with_suffix(".collapsed").read_text()
+    assert "busy" in collapsed
+
+
+async def test_fast_calls_are_discarded(tmp_path):
+    """Calls below the threshold are not written."""
+    profiler = ToolProfiler(tmp_path, threshold_ms=10_000)
+
+    async def tool():
+        return None
+
+    await profiler.run("list_decks", tool)
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_only_slowest_profiles_are_kept(tmp_path):
+    """Faster profiles are evicted once more than ``keep`` were captured."""
+    profiler = ToolProfiler(tmp_path, threshold_ms=0, keep=2)
+    for ms in (30, 5, 20, 1):
+
+        async def tool(ms=ms):
+            busy(ms)
+
+        await profiler.run("t", tool)
+    kept = sorted(int(p.name.split("-")[1][:-2]) for p in tmp_path.glob("*.pstats"))
+    assert len(kept) == 2
+    assert kept[0] >= 19
+    assert len(list(tmp_path.glob("*.collapsed"))) == 2
+
+
+async def test_concurrent_calls_are_not_nested(tmp_path):
+    """Only one invocation is profiled at a time; others still complete."""
+    profiler = ToolProfiler(tmp_path, threshold_ms=0)
+
+    async def tool():
+        await asyncio.sleep(0.01)
+        return 1
+
+    results = await asyncio.gather(*(profiler.run("t", tool) for _ in range(3)))
+    assert results == [1, 1, 1]
+    assert len(list(tmp_path.glob("*.pstats"))) == 1
@@ -0,0 +1,144 @@
+"""Tests for cached metadata reads in ResourceHandler."""
+
+import asyncio
+import json
+from collections import Counter
+
+from anki_mcp_server.resources import ResourceHandler
+
+
+class FakeClient:
+    """Minimal stand-in for AnkiClient that counts calls."""
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+        self.decks = ["Default"]
+        self.models = {"Basic": ["Front", "Back"], "Cloze": ["Text", "Back Extra"]}
+
+    async def get_deck_names(self):
+        self.calls["deckNames"] += 1
+        return list(self.decks)
+
+    async def get_model_names(self):
+        self.calls["modelNames"] += 1
+        return list(self.models)
+
+    async def get_model_names_and_ids(self):
+        self.calls["modelNamesAndIds"] += 1
+        return {name: i for i, name in enumerate(self.models, start=1)}
+
+    async def find_models_by_id(self, model_ids):
+        self.calls["findModelsById"] += 1
+        names = list(self.models)
+        return [
+            {
+                "id": i,
+                "name": names[i - 1],
+                "flds": [{"name": f, "ord": n} for n, f in enumerate(self.models[names[i - 1]])],
+                "tmpls": [{"name": "Card 1", "ord": 0, "qfmt": "{{Front}}", "afmt": "{{Back}}"}],
+                "css": ".card {}",
+            }
+            for i in model_ids
+        ]
+
+    async def get_model_field_names(self, model_name):
+        self.calls["modelFieldNames"] += 1
+        return self.models[model_name]
+
+    async def get_model_templates(self, model_name):
+        self.calls["modelTemplates"] += 1
+        return {"Card 1": {"Front": "{{Front}}", "Back": "{{Back}}"}}
+
+    async def get_model_styling(self, model_name):
+        self.calls["modelStyling"] += 1
+        return {"css": ".card {}"}
+
+
+async def test_schema_is_cached():
+    """Repeated schema reads hit AnkiConnect once."""
+    client = FakeClient()
+    handler = ResourceHandler(client)
+    first = await handler.read_resource("anki://note-types/Basic")
+    second = await handler.read_resource("anki://note-types/Basic")
+    assert first == second
+    assert json.loads(first)["fields"] == ["Front", "Back"]
+    assert client.calls["modelFieldNames"] == 1
+
+
+async def test_decks_invalidated_after_write():
+    """Invalidating decks forces a refetch."""
+    client = FakeClient()
+    handler = ResourceHandler(client)
+    assert await handler.get_decks() == ["Default"]
+    client.decks.append("New")
+    assert await handler.get_decks() == ["Default"]
+    handler.invalidate_decks()
+    assert await handler.get_decks() == ["Default", "New"]
+    assert client.calls["deckNames"] == 2
+
+
+async def test_note_type_invalidation_is_precise():
+    """Invalidating a note type keeps other schemas cached."""
+    client = FakeClient()
+    handler = ResourceHandler(client)
+    await handler.get_note_types()
+    await handler.get_model_schema("Basic")
+    await handler.get_model_schema("Cloze")
+    handler.invalidate_note_type("Basic")
+    await handler.get_model_schema("Cloze")
+    await handler.get_model_schema("Basic")
+    assert client.calls["modelFieldNames"] == 3
+    assert client.calls["modelNames"] == 1
+    await handler.get_note_types()
+    assert client.calls["modelNames"] == 2
+
+
+async def test_all_schemas_fetched_in_one_round_trip():
+    """All schemas come from a single findModelsById call and warm per-model entries."""
+    client = FakeClient()
+    handler = ResourceHandler(client)
+    schemas = json.loads(await handler.read_resource("anki://note-types/all-with-schemas"))
+    assert [s["modelName"] for s in schemas] == ["Basic", "Cloze"]
+    assert schemas[0] == await handler._fetch_schema("Basic")
+    assert client.calls["findModelsById"] == 1
+    await handler.get_model_schema("Cloze")
+    assert client.calls["modelFieldNames"] == 1
+
+
+async def test_all_schemas_refresh_updates_schemas_without_counting_lookups():
+    """A refresh re-caches every schema from one response and leaves hit/miss counters alone."""
+    client = FakeClient()
+    handler = ResourceHandler(client)
+    await handler.get_all_schemas()
+    handler._cache.invalidate("all_schemas")
+    client.models["Cloze"] = ["Text"]
+    before = handler.cache_stats()
+    schemas = await handler._refresh_all_schemas()
+    after = handler.cache_stats()
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
+    assert schemas[1]["fields"] == ["Text"]
+    assert (await handler.get_model_schema("Cloze"))["fields"] == ["Text"]
+    assert client.calls["findModelsById"] == 2
+    assert client.calls["modelFieldNames"] == 0
+
+
+async def test_stale_while_revalidate_serves_stale_and_refreshes_once():
+    """Stale entries are served immediately and refreshed by one background task."""
+    client = FakeClient()
+    handler = ResourceHandler(client, deck_cache_expiry=0, stale_while_revalidate=60)
+    assert await handler.get_decks() == ["Default"]
+    client.decks.append("New")
+    assert await handler.get_decks() == ["Default"]
+    assert await handler.get_decks() == ["Default"]
+    await asyncio.gather(*handler._refreshing.values())
+    assert client.calls["deckNames"] == 2
+    assert handler._cache.get_stale("decks")[0] == ["Default", "New"]
+
+
+async def test_hard_ttl_forces_blocking_fetch():
+    """Without a stale window, expired entries are refetched before returning."""
+    client = FakeClient()
+    handler = ResourceHandler(client, deck_cache_expiry=0)
+    await handler.get_decks()
+    client.decks.append("New")
+    assert await handler.get_decks() == ["Default", "New"]
@@ -0,0 +1,370 @@
+"""Tests for MCP tools, called through an in-process client against a FakeCollection."""
+
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+from anki_mcp_server import server_fastmcp
+from anki_mcp_server.fake_anki import FakeCollection
+
+
+class Session:
+    """An MCP client session and the MockAnki answering the server's requests."""
+
+    def __init__(self, client: Client, anki):
+        self.client = client
+        self.anki = anki
+
+    async def call(self, tool: str, progress_handler: Any = None, **arguments: Any) -> Any:
+        """Call a tool and decode its JSON response."""
+        result = await self.client.call_tool(tool, arguments, progress_handler=progress_handler)
+        return json.loads(result.content[0].text)
+
+
+@pytest.fixture
+def server(mock_anki, monkeypatch):
+    """Open a session with a fresh server: ``async with server(collection, **env) as s``.
+
+    ``env`` sets ANKI_MCP_* variables; all others are removed for the test.
+    """
+
+    @asynccontextmanager
+    async def open_session(collection: FakeCollection | None = None, **env: Any):
+        for name in list(os.environ):
+            if name.startswith("ANKI_MCP_"):
+                monkeypatch.delenv(name)
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        await server_fastmcp.reset_state()
+        anki = mock_anki(collection)
+        server_fastmcp._client = anki.client()
+        try:
+            async with Client(server_fastmcp.mcp) as client:
+                yield Session(client, anki)
+        finally:
+            await server_fastmcp.reset_state()
+
+    return open_session
+
+
+def basic(front: str, deck: str = "Default", **extra: Any) -> dict:
+    return {
+        "deckName": deck,
+        "modelName": "Basic",
+        "fields": {"Front": front, "Back": "a"},
+        **extra,
+    }
+
+
+async def test_move_cards_refreshes_moved_notes_in_mirror(server, tmp_path):
+    collection = FakeCollection()
+    collection.create_deck("Old")
+    for i in range(3):
+        collection.add_note(basic(f"q{i}", deck="Old"))
+    async with server(collection, ANKI_MCP_MIRROR=tmp_path / "mirror.db") as s:
+        assert (await s.call("search_notes", query="deck:Old"))["total"] == 3
+
+        moved = await s.call("move_cards_by_query", query="deck:Old", deck="New")
+
+        assert moved["cards"] == 3
+        assert (await s.call("search_notes", query="deck:Old"))["total"] == 0
+        assert (await s.call("search_notes", query="deck:New"))["total"] == 3
+
+
+async def test_import_cards_file_rejects_bad_tags_and_skips_decks_of_rejected_cards(
+    server, tmp_path
+):
+    collection = FakeCollection()
+    collection.add_note(basic("known"))
+    cards = [
+        {"deck": "Fresh", "fields": {"Front": "new", "Back": "a"}, "tags": ["t"]},
+        {"deck": "Fresh", "fields": {"Front": "q1", "Back": "a"}, "tags": None},
+        {"deck": "Fresh", "fields": {"Front": "q2", "Back": "a"}, "tags": "abc"},
+        {"deck": "Fresh", "fields": {"Front": "q3", "Back": "a"}, "tags": ["ok", 5]},
+        {"deck": "Copies", "fields": {"Front": "known", "Back": "a"}},
+        {"deck": "Invalid", "fields": {"Back": "a"}},
+    ]
+    path = tmp_path / "cards.ndjson"
+    path.write_text("\n".join(json.dumps(card) for card in cards))
+
+    async with server(collection, ANKI_MCP_DUPLICATE_INDEX=1) as s:
+        result = await s.call(
+            "import_cards_file", path=str(path), note_type="Basic", tags=["imported"]
+        )
+
+    assert (result["created"], result["failed"]) == (1, 5)
+    errors = {failure["index"]: failure["error"] for failure in result["failures"]}
+    assert errors[1] == errors[2] == errors[3] == "Tags must be a list of strings"
+    assert "duplicate" in errors[4].lower()
+    assert "Fresh" in collection.decks
+    assert "Copies" not in collection.decks and "Invalid" not in collection.decks
+    [note_id] = collection.find_notes("deck:Fresh")
+    assert collection.notes[note_id]["tags"] == ["imported", "t"]
+
+
+async def test_bulk_create_notes_chunks_and_reports_progress(server):
+    notes = [
+        {"type": "Basic", "deck": "Default", "fields": {"Front": f"q{i}", "Back": "a"}}
+        for i in range(300)
+    ]
+    notes[7]["fields"] = {"Question": "?"}
+    events = []
+
+    async def progress(done, total, message):
+        events.append((done, total))
+
+    async with server() as s:
+        result = await s.call(
+            "bulk_create_notes", notes=notes, progress_handler=progress, include_note_ids=False
+        )
+        sent = [len(p["params"]["notes"]) for p in s.anki.requests if p["action"] == "addNotes"]
+
+    assert (result["created"], result["failed"], result["chunks"]) == (299, 1, len(sent))
+    assert result["failures"][0]["index"] == 7
+    assert "Unknown field" in result["failures"][0]["error"]
+    assert sum(sent) == 299 and len(sent) > 1
+    assert events[-1] == (300, 300)
+    assert len(s.anki.collection.notes) == 299
+
+
+async def test_batch_update_notes_sends_one_multi_and_refreshes_mirror(server, tmp_path):
+    collection = FakeCollection()
+    note_ids = [collection.add_note(basic(f"q{i}")) for i in range(3)]
+    updates = [
+        {"id": note_ids[0], "fields": {"Back": "new"}, "tags": ["fixed"]},
+        {"id": note_ids[1], "tags": ["fixed"]},
+        {"id": 1, "fields": {"Back": "x"}},
+    ]
+    async with server(collection, ANKI_MCP_MIRROR=tmp_path / "mirror.db") as s:
+        assert (await s.call("search_notes", query="tag:fixed"))["total"] == 0
+        s.anki.requests.clear()
+
+        result = await s.call("batch_update_notes", updates=updates)
+
+        assert s.anki.actions.count("multi") == 1
+        assert (result["succeeded"], result["failed"]) == (2, 1)
+        assert "not found" in result["results"][2]["error"]
+        found = await s.call("search_notes", query="tag:fixed")
+        assert sorted(note["noteId"] for note in found["notes"]) == sorted(note_ids[:2])
+    assert collection.notes[note_ids[0]]["fields"]["Back"] == "new"
+
+
+async def test_query_tools_edit_tags_and_delete_without_fetching_notes(server):
+    collection = FakeCollection()
+    collection.create_deck("A")
+    in_a = [collection.add_note(basic(f"a{i}", deck="A", tags=["old"])) for i in range(4)]
+    other = collection.add_note(basic("b", tags=["old"]))
+    async with server(collection) as s:
+        added = await s.call("add_tags_by_query", query="deck:A", tags=["week1", "pgm"])
+        assert (added["notes"], added["chunks"]) == (4, 1)
+        await s.call("remove_tags_by_query", query="deck:A", tags=["pgm"])
+        await s.call("replace_tag_by_query", query="deck:A", tag="old", replacement="new")
+        assert collection.notes[in_a[0]]["tags"] == ["new", "week1"]
+        assert collection.notes[other]["tags"] == ["old"]
+
+        dry = await s.call("delete_notes_by_query", query="tag:week1", dry_run=True)
+        assert (dry["notes"], dry["chunks"], dry["dryRun"]) == (4, 0, True)
+        assert len(collection.notes) == 5
+        await s.call("delete_notes_by_query", query="tag:week1")
+        assert list(collection.notes) == [other]
+        assert "notesInfo" not in s.anki.actions
+
+
+async def test_duplicate_index_rejects_duplicates_before_sending(server):
+    collection = FakeCollection()
+    existing = collection.add_note(basic("known"))
+    notes = [
+        {"type": "Basic", "deck": "Default", "fields": {"Front": front, "Back": "a"}}
+        for front in ("known", "new", "<b>new</b>")
+    ]
+    async with server(collection, ANKI_MCP_DUPLICATE_INDEX=1) as s:
+        result = await s.call("batch_create_notes", notes=notes)
+        [sent] = [p["params"]["notes"] for p in s.anki.requests if p["action"] == "addNotes"]
+
+        assert [r["success"] for r in result["results"]] == [False, True, False]
+        assert result["results"][0]["duplicateOf"] == existing
+        assert result["results"][2]["duplicateOfIndex"] == 1
+        assert len(sent) == 1
+
+        # Notes created through the server join the index; deleted ones leave it
+        new_id = result["results"][1]["noteId"]
+        note = {"note_type": "Basic", "deck": "Default", "fields": {"Front": "new"}}
+        with pytest.raises(ToolError, match=f"Duplicate of existing note {new_id}"):
+            await s.call("create_note", **note)
+        assert "addNote" not in s.anki.actions
+        await s.call("delete_note", id=new_id)
+        assert (await s.call("create_note", **note))["success"] is True
+
+
+async def test_invalid_notes_are_rejected_locally(server):
+    notes = [
+        {"type": "Basic", "deck": "Default", "fields": {"Front": "ok", "Back": "a"}},
+        {"type": "Missing", "deck": "Default", "fields": {"Front": "q"}},
+        {"type": "Basic", "deck": "Nowhere", "fields": {"Front": "q"}},
+        {"type": "Basic", "deck": "Default", "fields": {"Front": " ", "Back": "a"}},
+        {"type": "Cloze", "deck": "Default", "fields": {"Text": "no deletion"}},
+        {"type": "Basic", "deck": "Default", "fields": {"Front": "ok", "Back": "b"}},
+    ]
+    async with server(ANKI_MCP_DUPLICATE_INDEX=1) as s:
+        results = (await s.call("batch_create_notes", notes=notes))["results"]
+        [sent] = [p["params"]["notes"] for p in s.anki.requests if p["action"] == "addNotes"]
+
+        assert [r["success"] for r in results] == [True, False, False, False, False, False]
+        assert results[1]["error"] == "Unknown note type: Missing"
+        assert results[2]["error"] == "Unknown deck: Nowhere"
+        assert "is empty" in results[3]["error"]
+        assert "cloze" in results[4]["error"].lower()
+        # Duplicate positions refer to the caller's indexes, not the valid subset
+        assert results[5]["duplicateOfIndex"] == 0
+        assert len(sent) == 1
+
+        with pytest.raises(ToolError, match="Unknown field"):
+            await s.call("create_note", note_type="Basic", deck="Default", fields={"Question": "?"})
+        assert "addNote" not in s.anki.actions
+
+
+async def test_batch_stop_on_error_reports_every_sent_note(server):
+    collection = FakeCollection()
+    collection.add_note(basic("known"))
+
+    def note(front: str, deck: str = "Default") -> dict:
+        return {"type": "Basic", "deck": deck, "fields": {"Front": front, "Back": "a"}}
+
+    async with server(collection) as s:
+        # Nothing after the first local rejection is sent
+        notes = [note("first"), note("q", deck="Nowhere"), note("third")]
+        result = await s.call("batch_create_notes", notes=notes, stop_on_error=True)
+        assert [r["success"] for r in result["results"]] == [True, False]
+        assert result["results"][1]["error"] == "Unknown deck: Nowhere"
+        [sent] = [p["params"]["notes"] for p in s.anki.requests if p["action"] == "addNotes"]
+        assert [n["fields"]["Front"] for n in sent] == ["first"]
+
+        # A failure in Anki cannot stop the notes sent with it, so all are reported
+        notes = [note("fourth"), note("known"), note("fifth")]
+        result = await s.call("batch_create_notes", notes=notes, stop_on_error=True)
+        assert [r["success"] for r in result["results"]] == [True, False, True]
+        assert result["total"] == 3
+        assert result["results"][2]["noteId"] in collection.notes
+
+
+async def test_import_notes_as_package_uses_one_import(server, tmp_path):
+    collection = FakeCollection()
+    collection.create_deck("Lecture")
+    collection.add_note(basic("known"))
+    image = tmp_path / "slide.png"
+    image.write_bytes(b"\x89PNG")
+    notes = [
+        {"type": "Basic", "deck": "Lecture", "fields": {"Front": f"q{i}", "Back": "a"}}
+        for i in range(500)
+    ]
+    notes[0]["fields"]["Back"] = '<img src="slide.png">'
+    notes.append({"type": "Basic", "deck": "Lecture", "fields": {"Front": "known"}})
+    notes.append({"type": "Basic", "deck": "Lecture", "fields": {"Front": "q1"}})
+    async with server(collection) as s:
+        result = await s.call("import_notes_as_package", notes=notes, media=[str(image)])
+
+        assert s.anki.actions.count("importPackage") == 1
+        assert "addNotes" not in s.anki.actions
+    assert (result["created"], result["failed"]) == (500, 2)
+    assert [f["index"] for f in result["failures"]] == [500, 501]
+    assert result["noteIds"][500] is None
+    assert sorted(collection.find_notes("deck:Lecture")) == sorted(result["noteIds"][:500])
+    assert collection.media["slide.png"] == b"\x89PNG"
+
+
+async def test_write_behind_queues_until_flushed(server, tmp_path):
+    collection = FakeCollection()
+    existing = collection.add_note(basic("old"))
+    env = {"ANKI_MCP_WRITE_BEHIND": tmp_path / "writes.jsonl", "ANKI_MCP_WRITE_BEHIND_DELAY": 60}
+    new = {"note_type": "Basic", "deck": "Default", "fields": {"Front": "new", "Back": "a"}}
+    async with server(collection, **env) as s:
+        created = await s.call("create_note", **new)
+        first = await s.call("update_note", id=existing, fields={"Front": "changed"})
+        second = await s.call("update_note", id=existing, fields={"Back": "b"}, tags=["t"])
+        assert created["queued"] and first["queued"]
+        assert not {"addNote", "addNotes", "multi"} & set(s.anki.actions)
+        status = await s.call("write_status", handles=[created["handle"]])
+        assert (status["pending"], status["writes"][0]["status"]) == (2, "pending")
+
+        flushed = await s.call("flush_writes")
+
+        assert (flushed["sent"], flushed["done"], flushed["pending"]) == (2, 2, 0)
+        handles = [created["handle"], second["handle"]]
+        statuses = (await s.call("write_status", handles=handles))["writes"]
+        assert statuses[0]["noteId"] in collection.notes
+        assert statuses[1]["mergedInto"] == first["handle"]
+        assert collection.notes[existing]["fields"] == {"Front": "changed", "Back": "b"}
+
+        # Writes still queued at shutdown are flushed by the server lifespan
+        await s.call("create_note", **{**new, "fields": {"Front": "last"}})
+    assert collection.find_notes("last")
+
+
+async def test_write_behind_tools_require_the_queue(server):
+    async with server() as s:
+        with pytest.raises(ToolError, match="Write-behind is disabled"):
+            await s.call("flush_writes")
+
+
+async def test_search_notes_pages_with_cursor(server):
+    collection = FakeCollection.synthetic(120, num_decks=1, cloze_ratio=0)
+    async with server(collection) as s:
+        pages = [await s.call("search_notes", query="deck:*", limit=50, metadata_only=True)]
+        while pages[-1]["nextCursor"]:
+            pages.append(
+                await s.call(
+                    "search_notes", query="deck:*", limit=50, cursor=pages[-1]["nextCursor"]
+                )
+            )
+
+        assert [len(page["notes"]) for page in pages] == [50, 50, 20]
+        assert all(page["total"] == 120 for page in pages)
+        seen = [note["noteId"] for page in pages for note in page["notes"]]
+        assert sorted(seen) == sorted(collection.notes)
+        # Later pages reuse the cached result set instead of searching again
+        assert s.anki.actions.count("findNotes") == 1
+        with pytest.raises(ToolError):
+            await s.call("search_notes", query="tag:other", cursor=pages[0]["nextCursor"])
+
+
+async def test_ranked_search_notes_returns_snippets(server, tmp_path):
+    collection = FakeCollection()
+    best = collection.add_note(basic("mitochondria mitochondria: the powerhouse of the cell"))
+    other = collection.add_note(basic("Ribosomes build proteins, mitochondria make ATP, and more"))
+    for fact in ["The Roman empire fell in 476", "Paris is in France", "Water boils at 100 C"]:
+        collection.add_note(basic(fact))
+    query = {"query": "mitochondria", "ranked": True, "limit": 1}
+    async with server(collection, ANKI_MCP_MIRROR=tmp_path / "mirror.db") as s:
+        first = await s.call("search_notes", **query)
+        second = await s.call("search_notes", **query, cursor=first["nextCursor"])
+
+        assert first["total"] == 2
+        assert [r["noteId"] for r in first["results"] + second["results"]] == [best, other]
+        assert "<b>mitochondria</b>" in first["results"][0]["snippet"]
+        assert first["results"][0]["score"] > 0
+        assert second["nextCursor"] is None
+
+    # Without the mirror, results keep Anki's order and carry no score
+    async with server(collection) as s:
+        found = await s.call("search_notes", query="mitochondria", ranked=True)
+        assert [r["noteId"] for r in found["results"]] == [best, other]
+        assert found["results"][0]["score"] is None
+
+
+async def test_docling_tools_use_the_response_encoder(server, tmp_path):
+    missing = str(tmp_path / "Übung.json")
+    async with server(ANKI_MCP_COMPACT_JSON="1") as s:
+        result = await s.client.call_tool(
+            "convert_docling_raw_to_intermediate",
+            {"source": missing, "output_dir": str(tmp_path)},
+        )
+        text = result.content[0].text
+        assert "\n" not in text and "Übung" in text
+        assert json.loads(text) == {"success": False, "error": f"Source file not found: {missing}"}
+        pdf = await s.call("convert_pdf_to_docling_raw", source=missing, compact=False)
+        assert pdf["success"] is False
@@ -0,0 +1,62 @@
+"""Tests for note response shaping."""
+
+from anki_mcp_server.shaping import shape_note, strip_html
+
+NOTE = {
+    "noteId": 1,
+    "profile": "User 1",
+    "modelName": "Basic",
+    "tags": ["bio"],
+    "fields": {
+        "Back": {"value": "Energy &amp; ATP<br>production", "order": 1},
+        "Front": {"value": "<b>Mitochondria</b>", "order": 0},
+    },
+    "mod": 1700000000,
+    "cards": [11, 12],
+}
+
+
+def test_no_options_returns_note_unchanged():
+    """Without options the notesInfo entry is passed through."""
+    assert shape_note(NOTE) is NOTE
+
+
+def test_missing_note_stays_empty():
+    """Empty notesInfo entries are not shaped."""
+    assert shape_note({}, strip=True) == {}
+
+
+def test_projection_is_case_insensitive_and_ordered():
+    """Selected fields are returned flat, in field order."""
+    shaped = shape_note(NOTE, fields=["back", "FRONT"])
+    assert shaped == {
+        "noteId": 1,
+        "modelName": "Basic",
+        "tags": ["bio"],
+        "fields": {"Front": "<b>Mitochondria</b>", "Back": "Energy &amp; ATP<br>production"},
+    }
+
+
+def test_strip_and_truncate():
+    """HTML is converted to text before values are truncated."""
+    shaped = shape_note(NOTE, strip=True, max_field_length=10)
+    assert shaped["fields"] == {"Front": "Mitochondr…", "Back": "Energy & A…"}
+    assert shaped["truncated"] == ["Front", "Back"]
+
+
+def test_metadata_only():
+    """Metadata mode drops all field content."""
+    shaped = shape_note(NOTE, metadata_only=True)
+    assert shaped == {
+        "noteId": 1,
+        "modelName": "Basic",
+        "tags": ["bio"],
+        "mod": 1700000000,
+        "fieldNames": ["Front", "Back"],
+        "cardCount": 2,
+    }
+
+
+def test_strip_html_keeps_line_breaks():
+    """Block boundaries become newlines."""
+    assert strip_html("<div>a</div><div>b<br/>c</div>") == "a\nb\nc"